@@ -1,23 +1,97 @@
 # bo_loc/__init__.py
 
-from .lam_min import loc_trung_binh, loc_gauss, loc_median
+from .lam_min import (
+    loc_trung_binh,
+    loc_gauss,
+    loc_median,
+    loc_song_phuong,
+    loc_song_phuong_vet_can,
+    sai_so_song_phuong,
+)
+from .tich_phan import BangTichPhan, tao_bang_tich_phan, phuong_sai_cuc_bo
+from .theo_dai import chia_dai, mo_anh_nguon, xu_ly_theo_dai
+from .nha_may_nhan import LoaiNhan, lay_nhan, xoa_bo_nho_nhan
+from .kieu_du_lieu import ChinhSachKieu, kieu_tinh_toan, ap_chinh_sach
+from .co_dinh import (
+    chap_2d_nguyen,
+    loc_trung_binh_co_dinh,
+    loc_gauss_co_dinh,
+    bien_do_gradient_co_dinh,
+    dap_ung_laplacian_co_dinh,
+)
 from .bien import (
     nhan_sobel,
     nhan_prewitt,
     dap_ung_laplacian,
     bien_do_gradient,
+    bien_do_gradient_gauss,
+    dap_ung_log,
     nhi_phan_hoa_bien,
+    luong_tu_bien,
+    bieu_do_bien,
+    ti_le_bien,
+    nguong_otsu,
     ve_bien_len_anh_xam,
 )
+from .canny import dap_ung_canny, tre_nguong, bien_canny
+from .thap_anh import thu_nho_2, thap_anh, chon_muc
+from .vung_lam_viec import VungLamViec
+from .chuoi_khung import LuongBien, doc_chuoi_khung, xu_ly_chuoi_khung
+from .jit_numba import CO_NUMBA, bat_jit, dang_bat_jit, lam_nong_jit
+from . import chap_ngoai  # đăng ký "scipy" / "opencv" cho chap_2d nếu đã cài
+from .tu_chinh_chap import tu_chinh, tu_chinh_luoi, bat_tu_chinh
 
 __all__ = [
     "loc_trung_binh",
     "loc_gauss",
     "loc_median",
+    "loc_song_phuong",
+    "loc_song_phuong_vet_can",
+    "sai_so_song_phuong",
+    "BangTichPhan",
+    "tao_bang_tich_phan",
+    "phuong_sai_cuc_bo",
     "nhan_sobel",
     "nhan_prewitt",
     "dap_ung_laplacian",
     "bien_do_gradient",
+    "bien_do_gradient_gauss",
+    "dap_ung_log",
     "nhi_phan_hoa_bien",
+    "luong_tu_bien",
+    "bieu_do_bien",
+    "ti_le_bien",
+    "nguong_otsu",
     "ve_bien_len_anh_xam",
+    "dap_ung_canny",
+    "tre_nguong",
+    "bien_canny",
+    "thu_nho_2",
+    "thap_anh",
+    "chon_muc",
+    "VungLamViec",
+    "LuongBien",
+    "doc_chuoi_khung",
+    "xu_ly_chuoi_khung",
+    "CO_NUMBA",
+    "bat_jit",
+    "dang_bat_jit",
+    "lam_nong_jit",
+    "tu_chinh",
+    "tu_chinh_luoi",
+    "bat_tu_chinh",
+    "chia_dai",
+    "mo_anh_nguon",
+    "xu_ly_theo_dai",
+    "LoaiNhan",
+    "lay_nhan",
+    "xoa_bo_nho_nhan",
+    "ChinhSachKieu",
+    "kieu_tinh_toan",
+    "ap_chinh_sach",
+    "chap_2d_nguyen",
+    "loc_trung_binh_co_dinh",
+    "loc_gauss_co_dinh",
+    "bien_do_gradient_co_dinh",
+    "dap_ung_laplacian_co_dinh",
 ]
@@ -1,15 +1,30 @@
 # bo_loc/bien.py
-from typing import Literal, Tuple
+from typing import Literal, Optional, Tuple
 
 import numpy as np
 
-from .cong_cu_chap import chap_2d, KieuPadding
+from .cong_cu_chap import (
+    _them_le_vao,
+    ap_theo_vung,
+    chap_2d,
+    cong_don_tren_mo_rong,
+    them_le,
+    tach_roi_tren_mo_rong,
+    ho_tro_kenh_cuoi,
+    KieuPadding,
+)
+from .kieu_du_lieu import kieu_tinh_toan
+from .jit_numba import bien_do_jit, dang_bat_jit
+from .nha_may_nhan import lay_nhan
+from .song_song import chay_song_song
+from .vung_lam_viec import VungLamViec
 from tien_ich import chuan_hoa_uint8
+from tien_ich.do_luong import do_buoc, do_ham
 
 KieuPadding = Literal["zero", "replicate", "reflect"]
 
 
-def nhan_sobel() -> Tuple[np.ndarray, np.ndarray]:
+def nhan_sobel(kieu: type = float) -> Tuple[np.ndarray, np.ndarray]:
     """Trả về (Gx, Gy) cho Sobel."""
     gx = np.array(
         [
@@ -17,7 +32,7 @@ def nhan_sobel() -> Tuple[np.ndarray, np.ndarray]:
             [-2, 0, 2],
             [-1, 0, 1],
         ],
-        dtype=float,
+        dtype=kieu,
     )
     gy = np.array(
         [
@@ -25,12 +40,12 @@ def nhan_sobel() -> Tuple[np.ndarray, np.ndarray]:
             [0, 0, 0],
             [1, 2, 1],
         ],
-        dtype=float,
+        dtype=kieu,
     )
     return gx, gy
 
 
-def nhan_prewitt() -> Tuple[np.ndarray, np.ndarray]:
+def nhan_prewitt(kieu: type = float) -> Tuple[np.ndarray, np.ndarray]:
     """Trả về (Gx, Gy) cho Prewitt."""
     gx = np.array(
         [
@@ -38,7 +53,7 @@ def nhan_prewitt() -> Tuple[np.ndarray, np.ndarray]:
             [-1, 0, 1],
             [-1, 0, 1],
         ],
-        dtype=float,
+        dtype=kieu,
     )
     gy = np.array(
         [
@@ -46,12 +61,12 @@ def nhan_prewitt() -> Tuple[np.ndarray, np.ndarray]:
             [0, 0, 0],
             [1, 1, 1],
         ],
-        dtype=float,
+        dtype=kieu,
     )
     return gx, gy
 
 
-def nhan_laplacian() -> np.ndarray:
+def nhan_laplacian(kieu: type = float) -> np.ndarray:
     """Kernel Laplacian 4-neighborhood."""
     return np.array(
         [
@@ -59,51 +74,346 @@ def nhan_laplacian() -> np.ndarray:
             [1, -4, 1],
             [0, 1, 0],
         ],
-        dtype=float,
+        dtype=kieu,
     )
 
 
+@do_ham("chuan_hoa_0_255")
+def chuan_hoa_0_255_tai_cho(anh: np.ndarray) -> np.ndarray:
+    """
+    Co giãn min/max về 0–255 ngay trên mảng float (không tạo bản sao).
+    Cùng thứ tự phép tính với (anh - mn) * 255 / (mx - mn).
+    Chồng ảnh (..., H, W): min/max riêng từng ảnh; ảnh hằng giữ nguyên.
+    """
+    if anh.ndim > 2:
+        mn = anh.min(axis=(-2, -1), keepdims=True)
+        mx = anh.max(axis=(-2, -1), keepdims=True)
+        co_dai = mx > mn
+        anh -= np.where(co_dai, mn, 0)
+        anh *= np.where(co_dai, 255.0, 1.0).astype(anh.dtype)
+        anh /= np.where(co_dai, mx - mn, 1)
+        return anh
+
+    mn, mx = float(anh.min()), float(anh.max())
+    if mx > mn:
+        anh -= mn
+        anh *= 255.0
+        anh /= mx - mn
+    return anh
+
+
+def _gx_gy_mot_luot(
+    anh_xam: np.ndarray,
+    gx: np.ndarray,
+    gy: np.ndarray,
+    kieu_padding: KieuPadding,
+    vung: Optional[VungLamViec] = None,
+) -> np.ndarray:
+    """
+    Gx, Gy (2, ..., H, W) trong 1 lượt với kernel chồng [gx, gy]: mỗi view
+    dịch của cửa sổ đọc 1 lần cho cả 2 kernel, bỏ hệ số 0 (cong_don_tren_mo_rong).
+    Không có vung: không thêm lề cả ảnh (ap_theo_vung); có vung: ảnh có lề,
+    kết quả và mảng tạm lấy từ vùng làm việc.
+    """
+    kieu = kieu_tinh_toan(anh_xam)
+    nhan = np.stack([gx, gy]).astype(kieu, copy=False)
+    k = gx.shape[0] // 2
+    with do_buoc("chap_cong_don"):
+        if vung is None:
+            return ap_theo_vung(
+                anh_xam,
+                k,
+                kieu_padding,
+                lambda a, o: cong_don_tren_mo_rong(a, nhan, out=o),
+                kieu,
+                truc_dau_ra=(2,),
+            )
+        *dau, H, W = anh_xam.shape
+        mo_rong = them_le(
+            anh_xam,
+            k,
+            kieu_padding,
+            out=vung.lay("chap_mo_rong", (*dau, H + 2 * k, W + 2 * k), anh_xam.dtype),
+        )
+        return cong_don_tren_mo_rong(
+            mo_rong,
+            nhan,
+            out=vung.lay("gradient_xy", (2, *dau, H, W), kieu),
+            nhap=vung.lay("chap_nhap", (*dau, H, W), kieu),
+        )
+
+
+@ho_tro_kenh_cuoi
 def bien_do_gradient(
     anh_xam: np.ndarray,
     gx: np.ndarray,
     gy: np.ndarray,
     kieu_padding: KieuPadding,
     chuan_hoa_0_255: bool = True,
+    so_luong_luong: int = 1,
+    out: Optional[np.ndarray] = None,
+    vung: Optional[VungLamViec] = None,
 ) -> np.ndarray:
-    """Độ lớn gradient dùng 2 kernel gx, gy (Sobel/Prewitt)."""
-    fx = chap_2d(anh_xam, gx, kieu_padding)
-    fy = chap_2d(anh_xam, gy, kieu_padding)
-    mag = np.sqrt(fx**2 + fy**2)
+    """
+    Độ lớn gradient dùng 2 kernel gx, gy (Sobel/Prewitt).
+
+    Gx, Gy tính cùng 1 lượt trên 1 view cửa sổ (kernel chồng, _gx_gy_mot_luot),
+    không thêm lề cả ảnh (chỉ dải biên được thêm lề); độ lớn ghi đè lên Gx bằng
+    np.hypot(out=), chuẩn hoá 0–255 tại chỗ → không có mảng tạm fx², fy², tổng.
+    so_luong_luong > 1 (hoặc <= 0 = mọi lõi): chia ô chạy song song,
+    chuẩn hoá 0–255 làm 1 lần trên cả ảnh sau khi ghép.
+    Có numba: Gx, Gy và độ lớn gộp trong 1 lượt (jit_numba.bien_do_jit).
+    out: ghi độ lớn vào mảng có sẵn. vung: ảnh có lề, Gx, Gy lấy từ vùng làm
+    việc (chuỗi khung cùng kích thước không cấp phát mảng cỡ ảnh).
+    """
+    assert gx.shape == gy.shape, "Gx và Gy phải cùng kích thước."
+
+    if vung is not None:
+        fxy = _gx_gy_mot_luot(anh_xam, gx, gy, kieu_padding, vung)
+        mag = np.hypot(fxy[0], fxy[1], out=out)
+    elif so_luong_luong != 1:
+        mag = chay_song_song(
+            bien_do_gradient,
+            anh_xam,
+            gx.shape[0] // 2,
+            so_luong_luong,
+            gx=gx,
+            gy=gy,
+            kieu_padding=kieu_padding,
+            chuan_hoa_0_255=False,
+        )
+    elif dang_bat_jit():
+        kieu = kieu_tinh_toan(anh_xam)
+        H, W = anh_xam.shape[-2:]
+        mag = bien_do_jit(
+            them_le(anh_xam, gx.shape[0] // 2, kieu_padding),
+            gx.astype(kieu, copy=False),
+            gy.astype(kieu, copy=False),
+            H,
+            W,
+        )
+    else:
+        fxy = _gx_gy_mot_luot(anh_xam, gx, gy, kieu_padding)
+        mag = np.hypot(fxy[0], fxy[1], out=fxy[0] if out is None else out)
+        del fxy
 
+    if out is not None and mag is not out:
+        out[...] = mag
+        mag = out
     if chuan_hoa_0_255:
-        mn, mx = float(mag.min()), float(mag.max())
-        if mx > mn:
-            mag = (mag - mn) * 255.0 / (mx - mn)
+        chuan_hoa_0_255_tai_cho(mag)
 
     return mag
 
 
+@ho_tro_kenh_cuoi
 def dap_ung_laplacian(
     anh_xam: np.ndarray,
     kieu_padding: KieuPadding,
     chuan_hoa_0_255: bool = True,
+    so_luong_luong: int = 1,
 ) -> np.ndarray:
-    """Độ lớn đáp ứng Laplacian (lấy trị tuyệt đối)."""
-    k = nhan_laplacian()
-    resp = chap_2d(anh_xam, k, kieu_padding)
-    resp = np.abs(resp)
+    """
+    Độ lớn đáp ứng Laplacian (lấy trị tuyệt đối, tại chỗ).
+    so_luong_luong > 1 (hoặc <= 0 = mọi lõi): chia ô chạy song song.
+    """
+    if so_luong_luong != 1:
+        resp = chay_song_song(
+            dap_ung_laplacian,
+            anh_xam,
+            1,
+            so_luong_luong,
+            kieu_padding=kieu_padding,
+            chuan_hoa_0_255=False,
+        )
+    else:
+        k = nhan_laplacian()
+        resp = chap_2d(anh_xam, k, kieu_padding)
+        np.abs(resp, out=resp)
 
     if chuan_hoa_0_255:
-        mn, mx = float(resp.min()), float(resp.max())
-        if mx > mn:
-            resp = (resp - mn) * 255.0 / (mx - mn)
+        chuan_hoa_0_255_tai_cho(resp)
 
     return resp
 
 
-def nhi_phan_hoa_bien(anh_bien: np.ndarray, nguong: int) -> np.ndarray:
-    """Nhị phân hoá ảnh biên (0/255) theo ngưỡng."""
-    return (anh_bien >= float(nguong)).astype(np.uint8) * 255
+def _tach_roi_theo_kieu(anh_mo_rong: np.ndarray, cot: np.ndarray, hang: np.ndarray):
+    kieu = kieu_tinh_toan(anh_mo_rong)
+    return tach_roi_tren_mo_rong(
+        anh_mo_rong, cot.astype(kieu, copy=False), hang.astype(kieu, copy=False)
+    )
+
+
+def _gauss_tren_mo_rong(
+    anh_xam: np.ndarray, kich_thuoc: int, sigma: float, kieu_padding: KieuPadding
+) -> np.ndarray:
+    """
+    Thêm lề ks // 2 + 1 đúng 1 lần rồi làm mịn Gaussian (tách rời) → ảnh đã
+    làm mịn còn dư lề 1 điểm ảnh, đủ cho kernel đạo hàm 3x3 dạng "valid".
+    Viền 1 điểm ảnh đó được ghi lại từ phần trong theo kieu_padding (tại chỗ)
+    → đúng ngữ nghĩa 2 bước them_le(loc_gauss(anh), 1): với "zero" viền làm
+    mịn từ ảnh gốc khác hẳn viền 0 và đổi cả min/max khi chuẩn hoá 0–255.
+    """
+    g = lay_nhan("gauss_1d", kich_thuoc, sigma)
+    anh_mo_rong = them_le(anh_xam, kich_thuoc // 2 + 1, kieu_padding)
+    min_mo_rong = _tach_roi_theo_kieu(anh_mo_rong, g, g)
+    del anh_mo_rong
+    trong = min_mo_rong[..., 1:-1, 1:-1]
+    if min(trong.shape[-2:]) < 2:
+        return them_le(trong, 1, kieu_padding)
+    _them_le_vao(trong, 1, kieu_padding, min_mo_rong, chep_trong=False)
+    return min_mo_rong
+
+
+@ho_tro_kenh_cuoi
+def bien_do_gradient_gauss(
+    anh_xam: np.ndarray,
+    loai: Literal["sobel", "prewitt"],
+    kich_thuoc: int,
+    sigma: float,
+    kieu_padding: KieuPadding,
+    chuan_hoa_0_255: bool = True,
+    so_luong_luong: int = 1,
+) -> np.ndarray:
+    """
+    Độ lớn gradient đạo hàm Gaussian (Gaussian ks rồi Sobel/Prewitt) gộp
+    thành 1 toán tử tách rời kích thước ks + 2 trên 1 lần thêm lề, thay cho
+    loc_gauss + 2 lần chập Sobel/Prewitt (mỗi lần tự thêm lề).
+    Toán tử gộp được áp dưới dạng thừa số: lượt Gaussian chung rồi lượt
+    đạo hàm 3 hệ số cho Gx, Gy (ít phép nhân hơn kernel ks + 2 khai triển).
+    Trùng đường 2 bước bien_do_gradient(loc_gauss(...)) trên cả ảnh, kể cả
+    viền (lề của lượt đạo hàm lấy từ ảnh đã làm mịn), sai khác mức làm tròn.
+    """
+    if so_luong_luong != 1:
+        mag = chay_song_song(
+            bien_do_gradient_gauss,
+            anh_xam,
+            kich_thuoc // 2 + 1,
+            so_luong_luong,
+            loai=loai,
+            kich_thuoc=kich_thuoc,
+            sigma=sigma,
+            kieu_padding=kieu_padding,
+            chuan_hoa_0_255=False,
+        )
+    else:
+        (cot_x, hang_x), (cot_y, hang_y) = lay_nhan(loai + "_tach")
+        min_mo_rong = _gauss_tren_mo_rong(anh_xam, kich_thuoc, sigma, kieu_padding)
+        fx = _tach_roi_theo_kieu(min_mo_rong, cot_x, hang_x)
+        fy = _tach_roi_theo_kieu(min_mo_rong, cot_y, hang_y)
+        del min_mo_rong
+        mag = np.hypot(fx, fy, out=fx)
+        del fy
+
+    if chuan_hoa_0_255:
+        chuan_hoa_0_255_tai_cho(mag)
+
+    return mag
+
+
+@ho_tro_kenh_cuoi
+def dap_ung_log(
+    anh_xam: np.ndarray,
+    kich_thuoc: int,
+    sigma: float,
+    kieu_padding: KieuPadding,
+    chuan_hoa_0_255: bool = True,
+    so_luong_luong: int = 1,
+) -> np.ndarray:
+    """
+    |Laplacian of Gaussian| (Gaussian ks rồi Laplacian 4 lân cận) trên 1 lần
+    thêm lề: lượt Gaussian chung rồi Laplacian = tổng 2 lượt tách rời
+    3 hệ số. Trùng dap_ung_laplacian(loc_gauss(...)) (sai khác làm tròn).
+    """
+    if so_luong_luong != 1:
+        resp = chay_song_song(
+            dap_ung_log,
+            anh_xam,
+            kich_thuoc // 2 + 1,
+            so_luong_luong,
+            kich_thuoc=kich_thuoc,
+            sigma=sigma,
+            kieu_padding=kieu_padding,
+            chuan_hoa_0_255=False,
+        )
+    else:
+        (cot_1, hang_1), (cot_2, hang_2) = lay_nhan("laplacian_tach")
+        min_mo_rong = _gauss_tren_mo_rong(anh_xam, kich_thuoc, sigma, kieu_padding)
+        resp = _tach_roi_theo_kieu(min_mo_rong, cot_1, hang_1)
+        resp += _tach_roi_theo_kieu(min_mo_rong, cot_2, hang_2)
+        del min_mo_rong
+        np.abs(resp, out=resp)
+
+    if chuan_hoa_0_255:
+        chuan_hoa_0_255_tai_cho(resp)
+
+    return resp
+
+
+def nhi_phan_hoa_bien(
+    anh_bien: np.ndarray, nguong: int, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Nhị phân hoá ảnh biên (0/255) theo ngưỡng.
+    Ảnh uint8 (ví dụ từ luong_tu_bien): tra bảng 256 giá trị, không tạo mảng
+    bool trung gian.
+    out: mảng uint8 có sẵn (ảnh float: so sánh ghi thẳng vào out dưới dạng
+    bool rồi nhân 255 tại chỗ).
+    """
+    if anh_bien.dtype == np.uint8:
+        bang = np.where(np.arange(256) >= float(nguong), 255, 0).astype(np.uint8)
+        return bang.take(anh_bien, out=out)
+    if out is None:
+        return (anh_bien >= float(nguong)).astype(np.uint8) * 255
+    np.greater_equal(anh_bien, float(nguong), out=out.view(np.bool_))
+    np.multiply(out, 255, out=out)
+    return out
+
+
+def luong_tu_bien(anh_bien: np.ndarray) -> np.ndarray:
+    """
+    Ảnh biên 0–255 (float) → uint8 phần nguyên (NaN → 0).
+    Với ngưỡng nguyên t: floor(v) >= t ⇔ v >= t, nên nhị phân hoá / đếm điểm
+    trên bản lượng tử cho đúng kết quả như trên ảnh float (1/4 bộ nhớ float32).
+    """
+    q = np.nan_to_num(anh_bien, nan=0.0)  # bản sao → floor/clip tại chỗ
+    np.floor(q, out=q)
+    np.clip(q, 0, 255, out=q)
+    return q.astype(np.uint8)
+
+
+def bieu_do_bien(anh_luong_tu: np.ndarray) -> np.ndarray:
+    """Histogram 256 mức (int64) của ảnh biên đã lượng tử."""
+    return np.bincount(anh_luong_tu.ravel(), minlength=256)
+
+
+def ti_le_bien(bieu_do: np.ndarray, nguong: int) -> float:
+    """Tỉ lệ điểm ảnh >= nguong (nguyên), tính từ histogram: O(256)."""
+    tong = int(bieu_do.sum())
+    t = min(max(int(np.ceil(nguong)), 0), 256)
+    return float(bieu_do[t:].sum()) / tong if tong else 0.0
+
+
+def nguong_otsu(bieu_do: np.ndarray) -> int:
+    """
+    Ngưỡng Otsu trên histogram 256 mức (O(256)): chọn k cực đại phương sai
+    giữa 2 lớp [0, k] / [k + 1, 255], trả về k + 1 để dùng với ">= ngưỡng".
+    """
+    p = bieu_do.astype(np.float64)
+    tong = p.sum()
+    if tong == 0:
+        return 128
+    p /= tong
+
+    muc = np.arange(256, dtype=np.float64)
+    w0 = np.cumsum(p)
+    mu0 = np.cumsum(p * muc)
+    mu = mu0[-1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        giua = (mu * w0 - mu0) ** 2 / (w0 * (1.0 - w0))
+    giua[~np.isfinite(giua)] = -1.0
+    return int(np.argmax(giua)) + 1
 
 
 def ve_bien_len_anh_xam(anh_xam: np.ndarray, bien_nhi_phan: np.ndarray) -> np.ndarray:
@@ -0,0 +1,217 @@
+# bo_loc/canny.py
+"""
+Phát hiện biên Canny, vector hoá hoàn toàn (không có vòng lặp theo điểm ảnh):
+
+1. Gx, Gy như bien_do_gradient (Sobel/Prewitt, tuỳ chọn làm mịn Gaussian
+   trước: toán tử gộp trên đường float, lọc 2 bước trên đường uint8).
+2. Khử không cực đại: hướng gradient lượng tử 4 hướng bằng so sánh
+   |Gy| với tan(22.5°)·|Gx| và tan(67.5°)·|Gx| (không cần arctan), 2 lân cận
+   theo hướng lấy từ các view dịch 1 điểm ảnh của độ lớn đã thêm lề 0.
+3. Ngưỡng kép có trễ: các điểm "yếu" (>= ngưỡng thấp) nối 8 hướng thành
+   thành phần liên thông bằng gán nhãn song song (móc gốc lớn vào gốc nhỏ
+   + nén đường đi bằng nhảy con trỏ), giữ thành phần có điểm "mạnh".
+"""
+from typing import Literal, Optional, Tuple
+
+import numpy as np
+
+from tien_ich.do_luong import do_buoc, do_ham
+
+from .cong_cu_chap import chap_2d, ho_tro_kenh_cuoi, KieuPadding
+from .nha_may_nhan import lay_nhan
+from .bien import (
+    nhan_sobel,
+    nhan_prewitt,
+    chuan_hoa_0_255_tai_cho,
+    _gauss_tren_mo_rong,
+    _tach_roi_theo_kieu,
+)
+from .co_dinh import chap_2d_nguyen, loc_gauss_co_dinh
+
+# Ranh giới lượng tử hướng: |Gy| <= tan(22.5°)|Gx| → ngang, >= tan(67.5°)|Gx| → dọc
+_TAN_22_5 = np.tan(np.pi / 8)
+_TAN_67_5 = np.tan(3 * np.pi / 8)
+
+# Lân cận theo hướng lượng tử (0 ngang, 1 dọc, 2 chéo chính, 3 chéo phụ)
+_LAN_CAN = (
+    ((0, -1), (0, 1)),
+    ((-1, 0), (1, 0)),
+    ((-1, -1), (1, 1)),
+    ((-1, 1), (1, -1)),
+)
+
+
+def _gradient_xy(
+    anh: np.ndarray,
+    loai: Literal["sobel", "prewitt"],
+    kieu_padding: KieuPadding,
+    gauss_truoc: Optional[Tuple[int, float]],
+) -> Tuple[np.ndarray, np.ndarray]:
+    if anh.dtype == np.uint8:
+        if gauss_truoc is not None:
+            anh = loc_gauss_co_dinh(anh, gauss_truoc[0], gauss_truoc[1], kieu_padding)
+        gx, gy = (nhan_sobel if loai == "sobel" else nhan_prewitt)(kieu=np.int32)
+        fx = chap_2d_nguyen(anh, gx, kieu_padding).astype(np.float32)
+        fy = chap_2d_nguyen(anh, gy, kieu_padding).astype(np.float32)
+        return fx, fy
+
+    if gauss_truoc is not None:
+        (cot_x, hang_x), (cot_y, hang_y) = lay_nhan(loai + "_tach")
+        min_mo_rong = _gauss_tren_mo_rong(anh, gauss_truoc[0], gauss_truoc[1], kieu_padding)
+        return (
+            _tach_roi_theo_kieu(min_mo_rong, cot_x, hang_x),
+            _tach_roi_theo_kieu(min_mo_rong, cot_y, hang_y),
+        )
+
+    gx, gy = nhan_sobel() if loai == "sobel" else nhan_prewitt()
+    return chap_2d(anh, gx, kieu_padding), chap_2d(anh, gy, kieu_padding)
+
+
+def huong_luong_tu(fx: np.ndarray, fy: np.ndarray) -> np.ndarray:
+    """Hướng gradient lượng tử (uint8): 0 ngang, 1 dọc, 2 chéo chính, 3 chéo phụ."""
+    ax = np.abs(fx)
+    ay = np.abs(fy)
+    khong_ngang = (ay > _TAN_22_5 * ax).view(np.uint8)
+    khong_doc = (ay < _TAN_67_5 * ax).view(np.uint8)
+    cheo_phu = (np.signbit(fx) ^ np.signbit(fy)).view(np.uint8)
+    # ngang → 0; dọc → 1; chéo → 2 + cheo_phu (số học uint8, không rẽ nhánh)
+    return khong_ngang * (1 + khong_doc * (1 + cheo_phu))
+
+
+@do_ham()
+def khu_khong_cuc_dai(do_lon: np.ndarray, huong: np.ndarray) -> np.ndarray:
+    """
+    Đặt 0 (tại chỗ) các điểm nhỏ hơn 1 trong 2 lân cận theo hướng gradient
+    (ngoài ảnh coi như 0). do_lon, huong: (..., H, W).
+    """
+    *_, H, W = do_lon.shape
+    le = ((0, 0),) * (do_lon.ndim - 2) + ((1, 1), (1, 1))
+    p = np.pad(do_lon, le)
+
+    def dich(di: int, dj: int) -> np.ndarray:
+        return p[..., 1 + di : 1 + di + H, 1 + dj : 1 + dj + W]
+
+    # Bit d = điểm là cực đại theo hướng d; lấy bit của đúng hướng mỗi điểm
+    bit = np.zeros(do_lon.shape, dtype=np.uint8)
+    for d, (a, b) in enumerate(_LAN_CAN):
+        cuc_dai = do_lon >= dich(*a)
+        cuc_dai &= do_lon >= dich(*b)
+        bit |= cuc_dai.view(np.uint8) << d
+    bit >>= huong
+    bit &= 1
+    do_lon[bit == 0] = 0
+    return do_lon
+
+
+def _gan_nhan_lien_thong(nhan: np.ndarray, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """
+    Nhãn thành phần liên thông (nhãn = chỉ số nhỏ nhất) của đồ thị có các
+    cạnh (u, v), xuất phát từ nhãn ban đầu `nhan` (rừng đã nén: nhan[i] <= i,
+    nhan[nhan[i]] = nhan[i]): mỗi vòng móc gốc lớn vào gốc nhỏ của mọi cạnh
+    còn nối 2 gốc khác nhau, rồi nhảy con trỏ tới khi mọi đỉnh trỏ vào gốc.
+    """
+    while u.size:
+        ru, rv = nhan[u], nhan[v]
+        khac = ru != rv
+        u, v, ru, rv = u[khac], v[khac], ru[khac], rv[khac]
+        if not u.size:
+            break
+        nho = np.minimum(ru, rv)
+        np.minimum.at(nhan, ru, nho)
+        np.minimum.at(nhan, rv, nho)
+        while True:
+            moi = nhan[nhan]
+            if np.array_equal(moi, nhan):
+                break
+            nhan = moi
+    return nhan
+
+
+@do_ham()
+def tre_nguong(anh_bien: np.ndarray, nguong_thap: float, nguong_cao: float) -> np.ndarray:
+    """
+    Ngưỡng kép có trễ trên ảnh biên đã khử không cực đại (..., H, W):
+    giữ điểm >= nguong_thap (và > 0) nối 8 hướng, qua các điểm như vậy, tới
+    ít nhất 1 điểm >= nguong_cao. Trả về uint8 0/255.
+    """
+    if nguong_thap > nguong_cao:
+        raise ValueError("Ngưỡng thấp phải nhỏ hơn hoặc bằng ngưỡng cao.")
+
+    yeu = (anh_bien >= nguong_thap) & (anh_bien > 0)
+    ket_qua = np.zeros(anh_bien.shape, dtype=np.uint8)
+    n = int(np.count_nonzero(yeu))
+    if n == 0:
+        return ket_qua
+
+    # Chỉ số đỉnh của mỗi điểm yếu trên lưới có lề -1 (mỗi ảnh của chồng có
+    # lề riêng → lân cận không tràn sang hàng / ảnh khác)
+    kieu_chi_so = np.int32 if n < 2**31 else np.int64
+    *_, H, W = anh_bien.shape
+    le = ((0, 0),) * (anh_bien.ndim - 2) + ((1, 1), (1, 1))
+    chi_so = np.pad(np.where(yeu, 0, -1).astype(kieu_chi_so), le, constant_values=-1)
+    phang = chi_so.reshape(-1)
+    vi_tri = np.flatnonzero(phang >= 0)
+    phang[vi_tri] = np.arange(n, dtype=kieu_chi_so)
+
+    # Đoạn liên tiếp trên 1 hàng có chỉ số liên tiếp → nhãn ban đầu = đầu đoạn
+    dau_doan = phang[vi_tri - 1] < 0
+    nhan = np.where(dau_doan, np.arange(n, dtype=kieu_chi_so), 0)
+    np.maximum.accumulate(nhan, out=nhan)
+
+    # Cạnh giữa 2 điểm yếu kề nhau: dưới, chéo xuống phải, chéo xuống trái
+    ds_u, ds_v = [], []
+    with do_buoc("tre_nguong_canh"):
+        for dj in (0, 1, -1):
+            lan_can = phang[vi_tri + (W + 2 + dj)]
+            co = lan_can >= 0
+            ds_u.append(np.flatnonzero(co).astype(kieu_chi_so))
+            ds_v.append(lan_can[co])
+
+    nhan = _gan_nhan_lien_thong(nhan, np.concatenate(ds_u), np.concatenate(ds_v))
+
+    manh = anh_bien[yeu] >= nguong_cao
+    co_diem_manh = np.zeros(n, dtype=bool)
+    co_diem_manh[nhan[manh]] = True
+    ket_qua[yeu] = co_diem_manh[nhan].view(np.uint8) * np.uint8(255)
+    return ket_qua
+
+
+@do_ham()
+@ho_tro_kenh_cuoi
+def dap_ung_canny(
+    anh_xam: np.ndarray,
+    kieu_padding: KieuPadding,
+    loai: Literal["sobel", "prewitt"] = "sobel",
+    gauss_truoc: Optional[Tuple[int, float]] = None,
+) -> np.ndarray:
+    """
+    Độ lớn gradient sau khử không cực đại, chuẩn hoá 0–255 (biên mảnh 1 điểm
+    ảnh, các điểm khác = 0). Nhị phân hoá bằng tre_nguong.
+    Ảnh uint8: Gx, Gy int32 chính xác, độ lớn float32 (như đường co_dinh).
+    """
+    fx, fy = _gradient_xy(anh_xam, loai, kieu_padding, gauss_truoc)
+    huong = huong_luong_tu(fx, fy)
+    do_lon = np.hypot(fx, fy, out=fx)
+    del fy
+
+    khu_khong_cuc_dai(do_lon, huong)
+    chuan_hoa_0_255_tai_cho(do_lon)
+    return do_lon
+
+
+@ho_tro_kenh_cuoi
+def bien_canny(
+    anh_xam: np.ndarray,
+    nguong_thap: float,
+    nguong_cao: float,
+    kieu_padding: KieuPadding,
+    loai: Literal["sobel", "prewitt"] = "sobel",
+    gauss_truoc: Optional[Tuple[int, float]] = None,
+) -> np.ndarray:
+    """
+    Biên Canny uint8 0/255; ngưỡng theo thang độ lớn đã chuẩn hoá 0–255.
+    gauss_truoc = (kích thước, sigma): làm mịn Gaussian trước (nên dùng).
+    """
+    return tre_nguong(
+        dap_ung_canny(anh_xam, kieu_padding, loai, gauss_truoc), nguong_thap, nguong_cao
+    )
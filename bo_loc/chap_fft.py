@@ -0,0 +1,96 @@
+# bo_loc/chap_fft.py
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+
+from .cong_cu_chap import them_le, KieuPadding
+
+# Số phổ kernel giữ lại trong bộ nhớ đệm (LRU)
+SO_PHO_TOI_DA = 32
+
+_bo_nho_pho: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+_khoa_pho = threading.Lock()
+
+
+def kich_thuoc_fft_nhanh(n: int) -> int:
+    """Số nhỏ nhất >= n chỉ có ước nguyên tố 2, 3, 5 (FFT nhanh nhất)."""
+    while True:
+        m = n
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 1
+
+
+def pho_nhan(nhan: np.ndarray, hinh_fft: Tuple[int, int]) -> np.ndarray:
+    """
+    Phổ rfft2 của kernel đã lật (tương quan = chập với kernel lật), có đệm.
+    Khoá đệm: (bytes kernel, kích thước FFT) → cùng 1 Gaussian dùng lại
+    giữa các request không phải biến đổi lại.
+    """
+    khoa = (nhan.tobytes(), nhan.shape, nhan.dtype.str, tuple(hinh_fft))
+    with _khoa_pho:
+        pho = _bo_nho_pho.get(khoa)
+        if pho is not None:
+            _bo_nho_pho.move_to_end(khoa)
+            return pho
+
+    pho = np.fft.rfft2(nhan[::-1, ::-1], s=hinh_fft)
+    pho.setflags(write=False)
+
+    with _khoa_pho:
+        _bo_nho_pho[khoa] = pho
+        while len(_bo_nho_pho) > SO_PHO_TOI_DA:
+            _bo_nho_pho.popitem(last=False)
+    return pho
+
+
+def xoa_bo_nho_pho() -> None:
+    """Xoá toàn bộ phổ kernel đã lưu."""
+    with _khoa_pho:
+        _bo_nho_pho.clear()
+
+
+def fft_tren_mo_rong(anh_mo_rong: np.ndarray, nhan: np.ndarray) -> np.ndarray:
+    """
+    Tương quan "valid" qua rfft2 trên ảnh đã thêm lề (không quấn vòng).
+    Ảnh (..., H + 2k, W + 2k): biến đổi 2 trục cuối, phổ kernel dùng chung.
+    """
+    ks = nhan.shape[0]
+    Hp, Wp = anh_mo_rong.shape[-2:]
+    H = Hp - ks + 1
+    W = Wp - ks + 1
+    hinh_fft = (kich_thuoc_fft_nhanh(Hp), kich_thuoc_fft_nhanh(Wp))
+
+    kieu = np.result_type(anh_mo_rong, nhan)
+    pho = pho_nhan(nhan.astype(kieu, copy=False), hinh_fft)
+    tich = np.fft.rfft2(anh_mo_rong.astype(kieu, copy=False), s=hinh_fft)
+    tich *= pho
+    day_du = np.fft.irfft2(tich, s=hinh_fft)
+
+    # Phần "valid": điểm (x, y) của kết quả nằm ở (x + ks - 1, y + ks - 1)
+    return day_du[..., ks - 1 : ks - 1 + H, ks - 1 : ks - 1 + W].astype(kieu)
+
+
+def chap_fft(anh: np.ndarray, nhan: np.ndarray, kieu_padding: KieuPadding) -> np.ndarray:
+    """
+    Tương quan 2D qua miền tần số (rfft2), cùng ngữ nghĩa với chap_2d.
+
+    - Thêm lề bằng them_le TRƯỚC khi biến đổi → tái tạo đúng biên
+      zero / replicate / reflect; phần còn lại là phép chập tuyến tính "valid"
+      nên không có hiện tượng quấn vòng.
+    - Sai số so với đường không gian tính bằng float64, |Δ| <= c · max|anh| · Σ|nhan|:
+      ảnh float64: c = 1e-12 (thực đo tới ~9e-16);
+      ảnh float32 (chính sách mặc định, biến đổi chạy ở độ chính xác đơn):
+      c = 1e-5 (thực đo tới ~4e-7, ảnh tới 1024², kernel tới 31x31).
+      tests/test_chap_khong_le.py giữ 2 cận này.
+    """
+    ks = nhan.shape[0]
+    assert ks == nhan.shape[1] and ks % 2 == 1, "Kernel phải vuông và lẻ."
+
+    anh_mo_rong = them_le(anh, ks // 2, kieu_padding)
+    return fft_tren_mo_rong(anh_mo_rong, nhan)
@@ -0,0 +1,71 @@
+# bo_loc/chap_ngoai.py
+"""
+Phương pháp chập dùng thư viện ngoài, chỉ đăng ký (dang_ky_phuong_phap) khi
+thư viện đã cài:
+- "scipy": scipy.ndimage.correlate (cả chồng trong 1 lần gọi).
+- "opencv": cv2.filter2D (từng ảnh 2D của chồng; ảnh float32 / float64).
+Ngữ nghĩa padding đổi sang tên tương ứng của thư viện (reflect của numpy =
+"mirror" của scipy = BORDER_REFLECT_101 của OpenCV).
+"""
+import numpy as np
+
+from tien_ich.do_luong import do_buoc
+
+from .cong_cu_chap import dang_ky_phuong_phap, KieuPadding
+
+try:
+    from scipy import ndimage
+except ImportError:
+    ndimage = None
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+_CHE_DO_SCIPY = {"zero": "constant", "replicate": "nearest", "reflect": "mirror"}
+
+
+def chap_scipy(anh: np.ndarray, nhan: np.ndarray, kieu_padding: KieuPadding) -> np.ndarray:
+    if kieu_padding not in _CHE_DO_SCIPY:
+        raise ValueError("Kiểu padding không hợp lệ.")
+    kieu = np.result_type(anh, nhan)
+    nhan_nd = nhan.astype(kieu, copy=False).reshape((1,) * (anh.ndim - 2) + nhan.shape)
+    with do_buoc("chap_scipy"):
+        return ndimage.correlate(
+            anh.astype(kieu, copy=False),
+            nhan_nd,
+            output=kieu,
+            mode=_CHE_DO_SCIPY[kieu_padding],
+            cval=0.0,
+        )
+
+
+def chap_opencv(anh: np.ndarray, nhan: np.ndarray, kieu_padding: KieuPadding) -> np.ndarray:
+    vien = {
+        "zero": cv2.BORDER_CONSTANT,
+        "replicate": cv2.BORDER_REPLICATE,
+        "reflect": cv2.BORDER_REFLECT_101,
+    }.get(kieu_padding)
+    if vien is None:
+        raise ValueError("Kiểu padding không hợp lệ.")
+    kieu = np.result_type(anh, nhan)
+    nhan = nhan.astype(kieu, copy=False)
+    *dau, H, W = anh.shape
+    chong = np.ascontiguousarray(anh, dtype=kieu).reshape(-1, H, W)
+    ket_qua = np.empty_like(chong)
+    with do_buoc("chap_opencv"):
+        for i in range(chong.shape[0]):
+            cv2.filter2D(chong[i], -1, nhan, dst=ket_qua[i], borderType=vien)
+    return ket_qua.reshape(*dau, H, W)
+
+
+if ndimage is not None:
+    dang_ky_phuong_phap("scipy", chap_scipy)
+
+if cv2 is not None:
+    dang_ky_phuong_phap(
+        "opencv",
+        chap_opencv,
+        lambda anh, nhan: np.result_type(anh, nhan) in (np.float32, np.float64),
+    )
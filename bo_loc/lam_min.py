@@ -1,65 +1,347 @@
 # bo_loc/lam_min.py
-from typing import Literal
+from typing import Dict, Literal, Optional
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
-from .cong_cu_chap import chap_2d, them_le, KieuPadding
+from .cong_cu_chap import chap_2d, them_le, ho_tro_kenh_cuoi, KieuPadding
+from .kieu_du_lieu import kieu_tinh_toan
+from .nha_may_nhan import lay_nhan
+from .tich_phan import BangTichPhan, tao_bang_tich_phan
+from .song_song import chay_song_song
+from .vung_lam_viec import VungLamViec
+from .jit_numba import dang_bat_jit, median_jit
+from tien_ich.do_luong import do_ham
 
 KieuPadding = Literal["zero", "replicate", "reflect"]
 
 
-def nhan_trung_binh(kich_thuoc: int) -> np.ndarray:
+def nhan_trung_binh(kich_thuoc: int, kieu: type = float) -> np.ndarray:
     """Tạo kernel trung bình (mean)."""
-    return np.ones((kich_thuoc, kich_thuoc), dtype=float) / float(
-        kich_thuoc * kich_thuoc
-    )
+    k = np.ones((kich_thuoc, kich_thuoc), dtype=float) / float(kich_thuoc * kich_thuoc)
+    return k.astype(kieu, copy=False)
 
 
-def nhan_gauss(kich_thuoc: int, sigma: float) -> np.ndarray:
-    """Tạo kernel Gaussian 2D, chuẩn hóa tổng = 1."""
-    assert kich_thuoc % 2 == 1, "Kích thước kernel Gaussian phải lẻ."
-
-    truc = np.arange(-(kich_thuoc // 2), kich_thuoc // 2 + 1, dtype=float)
-    xx, yy = np.meshgrid(truc, truc)
-    k = np.exp(-(xx**2 + yy**2) / (2.0 * sigma**2))
-    k /= k.sum()
-    return k
+def nhan_gauss(kich_thuoc: int, sigma: float, kieu: type = float) -> np.ndarray:
+    """Tạo kernel Gaussian 2D, chuẩn hóa tổng = 1 (bản sao ghi được, kiểu `kieu`)."""
+    return lay_nhan("gauss", kich_thuoc, sigma).astype(kieu)
 
 
+@do_ham()
+@ho_tro_kenh_cuoi
 def loc_trung_binh(
-    anh_xam: np.ndarray, kich_thuoc: int, kieu_padding: KieuPadding
+    anh_xam: np.ndarray,
+    kich_thuoc: int,
+    kieu_padding: KieuPadding,
+    bang: Optional[BangTichPhan] = None,
 ) -> np.ndarray:
-    """Lọc trung bình (mean filter)."""
-    k = nhan_trung_binh(kich_thuoc)
-    return chap_2d(anh_xam, k, kieu_padding)
+    """
+    Lọc trung bình (mean filter) bằng bảng tích phân: O(1) mỗi điểm ảnh,
+    không phụ thuộc kích thước kernel.
+    bang: bảng đã dựng sẵn (bán kính >= kich_thuoc // 2) để dùng lại; phải
+    dựng từ chính anh_xam với cùng kieu_padding (chỉ kiểm được kích thước).
+    """
+    assert kich_thuoc % 2 == 1, "Kích thước kernel Mean phải lẻ."
+    if bang is None:
+        bang = tao_bang_tich_phan(anh_xam, kich_thuoc // 2, kieu_padding)
+    bang.kiem_tra(anh_xam, kieu_padding)
+    return bang.trung_binh(kich_thuoc)
 
 
+@ho_tro_kenh_cuoi
 def loc_gauss(
-    anh_xam: np.ndarray, kich_thuoc: int, sigma: float, kieu_padding: KieuPadding
+    anh_xam: np.ndarray,
+    kich_thuoc: int,
+    sigma: float,
+    kieu_padding: KieuPadding,
+    out: Optional[np.ndarray] = None,
+    vung: Optional[VungLamViec] = None,
+) -> np.ndarray:
+    """
+    Lọc Gaussian (kernel lấy từ nhà máy kernel, không dựng lại mỗi lần).
+    out / vung: như chap_2d (ghi vào mảng có sẵn, bộ đệm từ vùng làm việc).
+    """
+    k = lay_nhan("gauss", kich_thuoc, sigma)
+    return chap_2d(anh_xam, k, kieu_padding, out=out, vung=vung)
+
+
+def _median_cua_so_truot(
+    anh_mo_rong: np.ndarray, kich_thuoc: int, H: int, W: int
 ) -> np.ndarray:
-    """Lọc Gaussian."""
-    k = nhan_gauss(kich_thuoc, sigma)
-    return chap_2d(anh_xam, k, kieu_padding)
+    """
+    Median của mọi cửa sổ kich_thuoc x kich_thuoc trên ảnh đã mở rộng.
+
+    Duyệt theo khối hàng: mỗi khối dựng cửa sổ trượt (so_hang, W, ks²) rồi
+    lấy phần tử giữa bằng np.partition (O(ks²) mỗi điểm, chạy trong C).
+    Chồng ảnh (..., H + 2k, W + 2k): nhiều ảnh nhỏ gộp chung 1 khối.
+    Kích thước lẻ nên median luôn là 1 phần tử của cửa sổ → kết quả trùng
+    bit với np.median.
+    """
+    so_pt = kich_thuoc * kich_thuoc
+    giua = so_pt // 2
+
+    # Dữ liệu dải uint8 (số nguyên 0–255) biểu diễn chính xác bằng float32:
+    # partition trên float32 nhanh hơn và nhẹ bộ nhớ hơn float64.
+    du_lieu = anh_mo_rong
+    if du_lieu.dtype != np.float32:
+        ban_32 = du_lieu.astype(np.float32)
+        if np.array_equal(ban_32, du_lieu):
+            du_lieu = ban_32
 
+    co_nan = bool(np.isnan(du_lieu).any())
 
+    *dau, Hp, Wp = du_lieu.shape
+    du_lieu = du_lieu.reshape(-1, Hp, Wp)
+    N = du_lieu.shape[0]
+
+    # Mỗi khối giữ khoảng 2^22 phần tử cửa sổ để bộ nhớ tạm không phụ thuộc H
+    so_hang = max(1, (1 << 22) // max(1, W * so_pt))
+    so_anh = max(1, so_hang // max(1, H))
+    ket_qua = np.empty((N, H, W), dtype=kieu_tinh_toan(anh_mo_rong))
+
+    for n in range(0, N, so_anh):
+        m = min(N, n + so_anh)
+        for i in range(0, H, so_hang):
+            j = min(H, i + so_hang)
+            cua_so = sliding_window_view(
+                du_lieu[n:m, i : j + kich_thuoc - 1],
+                (kich_thuoc, kich_thuoc),
+                axis=(-2, -1),
+            ).reshape(m - n, j - i, W, so_pt)
+            khoi = np.partition(cua_so, giua, axis=-1)[..., giua]
+            if co_nan:
+                # np.median trả NaN nếu cửa sổ có NaN
+                khoi = np.where(np.isnan(cua_so).any(axis=-1), np.nan, khoi)
+            ket_qua[n:m, i:j] = khoi
+
+    return ket_qua.reshape(*dau, H, W)
+
+
+@do_ham()
+@ho_tro_kenh_cuoi
 def loc_median(
-    anh_xam: np.ndarray, kich_thuoc: int, kieu_padding: KieuPadding
+    anh_xam: np.ndarray,
+    kich_thuoc: int,
+    kieu_padding: KieuPadding,
+    so_luong_luong: int = 1,
 ) -> np.ndarray:
     """
     Lọc median tự cài:
     - padding theo mode
-    - lấy median trong cửa sổ kích_thuoc x kích_thuoc
+    - lấy median trong cửa sổ kích_thuoc x kích_thuoc (vector hoá theo khối hàng)
+    - so_luong_luong > 1 (hoặc <= 0 = mọi lõi): chia ô chạy song song
+    - có numba: chọn Hoare trên từng cửa sổ, song song theo hàng (jit_numba)
     """
     assert kich_thuoc % 2 == 1, "Kích thước kernel Median phải lẻ."
 
+    if so_luong_luong != 1:
+        return chay_song_song(
+            loc_median,
+            anh_xam,
+            kich_thuoc // 2,
+            so_luong_luong,
+            kich_thuoc=kich_thuoc,
+            kieu_padding=kieu_padding,
+        )
+
     ban_kinh = kich_thuoc // 2
     anh_mo_rong = them_le(anh_xam, ban_kinh, kieu_padding)
-    H, W = anh_xam.shape
-    ket_qua = np.zeros((H, W), dtype=float)
+    H, W = anh_xam.shape[-2:]
+
+    if dang_bat_jit():
+        return median_jit(anh_mo_rong, kich_thuoc, H, W)
+    return _median_cua_so_truot(anh_mo_rong, kich_thuoc, H, W)
+
+
+# ---------------------------------------------------------------------------
+# Bilateral (song phương) giữ biên bằng lưới song phương (Chen, Paris, Durand):
+# mỗi điểm ảnh rải (splat) vào ô gần nhất của lưới 3D (hàng, cột, mức xám)
+# thưa hơn ảnh sigma lần mỗi trục, lưới được làm mờ Gaussian 3D rồi đọc lại
+# (slice) bằng nội suy tam tuyến tại (i, j, I(i, j)). Lưới có cỡ
+# ~ (H / sigma_khong_gian) · (W / sigma_khong_gian) · (dải mức xám / sigma_gia_tri)
+# → thời gian gần như không phụ thuộc sigma không gian (sigma lớn còn nhanh hơn).
+# Sigma nhỏ trên ảnh lớn làm lưới phình (σs=1, σr=5, 1024²: ~60 triệu ô) → lưới
+# bị chặn ở GIOI_HAN_BYTE_LUOI bằng cách giãn ô lưới (xấp xỉ thô hơn).
+# ---------------------------------------------------------------------------
+GIOI_HAN_BYTE_LUOI = 1 << 26
+
+
+def _lam_mo_truc(luoi: np.ndarray, g: np.ndarray, truc: int) -> np.ndarray:
+    """Tương quan luoi với vector g (độ dài 2r + 1) dọc trục `truc`, ngoài lưới = 0."""
+    r = g.shape[0] // 2
+    a = np.moveaxis(luoi, truc, 0)
+    ket_qua = a * g[r]
+    for t in range(1, r + 1):
+        ket_qua[t:] += g[r - t] * a[:-t]
+        ket_qua[:-t] += g[r + t] * a[t:]
+    return np.moveaxis(ket_qua, 0, truc)
 
-    for i in range(H):
-        for j in range(W):
-            cua_so = anh_mo_rong[i : i + kich_thuoc, j : j + kich_thuoc]
-            ket_qua[i, j] = float(np.median(cua_so))
 
+def _nhan_lam_mo_luoi(sigma_o: float) -> np.ndarray:
+    """Gaussian 1D sigma = sigma_o ô lưới, cắt ở 2 sigma (ít nhất 1 ô mỗi phía)."""
+    R = max(1, int(np.ceil(2 * sigma_o)))
+    g = np.exp(-0.5 * (np.arange(-R, R + 1) / sigma_o) ** 2)
+    return g / g.sum()
+
+
+def _luoi_song_phuong(
+    mo_rong: np.ndarray, k: int, sigma_khong_gian: float, sigma_gia_tri: float, lay_mau: int
+) -> np.ndarray:
+    """Bilateral 1 ảnh đã thêm lề k → ảnh (Hp - 2k, Wp - 2k) kiểu của mo_rong."""
+    Hp, Wp = mo_rong.shape
+    H, W = Hp - 2 * k, Wp - 2 * k
+    mn = float(mo_rong.min())
+    if np.isnan(mn):
+        raise ValueError("Lọc bilateral không hỗ trợ ảnh có NaN.")
+    sigma_kg = max(float(sigma_khong_gian), 1.0)
+    o_kg = sigma_kg / lay_mau  # cạnh ô lưới (điểm ảnh)
+    o_gt = float(sigma_gia_tri) / lay_mau  # cạnh ô lưới (mức xám)
+    dai_xam = float(mo_rong.max()) - mn
+
+    # Lưới (2 lớp float64) vượt GIOI_HAN_BYTE_LUOI → giãn ô lưới cả 3 trục cùng
+    # tỉ lệ (lấy mẫu thưa hơn, độ rộng làm mờ theo ô giảm tương ứng)
+    so_o_uoc = (Hp / o_kg + 1) * (Wp / o_kg + 1) * (dai_xam / o_gt + 1)
+    gian = max(1.0, (so_o_uoc * 16 / GIOI_HAN_BYTE_LUOI) ** (1 / 3))
+    o_kg *= gian
+    o_gt *= gian
+
+    # Làm mờ lưới: Gaussian sigma = sigma / cạnh ô; chừa R ô 0 mỗi phía
+    g_kg = _nhan_lam_mo_luoi(sigma_kg / o_kg)
+    g_gt = _nhan_lam_mo_luoi(float(sigma_gia_tri) / o_gt)
+    R, Rz = g_kg.shape[0] // 2, g_gt.shape[0] // 2
+    Gh = int(round((Hp - 1) / o_kg)) + 1 + 2 * R
+    Gw = int(round((Wp - 1) / o_kg)) + 1 + 2 * R
+    Gd = int(round(dai_xam / o_gt)) + 1 + 2 * Rz
+
+    # Splat: ô gần nhất, cộng (1, I) bằng bincount
+    ch = np.rint(np.arange(Hp) / o_kg).astype(np.int64) + R
+    cc = np.rint(np.arange(Wp) / o_kg).astype(np.int64) + R
+    cz = np.rint((mo_rong - mn) / o_gt).astype(np.int64) + Rz
+    chi_so = ((ch[:, None] * Gw + cc[None, :]) * Gd + cz).ravel()
+    so_o = Gh * Gw * Gd
+    luoi = np.stack(
+        [
+            np.bincount(chi_so, weights=mo_rong.ravel(), minlength=so_o),
+            np.bincount(chi_so, minlength=so_o).astype(np.float64),
+        ]
+    ).reshape(2, Gh, Gw, Gd)
+    del chi_so, cz
+
+    for truc, g in ((1, g_kg), (2, g_kg), (3, g_gt)):
+        luoi = _lam_mo_truc(luoi, g, truc)
+
+    # Slice: nội suy tam tuyến tại toạ độ lưới liên tục của điểm ảnh ra
+    vh = np.arange(k, k + H) / o_kg + R
+    vc = np.arange(k, k + W) / o_kg + R
+    vz = (mo_rong[k : k + H, k : k + W] - mn) / o_gt + Rz
+    h0 = np.floor(vh).astype(np.int64)
+    c0 = np.floor(vc).astype(np.int64)
+    z0 = np.floor(vz).astype(np.int64)
+    th, tc, tz = vh - h0, vc - c0, vz - z0
+    goc = (h0[:, None] * Gw + c0[None, :]) * Gd + z0
+
+    phang = luoi.reshape(2, -1)
+    tu = np.zeros((H, W))
+    mau = np.zeros((H, W))
+    for dh in (0, 1):
+        wh = (th if dh else 1.0 - th)[:, None]
+        for dc in (0, 1):
+            whc = wh * (tc if dc else 1.0 - tc)[None, :]
+            for dz in (0, 1):
+                w = whc * (tz if dz else 1.0 - tz)
+                chi_so = goc + (dh * Gw + dc) * Gd + dz
+                tu += w * phang[0].take(chi_so)
+                mau += w * phang[1].take(chi_so)
+    tu /= mau
+    return tu.astype(mo_rong.dtype, copy=False)
+
+
+@do_ham()
+@ho_tro_kenh_cuoi
+def loc_song_phuong(
+    anh_xam: np.ndarray,
+    sigma_khong_gian: float,
+    sigma_gia_tri: float,
+    kieu_padding: KieuPadding,
+    lay_mau: int = 1,
+) -> np.ndarray:
+    """
+    Lọc bilateral (giữ biên) xấp xỉ bằng lưới song phương: trọng số
+    exp(-d²/2σs²) theo khoảng cách × exp(-ΔI²/2σr²) theo chênh mức xám.
+    sigma_khong_gian σs (điểm ảnh, >= 1), sigma_gia_tri σr (mức xám).
+    lay_mau: số ô lưới trên mỗi sigma (mỗi trục). So với vét cạn trên
+    anh_nhieu.png (248×259, σs 2–5, σr 20–50): 1 → PSNR 40–46 dB, |Δ| trung
+    bình 0.9–1.8, lớn nhất tới 21 mức xám; 2 → PSNR 49–54 dB, trung bình
+    0.3–0.6, lớn nhất vẫn tới 23 (tại biên mạnh), chậm hơn 3–6 lần.
+    Lưới vượt GIOI_HAN_BYTE_LUOI (σ nhỏ trên ảnh lớn) thì ô lưới được giãn
+    để vừa giới hạn: bộ nhớ đỉnh ~4 lần giới hạn + vài mảng cỡ ảnh, đổi lại
+    sai số lớn hơn (248×259, σs 2, σr 10, ô giãn ~2.5 lần: PSNR 49 → 41 dB).
+    Ảnh được thêm lề ceil(3σs) theo kieu_padding như loc_song_phuong_vet_can.
+    uint8 giữ uint8 (làm tròn); số thực tính theo kieu_tinh_toan.
+    """
+    if sigma_khong_gian <= 0 or sigma_gia_tri <= 0 or lay_mau < 1:
+        raise ValueError("Tham số của bộ lọc bilateral không hợp lệ.")
+    k = int(np.ceil(3 * sigma_khong_gian))
+    *dau, H, W = anh_xam.shape
+    mo_rong = them_le(anh_xam.astype(kieu_tinh_toan(anh_xam), copy=False), k, kieu_padding)
+    chong = mo_rong.reshape(-1, H + 2 * k, W + 2 * k)
+    ket_qua = np.empty((chong.shape[0], H, W), dtype=mo_rong.dtype)
+    for n in range(chong.shape[0]):
+        ket_qua[n] = _luoi_song_phuong(
+            chong[n], k, sigma_khong_gian, sigma_gia_tri, int(lay_mau)
+        )
+    ket_qua = ket_qua.reshape(*dau, H, W)
+    if anh_xam.dtype == np.uint8:
+        return np.clip(np.rint(ket_qua), 0, 255).astype(np.uint8)
     return ket_qua
+
+
+@ho_tro_kenh_cuoi
+def loc_song_phuong_vet_can(
+    anh_xam: np.ndarray,
+    sigma_khong_gian: float,
+    sigma_gia_tri: float,
+    kieu_padding: KieuPadding,
+) -> np.ndarray:
+    """
+    Bilateral chính xác (tham chiếu): cửa sổ bán kính ceil(3σs), tính theo
+    từng độ dịch → O((6σs)²) mỗi điểm ảnh, chỉ dùng cho ảnh nhỏ. float64.
+    """
+    k = int(np.ceil(3 * sigma_khong_gian))
+    *_, H, W = anh_xam.shape
+    anh = anh_xam.astype(np.float64)
+    mo_rong = them_le(anh, k, kieu_padding)
+    tu = np.zeros_like(anh)
+    mau = np.zeros_like(anh)
+    for a in range(-k, k + 1):
+        for b in range(-k, k + 1):
+            lan_can = mo_rong[..., k + a : k + a + H, k + b : k + b + W]
+            w = np.exp(
+                -(a * a + b * b) / (2.0 * sigma_khong_gian**2)
+                - (lan_can - anh) ** 2 / (2.0 * sigma_gia_tri**2)
+            )
+            tu += w * lan_can
+            mau += w
+    return tu / mau
+
+
+def sai_so_song_phuong(
+    anh_xam: np.ndarray,
+    sigma_khong_gian: float,
+    sigma_gia_tri: float,
+    kieu_padding: KieuPadding,
+    lay_mau: int = 1,
+) -> Dict[str, float]:
+    """
+    Sai số của loc_song_phuong so với loc_song_phuong_vet_can trên cùng ảnh
+    (nên là ảnh nhỏ): {"max", "trung_binh" (|Δ| mức xám), "psnr" (dB, đỉnh 255)}.
+    """
+    xap_xi = loc_song_phuong(anh_xam, sigma_khong_gian, sigma_gia_tri, kieu_padding, lay_mau)
+    chuan = loc_song_phuong_vet_can(anh_xam, sigma_khong_gian, sigma_gia_tri, kieu_padding)
+    lech = np.abs(xap_xi.astype(np.float64) - chuan)
+    mse = float(np.mean(lech**2))
+    return {
+        "max": float(lech.max()),
+        "trung_binh": float(lech.mean()),
+        "psnr": float("inf") if mse == 0 else float(10.0 * np.log10(255.0**2 / mse)),
+    }
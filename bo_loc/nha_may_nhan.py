@@ -0,0 +1,108 @@
+# bo_loc/nha_may_nhan.py
+"""
+Nhà máy kernel có ghi nhớ: mỗi (loại, kích thước, sigma) chỉ dựng 1 lần,
+các lần sau trả lại đúng mảng đó (đã khoá ghi, không được sửa tại chỗ).
+
+Dạng tách rời của toán tử đạo hàm (dùng cho đạo hàm Gaussian / LoG gộp):
+- "sobel_tach" / "prewitt_tach": ((cot_x, hang_x), (cot_y, hang_y)),
+  Gx = outer(cot_x, hang_x), Gy = outer(cot_y, hang_y);
+- "laplacian_tach": ((cot_1, hang_1), (cot_2, hang_2)),
+  Laplacian = tổng 2 tích ngoài.
+"""
+from functools import lru_cache
+from typing import Literal
+
+import numpy as np
+
+LoaiNhan = Literal[
+    "trung_binh",
+    "gauss",
+    "gauss_1d",
+    "sobel",
+    "prewitt",
+    "laplacian",
+    "sobel_tach",
+    "prewitt_tach",
+    "laplacian_tach",
+]
+
+# Loại dùng sigma / dùng kích thước (còn lại là kernel 3x3 cố định)
+_CO_SIGMA = {"gauss", "gauss_1d"}
+_CO_KICH_THUOC = _CO_SIGMA | {"trung_binh"}
+
+# Thừa số 1D: làm trơn và đạo hàm bậc 1, bậc 2
+_LAM_TRON = {"sobel": np.array([1.0, 2.0, 1.0]), "prewitt": np.array([1.0, 1.0, 1.0])}
+_DAO_HAM_1 = np.array([-1.0, 0.0, 1.0])
+_DAO_HAM_2 = np.array([1.0, -2.0, 1.0])
+_DON_VI = np.array([0.0, 1.0, 0.0])
+
+
+def _ban_sao(x):
+    return x.copy() if isinstance(x, np.ndarray) else tuple(_ban_sao(y) for y in x)
+
+
+def _khoa_ghi(x):
+    if isinstance(x, np.ndarray):
+        x.setflags(write=False)
+    else:
+        for y in x:
+            _khoa_ghi(y)
+    return x
+
+
+def _gauss_1d(kich_thuoc: int, sigma: float) -> np.ndarray:
+    assert kich_thuoc % 2 == 1, "Kích thước kernel Gaussian phải lẻ."
+    truc = np.arange(-(kich_thuoc // 2), kich_thuoc // 2 + 1, dtype=float)
+    g = np.exp(-(truc**2) / (2.0 * sigma**2))
+    return g / g.sum()
+
+
+@lru_cache(maxsize=128)
+def _dung_nhan(loai: str, kich_thuoc: int, sigma: float):
+    if loai == "trung_binh":
+        assert kich_thuoc % 2 == 1, "Kích thước kernel Mean phải lẻ."
+        return np.full((kich_thuoc, kich_thuoc), 1.0 / (kich_thuoc * kich_thuoc))
+
+    if loai == "gauss_1d":
+        return _gauss_1d(kich_thuoc, sigma)
+
+    if loai == "gauss":
+        g = _gauss_1d(kich_thuoc, sigma)
+        k = np.outer(g, g)
+        return k / k.sum()
+
+    if loai in ("sobel", "prewitt"):
+        t = _LAM_TRON[loai]
+        return np.outer(t, _DAO_HAM_1), np.outer(_DAO_HAM_1, t)
+
+    if loai == "laplacian":
+        return np.outer(_DAO_HAM_2, _DON_VI) + np.outer(_DON_VI, _DAO_HAM_2)
+
+    if loai in ("sobel_tach", "prewitt_tach"):
+        t = _LAM_TRON[loai[:-5]]
+        return _ban_sao(((t, _DAO_HAM_1), (_DAO_HAM_1, t)))
+
+    if loai == "laplacian_tach":
+        return _ban_sao(((_DAO_HAM_2, _DON_VI), (_DON_VI, _DAO_HAM_2)))
+
+    raise ValueError("Loại kernel không hợp lệ.")
+
+
+def lay_nhan(loai: LoaiNhan, kich_thuoc: int = 3, sigma: float = 1.0):
+    """
+    Kernel (float64, chỉ đọc) theo loại:
+    - "trung_binh", "gauss", "laplacian": mảng 2D;
+    - "gauss_1d": vector 1D (outer(g, g) = "gauss");
+    - "sobel", "prewitt": (Gx, Gy);
+    - "sobel_tach", "prewitt_tach", "laplacian_tach": cặp thừa số 1D
+      (xem đầu module).
+    Tham số không dùng tới bị bỏ khỏi khoá ghi nhớ.
+    """
+    kich_thuoc = int(kich_thuoc) if loai in _CO_KICH_THUOC else 3
+    sigma = float(sigma) if loai in _CO_SIGMA else 0.0
+    return _khoa_ghi(_dung_nhan(loai, kich_thuoc, sigma))
+
+
+def xoa_bo_nho_nhan() -> None:
+    """Xoá các kernel đã ghi nhớ."""
+    _dung_nhan.cache_clear()
@@ -0,0 +1,129 @@
+# bo_loc/quy_trinh.py
+"""
+Quy trình lọc hoàn chỉnh dùng chung cho giao diện (ung_dung.py) và chế độ
+chạy lô (xu_ly_lo.py). Ảnh uint8 (chính sách "co_dinh") đi đường dấu phẩy
+tĩnh, ảnh số thực đi đường float theo kiểu của ảnh.
+"""
+from typing import Literal, Optional, Tuple
+
+import numpy as np
+
+from tien_ich.do_luong import do_ham
+
+from .cong_cu_chap import ho_tro_kenh_cuoi, KieuPadding
+from .lam_min import loc_trung_binh, loc_gauss, loc_median, loc_song_phuong
+from .bien import (
+    nhan_sobel,
+    nhan_prewitt,
+    bien_do_gradient,
+    bien_do_gradient_gauss,
+    dap_ung_laplacian,
+    dap_ung_log,
+    nhi_phan_hoa_bien,
+)
+from .canny import dap_ung_canny, tre_nguong
+from .co_dinh import (
+    loc_trung_binh_co_dinh,
+    loc_gauss_co_dinh,
+    bien_do_gradient_co_dinh,
+    dap_ung_laplacian_co_dinh,
+)
+
+LoaiLamMin = Literal["trung_binh", "gauss", "median", "song_phuong"]
+LoaiBien = Literal["sobel", "prewitt", "laplacian", "canny"]
+
+CAC_LOAI_LAM_MIN = ("trung_binh", "gauss", "median", "song_phuong")
+CAC_LOAI_BIEN = ("sobel", "prewitt", "laplacian", "canny")
+
+
+@do_ham()
+@ho_tro_kenh_cuoi
+def lam_min(
+    anh: np.ndarray,
+    loai: LoaiLamMin,
+    kich_thuoc: int,
+    sigma: float,
+    kieu_padding: KieuPadding,
+    sigma_gia_tri: float = 30.0,
+) -> np.ndarray:
+    """
+    Chạy 1 bộ lọc làm mịn (sigma chỉ dùng cho "gauss" và "song_phuong").
+    "song_phuong": bilateral giữ biên (lưới song phương), sigma là sigma không
+    gian, sigma_gia_tri là sigma theo mức xám; kich_thuoc không dùng.
+    anh (..., H, W) hoặc ảnh màu (..., H, W, C) với kenh_cuoi=True.
+    """
+    co_dinh = anh.dtype == np.uint8
+
+    if loai == "trung_binh":
+        ham = loc_trung_binh_co_dinh if co_dinh else loc_trung_binh
+        return ham(anh, kich_thuoc, kieu_padding)
+    if loai == "gauss":
+        ham = loc_gauss_co_dinh if co_dinh else loc_gauss
+        return ham(anh, kich_thuoc, sigma, kieu_padding)
+    if loai == "median":
+        return loc_median(anh, kich_thuoc, kieu_padding)
+    if loai == "song_phuong":
+        return loc_song_phuong(anh, sigma, sigma_gia_tri, kieu_padding)
+    raise ValueError("Loại bộ lọc làm mịn không hợp lệ.")
+
+
+@do_ham()
+@ho_tro_kenh_cuoi
+def bien_do(
+    anh: np.ndarray,
+    loai: LoaiBien,
+    kieu_padding: KieuPadding,
+    gauss_truoc: Optional[Tuple[int, float]] = None,
+    song_phuong_truoc: Optional[Tuple[float, float]] = None,
+) -> np.ndarray:
+    """
+    Ảnh biên mức xám đã chuẩn hoá 0–255 (độ lớn gradient, |Laplacian|, hoặc
+    với "canny": độ lớn Sobel sau khử không cực đại — nhị phân hoá bằng
+    nhi_phan_hoa với 2 ngưỡng).
+    gauss_truoc = (kích thước, sigma): làm mịn Gaussian trước — đường float
+    dùng toán tử gộp (đạo hàm Gaussian / LoG), đường uint8 lọc 2 bước.
+    song_phuong_truoc = (sigma không gian, sigma mức xám): lọc bilateral giữ
+    biên trước (trước cả Gaussian nếu có cả 2); uint8 vẫn giữ uint8.
+    """
+    if loai not in CAC_LOAI_BIEN:
+        raise ValueError("Loại bộ lọc biên không hợp lệ.")
+    if song_phuong_truoc is not None:
+        anh = loc_song_phuong(anh, song_phuong_truoc[0], song_phuong_truoc[1], kieu_padding)
+    if loai == "canny":
+        return dap_ung_canny(anh, kieu_padding, "sobel", gauss_truoc)
+
+    if anh.dtype == np.uint8:
+        if gauss_truoc is not None:
+            anh = loc_gauss_co_dinh(anh, gauss_truoc[0], gauss_truoc[1], kieu_padding)
+        if loai == "laplacian":
+            return dap_ung_laplacian_co_dinh(anh, kieu_padding)
+        nhan = nhan_sobel if loai == "sobel" else nhan_prewitt
+        return bien_do_gradient_co_dinh(anh, nhan(kieu=np.int32), kieu_padding)
+
+    if gauss_truoc is not None:
+        ks, sigma = gauss_truoc
+        if loai == "laplacian":
+            return dap_ung_log(anh, ks, sigma, kieu_padding)
+        return bien_do_gradient_gauss(anh, loai, ks, sigma, kieu_padding)
+
+    if loai == "laplacian":
+        return dap_ung_laplacian(anh, kieu_padding)
+    gx, gy = nhan_sobel() if loai == "sobel" else nhan_prewitt()
+    return bien_do_gradient(anh, gx, gy, kieu_padding)
+
+
+def nhi_phan_hoa(
+    anh_bien: np.ndarray,
+    loai: LoaiBien,
+    nguong: float,
+    nguong_thap: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Ảnh biên của bien_do → uint8 0/255. "canny": ngưỡng kép có trễ
+    (nguong là ngưỡng cao, nguong_thap mặc định nguong / 2, không vượt nguong);
+    loại khác: 1 ngưỡng (nguong_thap bị bỏ qua).
+    """
+    if loai == "canny":
+        thap = nguong / 2 if nguong_thap is None else min(nguong_thap, nguong)
+        return tre_nguong(anh_bien, thap, nguong)
+    return nhi_phan_hoa_bien(anh_bien, nguong)
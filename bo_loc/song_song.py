@@ -0,0 +1,166 @@
+# bo_loc/song_song.py
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Literal
+
+import numpy as np
+
+from .theo_dai import chia_dai
+
+CheDoSongSong = Literal["luong", "tien_trinh"]
+
+# Dải nhỏ hơn thế này thì chi phí điều phối lớn hơn phần tính toán
+SO_DONG_TOI_THIEU = 32
+
+
+def so_luong_luong_mac_dinh() -> int:
+    """Số luồng mặc định = số lõi CPU."""
+    return os.cpu_count() or 1
+
+
+def _so_dong_moi_o(H: int, so_luong_luong: int) -> int:
+    # Khoảng 2 ô mỗi luồng để cân tải khi các ô chạy nhanh chậm khác nhau
+    return max(SO_DONG_TOI_THIEU, -(-H // (2 * so_luong_luong)))
+
+
+def _o_tien_trinh(
+    ham: Callable[..., np.ndarray],
+    ten_vao: str,
+    hinh: tuple,
+    kieu_vao: str,
+    ten_ra: str,
+    kieu_ra: str,
+    o: tuple,
+    tham_so: dict,
+) -> None:
+    """Chạy 1 ô trong tiến trình con: đọc/ghi thẳng vào bộ nhớ chia sẻ."""
+    r0, r1, h0, h1 = o
+    shm_vao = shared_memory.SharedMemory(name=ten_vao)
+    shm_ra = shared_memory.SharedMemory(name=ten_ra)
+    try:
+        anh = np.ndarray(hinh, dtype=kieu_vao, buffer=shm_vao.buf)
+        ra = np.ndarray(hinh, dtype=kieu_ra, buffer=shm_ra.buf)
+        ra[..., r0:r1, :] = ham(anh[..., h0:h1, :], **tham_so)[..., r0 - h0 : r1 - h0, :]
+        del anh, ra
+    finally:
+        shm_vao.close()
+        shm_ra.close()
+
+
+def _chay_theo_luong(
+    ham: Callable[..., np.ndarray],
+    anh: np.ndarray,
+    cac_o: list,
+    so_luong_luong: int,
+    tham_so: dict,
+) -> np.ndarray:
+    ket_qua: list = [None]
+    khoa = threading.Lock()
+
+    def xu_ly_o(o: tuple) -> None:
+        r0, r1, h0, h1 = o
+        kq = ham(anh[..., h0:h1, :], **tham_so)[..., r0 - h0 : r1 - h0, :]
+        with khoa:
+            if ket_qua[0] is None:
+                ket_qua[0] = np.empty(anh.shape, dtype=kq.dtype)
+        ket_qua[0][..., r0:r1, :] = kq
+
+    with ThreadPoolExecutor(max_workers=so_luong_luong) as ex:
+        for f in [ex.submit(xu_ly_o, o) for o in cac_o]:
+            f.result()
+
+    return ket_qua[0]
+
+
+def _chay_theo_tien_trinh(
+    ham: Callable[..., np.ndarray],
+    anh: np.ndarray,
+    cac_o: list,
+    so_luong_luong: int,
+    tham_so: dict,
+) -> np.ndarray:
+    # Ô đầu chạy ngay ở tiến trình chính để biết kiểu dữ liệu kết quả
+    r0, r1, h0, h1 = cac_o[0]
+    o_dau = ham(anh[..., h0:h1, :], **tham_so)[..., r0 - h0 : r1 - h0, :]
+
+    shm_vao = shared_memory.SharedMemory(create=True, size=max(1, anh.nbytes))
+    shm_ra = shared_memory.SharedMemory(
+        create=True, size=max(1, anh.size * o_dau.dtype.itemsize)
+    )
+    try:
+        anh_chung = np.ndarray(anh.shape, dtype=anh.dtype, buffer=shm_vao.buf)
+        anh_chung[:] = anh
+        ra_chung = np.ndarray(anh.shape, dtype=o_dau.dtype, buffer=shm_ra.buf)
+        ra_chung[..., r0:r1, :] = o_dau
+
+        with ProcessPoolExecutor(max_workers=so_luong_luong) as ex:
+            tuong_lai = [
+                ex.submit(
+                    _o_tien_trinh,
+                    ham,
+                    shm_vao.name,
+                    anh.shape,
+                    anh.dtype.str,
+                    shm_ra.name,
+                    o_dau.dtype.str,
+                    o,
+                    tham_so,
+                )
+                for o in cac_o[1:]
+            ]
+            for f in tuong_lai:
+                f.result()
+
+        ket_qua = ra_chung.copy()
+        del anh_chung, ra_chung
+    finally:
+        shm_vao.close()
+        shm_vao.unlink()
+        shm_ra.close()
+        shm_ra.unlink()
+
+    return ket_qua
+
+
+def chay_song_song(
+    ham: Callable[..., np.ndarray],
+    anh: np.ndarray,
+    ban_kinh: int,
+    so_luong_luong: int,
+    che_do: CheDoSongSong = "luong",
+    **tham_so: Any,
+) -> np.ndarray:
+    """
+    Chạy bộ lọc cục bộ `ham(o_anh, **tham_so)` song song theo các ô (dải hàng)
+    có halo bán kính `ban_kinh`, ghép kết quả vào 1 mảng ra chung.
+    Chồng ảnh (..., H, W): chia theo trục hàng (-2), mỗi ô giữ cả chồng.
+
+    - "luong": ThreadPoolExecutor; các phép numpy nặng (einsum, partition,
+      nhân/cộng mảng, FFT) nhả GIL nên chạy song song thật. Mọi bộ lọc của
+      bo_loc (chap_2d, loc_median, bien_do_gradient, dap_ung_laplacian) chạy
+      chế độ này. Nhân numba giữ GIL nhưng đã song song bên trong (prange)
+      → các ô chạy lần lượt, mỗi ô dùng mọi lõi.
+    - "tien_trinh": ProcessPoolExecutor + shared_memory cho ảnh vào/ra, cho
+      hàm tự viết giữ GIL (vòng lặp Python thuần); không bộ lọc nào của
+      bo_loc cần tới. `ham` phải pickle được (hàm cấp module, không dùng
+      lambda); mỗi lần gọi tốn thêm chi phí tạo tiến trình và chép ảnh.
+
+    Mỗi điểm ra được tính từ đúng lân cận như khi chạy cả ảnh và các phép tính
+    theo điểm có thứ tự cộng cố định → kết quả trùng bit với đường nối tiếp.
+    (Chập FFT không theo điểm nên chap_2d không chia ô cho phương pháp này.)
+    """
+    if so_luong_luong <= 0:
+        so_luong_luong = so_luong_luong_mac_dinh()
+
+    H = anh.shape[-2]
+    cac_o = list(chia_dai(H, _so_dong_moi_o(H, so_luong_luong), ban_kinh))
+    if so_luong_luong == 1 or len(cac_o) == 1:
+        return ham(anh, **tham_so)
+
+    if che_do == "luong":
+        return _chay_theo_luong(ham, anh, cac_o, so_luong_luong, tham_so)
+    if che_do == "tien_trinh":
+        return _chay_theo_tien_trinh(ham, anh, cac_o, so_luong_luong, tham_so)
+    raise ValueError("Chế độ song song không hợp lệ.")
@@ -0,0 +1,65 @@
+# bo_loc/thap_anh.py
+"""
+Tháp ảnh nhiều độ phân giải (mỗi mức thu nhỏ 2 lần bằng trung bình khối
+2×2) để giao diện lọc nhanh 1 bản xem trước cỡ màn hình trước khi lọc ảnh
+đầy đủ.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from tien_ich.do_luong import do_ham
+
+from .cong_cu_chap import ho_tro_kenh_cuoi
+
+
+@ho_tro_kenh_cuoi
+def thu_nho_2(anh: np.ndarray) -> np.ndarray:
+    """
+    Thu nhỏ 2 lần mỗi chiều: trung bình khối 2×2 (bỏ hàng/cột lẻ cuối).
+    uint8 giữ uint8 (làm tròn), số thực giữ kiểu của ảnh. anh (..., H, W).
+    """
+    *_, H, W = anh.shape
+    a = anh[..., : H - H % 2, : W - W % 2]
+    if anh.dtype == np.uint8:
+        tong = a[..., 0::2, 0::2].astype(np.uint16)
+        tong += a[..., 1::2, 0::2]
+        tong += a[..., 0::2, 1::2]
+        tong += a[..., 1::2, 1::2]
+        tong += 2
+        tong >>= 2
+        return tong.astype(np.uint8)
+
+    kq = a[..., 0::2, 0::2] + a[..., 1::2, 0::2]
+    kq += a[..., 0::2, 1::2]
+    kq += a[..., 1::2, 1::2]
+    kq *= kq.dtype.type(0.25)
+    return kq
+
+
+@do_ham()
+def thap_anh(anh: np.ndarray, canh_nho_nhat: int = 256, kenh_cuoi: bool = False) -> List[np.ndarray]:
+    """
+    [ảnh gốc, 1/2, 1/4, ...]: thu nhỏ tới khi mức tiếp theo có cạnh dài
+    nhỏ hơn canh_nho_nhat. kenh_cuoi=True: ảnh màu (..., H, W, C).
+    """
+    thap = [anh]
+    while True:
+        H, W = thap[-1].shape[-3:-1] if kenh_cuoi else thap[-1].shape[-2:]
+        if max(H, W) // 2 < canh_nho_nhat or min(H, W) < 2:
+            return thap
+        thap.append(thu_nho_2(thap[-1], kenh_cuoi=kenh_cuoi))
+
+
+def chon_muc(
+    thap: List[np.ndarray], canh_man_hinh: int, kenh_cuoi: bool = False
+) -> Tuple[int, np.ndarray]:
+    """
+    Mức nhỏ nhất có cạnh dài >= canh_man_hinh (vẫn phủ kín khung hiển thị),
+    trả (mức, ảnh); mức k nhỏ hơn ảnh gốc 2^k lần.
+    """
+    for muc in range(len(thap) - 1, 0, -1):
+        hinh = thap[muc].shape[-3:-1] if kenh_cuoi else thap[muc].shape[-2:]
+        if max(hinh) >= canh_man_hinh:
+            return muc, thap[muc]
+    return 0, thap[0]
@@ -0,0 +1,202 @@
+# bo_loc/theo_dai.py
+import os
+import tempfile
+from typing import Callable, Iterator, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+try:
+    import tifffile
+except ImportError:
+    tifffile = None
+
+DUOI_ANH = [".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"]
+
+# Cỡ dải (số điểm ảnh) khi chép ảnh PIL đã giải mã sang memmap xám
+SO_DIEM_MOI_DAI_NGUON = 1 << 22
+# RAM tối đa cho 1 lần PIL giải mã cả ảnh (PNG/JPG/BMP); ảnh lớn hơn → dùng .npy
+GIOI_HAN_BYTE_GIAI_MA = 1 << 28
+
+
+def chia_dai(H: int, so_dong: int, ban_kinh: int) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    Chia H hàng thành các dải so_dong hàng, mỗi dải kèm phần đệm (halo) bán kính
+    ban_kinh lấy từ dữ liệu thật của ảnh.
+
+    Trả về (r0, r1, h0, h1): hàng kết quả [r0, r1) tính từ hàng vào [h0, h1).
+    Ở mép trên/dưới của ảnh không có halo → bộ lọc tự thêm lề như khi chạy cả ảnh.
+    """
+    assert so_dong > 0, "Số hàng mỗi dải phải dương."
+    for r0 in range(0, H, so_dong):
+        r1 = min(H, r0 + so_dong)
+        yield r0, r1, max(0, r0 - ban_kinh), min(H, r1 + ban_kinh)
+
+
+def _xam_8bit(dai: np.ndarray) -> np.ndarray:
+    """Dải (h, w, kênh) uint8 → xám 8-bit, cùng công thức convert("L") của PIL."""
+    if dai.shape[2] == 1:
+        return dai[:, :, 0]
+    r, g, b = (dai[:, :, k].astype(np.uint32) for k in range(3))
+    return ((r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16).astype(np.uint8)
+
+
+def _tiff_vao_npy(duong_dan: str, duong_dan_npy: str) -> bool:
+    """
+    Giải mã trang đầu của TIFF sang .npy xám từng strip / tile (tifffile).
+    Trả False (chưa ghi gì) nếu không có tifffile hoặc bố cục không hỗ trợ.
+    """
+    if tifffile is None:
+        return False
+    with tifffile.TiffFile(duong_dan) as tf:
+        trang = tf.pages[0]
+        if (
+            trang.dtype != np.uint8
+            or trang.imagedepth != 1
+            or (trang.samplesperpixel, trang.photometric) not in ((1, 1), (3, 2), (4, 2))
+            or (trang.samplesperpixel > 1 and trang.planarconfig != 1)
+        ):
+            return False
+
+        H, W = trang.imagelength, trang.imagewidth
+        anh = np.lib.format.open_memmap(duong_dan_npy, mode="w+", dtype=np.uint8, shape=(H, W))
+        if trang.is_memmappable:
+            # Không nén, liền mạch → đọc thẳng từ file, chỉ đổi sang xám theo dải
+            nguon = tifffile.memmap(duong_dan, page=0, mode="r").reshape(H, W, -1)
+            so_dong = max(1, SO_DIEM_MOI_DAI_NGUON // max(1, W))
+            for r0 in range(0, H, so_dong):
+                anh[r0 : r0 + so_dong] = _xam_8bit(nguon[r0 : r0 + so_dong])
+            del nguon
+        else:
+            for du_lieu, (_, _, r, c, _), _ in trang.segments(
+                maxworkers=1, buffersize=SO_DIEM_MOI_DAI_NGUON
+            ):
+                if du_lieu is None:
+                    continue
+                h = min(du_lieu.shape[1], H - r)
+                w = min(du_lieu.shape[2], W - c)
+                anh[r : r + h, c : c + w] = _xam_8bit(du_lieu[0, :h, :w])
+        anh.flush()
+    return True
+
+
+def _pil_vao_npy(duong_dan: str, duong_dan_npy: str, gioi_han_byte: int) -> None:
+    """PIL giải mã cả ảnh (nếu vừa gioi_han_byte) rồi chép sang .npy xám từng dải."""
+    try:
+        img = Image.open(duong_dan)
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"Ảnh quá lớn để giải mã bằng PIL ({e}); hãy đổi sang .npy.") from e
+
+    with img:
+        W, H = img.size
+        so_byte = W * H * (1 if img.mode in ("1", "L", "P") else 4)
+        if so_byte > gioi_han_byte:
+            raise ValueError(
+                f"Ảnh {W}x{H} cần {so_byte / 2**20:.0f} MiB RAM để giải mã "
+                f"(giới hạn {gioi_han_byte / 2**20:.0f} MiB); hãy đổi sang .npy"
+                + (" hoặc cài tifffile." if img.format == "TIFF" else ".")
+            )
+        anh = np.lib.format.open_memmap(duong_dan_npy, mode="w+", dtype=np.uint8, shape=(H, W))
+        so_dong = max(1, SO_DIEM_MOI_DAI_NGUON // max(1, W))
+        for r0 in range(0, H, so_dong):
+            r1 = min(H, r0 + so_dong)
+            anh[r0:r1] = np.asarray(img.crop((0, r0, W, r1)).convert("L"))
+        anh.flush()
+
+
+def mo_anh_nguon(
+    duong_dan: str,
+    thu_muc_tam: Optional[str] = None,
+    gioi_han_byte: int = GIOI_HAN_BYTE_GIAI_MA,
+) -> np.ndarray:
+    """
+    Mở ảnh nguồn dạng mảng 2D chỉ đọc, không nạp vào RAM nếu được:
+    - .npy → np.load(mmap_mode="r").
+    - TIFF 8-bit xám / RGB / RGBA (cần tifffile) → giải mã từng strip / tile
+      thẳng vào file .npy tạm (memmap): bộ nhớ đỉnh theo cỡ strip / tile của
+      file, không theo cỡ ảnh (TIFF không nén: đọc trực tiếp từ file).
+    - PNG/JPG/BMP (và TIFF còn lại) → PIL giải mã cả ảnh 1 lần (L: 1 byte /
+      điểm, RGB/RGBA: 4 byte / điểm) rồi chép sang memmap xám từng dải; ảnh
+      cần quá gioi_han_byte bị từ chối (ValueError) → hãy đổi sẵn sang .npy.
+    Giới hạn "bom giải nén" của PIL giữ nguyên; chương trình xử lý ảnh quét
+    lớn tự đặt Image.MAX_IMAGE_PIXELS 1 lần lúc khởi động (xem xu_ly_lo.py).
+    """
+    _, phu = os.path.splitext(duong_dan.lower())
+
+    if phu == ".npy":
+        anh = np.load(duong_dan, mmap_mode="r")
+        if anh.ndim != 2:
+            raise ValueError("File .npy phải là ma trận 2 chiều.")
+        return anh
+
+    if phu not in DUOI_ANH:
+        raise ValueError("Chỉ hỗ trợ ảnh PNG/JPG/BMP/TIF hoặc .npy.")
+
+    fd, duong_dan_tam = tempfile.mkstemp(suffix=".npy", dir=thu_muc_tam)
+    os.close(fd)
+    try:
+        if not (phu in (".tif", ".tiff") and _tiff_vao_npy(duong_dan, duong_dan_tam)):
+            _pil_vao_npy(duong_dan, duong_dan_tam, gioi_han_byte)
+    except BaseException:
+        os.remove(duong_dan_tam)
+        raise
+
+    # Mở lại chỉ đọc; file tạm bị xoá ngay (POSIX giữ dữ liệu tới khi unmap)
+    anh = np.load(duong_dan_tam, mmap_mode="r")
+    try:
+        os.remove(duong_dan_tam)
+    except OSError:
+        pass
+    return anh
+
+
+def xu_ly_theo_dai(
+    duong_dan_vao: str,
+    duong_dan_ra: str,
+    ham_loc: Callable[[np.ndarray], np.ndarray],
+    ban_kinh: int,
+    so_dong: int = 256,
+    chuan_hoa_0_255: bool = False,
+    kieu_ra: type = np.float32,
+) -> np.ndarray:
+    """
+    Lọc ảnh lớn theo từng dải hàng, ghi kết quả vào file .npy ánh xạ bộ nhớ.
+
+    ham_loc: hàm 1 tham số (ảnh xám float32 2D) → ảnh cùng kích thước, ví dụ
+             lambda a: loc_gauss(a, 15, 2.0, "reflect").
+    ban_kinh: bán kính ảnh hưởng của ham_loc (tổng bán kính nếu nối nhiều bộ lọc).
+    chuan_hoa_0_255: đưa kết quả về 0–255 theo min/max TOÀN ẢNH (lượt 2 trên file
+             ra) → với bien_do_gradient/dap_ung_laplacian hãy truyền
+             chuan_hoa_0_255=False vào ham_loc và bật cờ này ở đây.
+
+    Bộ nhớ đỉnh tỉ lệ với so_dong x W (dải + halo và các mảng tạm của bộ lọc),
+    không tỉ lệ với chiều cao ảnh. Trả về memmap kết quả (chế độ r+).
+    """
+    _, phu = os.path.splitext(duong_dan_ra.lower())
+    if phu != ".npy":
+        raise ValueError("File kết quả phải có đuôi .npy.")
+
+    nguon = mo_anh_nguon(duong_dan_vao, os.path.dirname(os.path.abspath(duong_dan_ra)))
+    H, W = nguon.shape
+
+    ket_qua = np.lib.format.open_memmap(
+        duong_dan_ra, mode="w+", dtype=kieu_ra, shape=(H, W)
+    )
+
+    mn, mx = np.inf, -np.inf
+    for r0, r1, h0, h1 in chia_dai(H, so_dong, ban_kinh):
+        dai = np.asarray(nguon[h0:h1], dtype=np.float32)
+        kq = ham_loc(dai)[r0 - h0 : r1 - h0]
+        ket_qua[r0:r1] = kq
+        if chuan_hoa_0_255:
+            mn = min(mn, float(kq.min()))
+            mx = max(mx, float(kq.max()))
+
+    if chuan_hoa_0_255 and mx > mn:
+        for r0 in range(0, H, so_dong):
+            dai = ket_qua[r0 : r0 + so_dong]
+            dai -= mn
+            dai *= 255.0 / (mx - mn)
+
+    ket_qua.flush()
+    return ket_qua
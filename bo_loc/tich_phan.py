@@ -0,0 +1,112 @@
+# bo_loc/tich_phan.py
+from typing import Optional
+
+import numpy as np
+
+from .cong_cu_chap import them_le, KieuPadding
+from .kieu_du_lieu import kieu_tinh_toan
+
+
+class BangTichPhan:
+    """
+    Bảng tổng tích luỹ (summed-area table / integral image) của ảnh đã thêm lề.
+
+    - Lề bán kính `ban_kinh` theo đúng them_le → dùng được cho mọi cửa sổ
+      vuông lẻ có bán kính <= ban_kinh, cùng ngữ nghĩa padding với chap_2d.
+    - Cộng dồn bằng float64 sau khi trừ giá trị trung bình ảnh (dịch gốc)
+      để giảm sai số khi lấy hiệu 4 góc trên ảnh lớn.
+    - Tổng mỗi cửa sổ chỉ cần 4 phép tra bảng: O(1) mỗi điểm ảnh, không phụ
+      thuộc kích thước cửa sổ.
+    - Kết quả trả về theo kieu_tinh_toan của ảnh vào (float32 → float32).
+    - Chồng ảnh (..., H, W): 1 bảng cho cả chồng, dịch gốc riêng từng ảnh.
+    """
+
+    def __init__(self, anh: np.ndarray, ban_kinh: int, kieu_padding: KieuPadding):
+        self.H, self.W = anh.shape[-2:]
+        self.ban_kinh = int(ban_kinh)
+        self.kieu_padding = kieu_padding
+        self.kieu_ra = kieu_tinh_toan(anh)
+
+        anh_mo_rong = them_le(anh.astype(np.float64), self.ban_kinh, kieu_padding)
+        self.goc = (
+            anh_mo_rong.mean(axis=(-2, -1), keepdims=True) if anh_mo_rong.size else 0.0
+        )
+        self._anh_lech = anh_mo_rong - self.goc
+
+        self.bang = self._tich_luy(self._anh_lech)
+        self._bang_binh_phuong: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _tich_luy(anh_mo_rong: np.ndarray) -> np.ndarray:
+        """S[a, b] = tổng anh_mo_rong[:a, :b] (thêm 1 hàng/cột 0 ở đầu)."""
+        *dau, h, w = anh_mo_rong.shape
+        bang = np.zeros((*dau, h + 1, w + 1), dtype=np.float64)
+        np.cumsum(anh_mo_rong, axis=-2, out=bang[..., 1:, 1:])
+        np.cumsum(bang[..., 1:, 1:], axis=-1, out=bang[..., 1:, 1:])
+        return bang
+
+    def kiem_tra(self, anh: np.ndarray, kieu_padding: KieuPadding) -> None:
+        """Bảng phải dựng từ ảnh cùng kích thước, cùng kiểu padding."""
+        assert anh.shape[-2:] == (self.H, self.W), "Bảng tích phân dựng cho ảnh khác kích thước."
+        assert kieu_padding == self.kieu_padding, "Bảng tích phân dựng với kiểu padding khác."
+
+    def _tong_tren_bang(self, bang: np.ndarray, kich_thuoc: int) -> np.ndarray:
+        assert kich_thuoc % 2 == 1, "Kích thước cửa sổ phải lẻ."
+        r = kich_thuoc // 2
+        assert r <= self.ban_kinh, "Cửa sổ lớn hơn lề của bảng tích phân."
+
+        H, W = self.H, self.W
+        d = self.ban_kinh - r
+        c = d + kich_thuoc
+        return (
+            bang[..., c : c + H, c : c + W]
+            - bang[..., d : d + H, c : c + W]
+            - bang[..., c : c + H, d : d + W]
+            + bang[..., d : d + H, d : d + W]
+        )
+
+    def tong(self, kich_thuoc: int) -> np.ndarray:
+        """Tổng giá trị trong cửa sổ kich_thuoc x kich_thuoc quanh mỗi điểm."""
+        n = kich_thuoc * kich_thuoc
+        tong = self._tong_tren_bang(self.bang, kich_thuoc) + self.goc * n
+        return tong.astype(self.kieu_ra, copy=False)
+
+    def trung_binh(self, kich_thuoc: int) -> np.ndarray:
+        """Trung bình cục bộ (tương đương chập với nhan_trung_binh)."""
+        n = kich_thuoc * kich_thuoc
+        tb = self._tong_tren_bang(self.bang, kich_thuoc) / n + self.goc
+        return tb.astype(self.kieu_ra, copy=False)
+
+    def phuong_sai(self, kich_thuoc: int) -> np.ndarray:
+        """
+        Phương sai cục bộ E[x²] - E[x]² trên cùng lề.
+        Bảng bình phương chỉ dựng ở lần gọi đầu rồi giữ lại.
+        """
+        if self._bang_binh_phuong is None:
+            self._bang_binh_phuong = self._tich_luy(self._anh_lech**2)
+
+        n = kich_thuoc * kich_thuoc
+        tb = self._tong_tren_bang(self.bang, kich_thuoc) / n
+        tb_bp = self._tong_tren_bang(self._bang_binh_phuong, kich_thuoc) / n
+        # Phương sai không đổi khi dịch gốc nên tính trực tiếp trên ảnh lệch
+        return np.maximum(tb_bp - tb**2, 0.0).astype(self.kieu_ra, copy=False)
+
+
+def tao_bang_tich_phan(
+    anh: np.ndarray, ban_kinh: int, kieu_padding: KieuPadding
+) -> BangTichPhan:
+    """Dựng bảng tích phân dùng lại cho mọi cửa sổ bán kính <= ban_kinh."""
+    return BangTichPhan(anh, ban_kinh, kieu_padding)
+
+
+def phuong_sai_cuc_bo(
+    anh_xam: np.ndarray,
+    kich_thuoc: int,
+    kieu_padding: KieuPadding,
+    bang: Optional[BangTichPhan] = None,
+) -> np.ndarray:
+    """Phương sai trong cửa sổ kich_thuoc x kich_thuoc quanh mỗi điểm."""
+    if bang is None:
+        bang = tao_bang_tich_phan(anh_xam, kich_thuoc // 2, kieu_padding)
+    bang.kiem_tra(anh_xam, kieu_padding)
+    return bang.phuong_sai(kich_thuoc)
@@ -0,0 +1,217 @@
+# bo_loc/tu_chinh_chap.py
+"""
+Tự chỉnh phương pháp chập: với mỗi nhóm cấu hình (số phần tử ảnh làm tròn
+lên lũy thừa 2, kích thước kernel, kernel tách được hay không, kiểu ảnh,
+kiểu padding) đo mọi phương pháp đã đăng ký (cong_cu_chap.cac_phuong_phap),
+loại phương pháp sai khác tham chiếu (einsum float64) quá dung sai, ghi
+phương pháp nhanh nhất ra tệp JSON; chap_2d(phuong_phap="tu_dong") tra bảng
+này trước khi dùng ngưỡng cố định của chon_phuong_phap.
+
+- Tệp: BO_LOC_TEP_TU_CHINH hoặc ~/.cache/bo_loc/tu_chinh.json. Bảng chỉ được
+  dùng khi đo trên cùng môi trường (numpy, số lõi, các phương pháp có sẵn).
+- Đo trước cả lưới: tu_chinh_luoi(...) hoặc `python do_toc_do.py --tu-chinh`.
+- bat_tu_chinh(True) (hoặc BO_LOC_TU_CHINH=1): nhóm chưa có trong bảng được
+  đo ngay ở lần gọi đầu tiên (lần đó chậm hơn), rồi ghi lại tệp.
+"""
+import json
+import logging
+import os
+import platform
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .cong_cu_chap import (
+    cac_phuong_phap,
+    chap_2d,
+    chap_tren_mo_rong,
+    tach_nhan,
+    them_le,
+    KieuPadding,
+)
+from .jit_numba import dang_bat_jit
+from .kieu_du_lieu import kieu_tinh_toan
+from .nha_may_nhan import lay_nhan
+
+nhat_ky = logging.getLogger("bo_loc.tu_chinh")
+
+TEP_MAC_DINH = os.environ.get("BO_LOC_TEP_TU_CHINH") or os.path.join(
+    os.path.expanduser("~"), ".cache", "bo_loc", "tu_chinh.json"
+)
+
+# Sai số cho phép so với tham chiếu, tương đối với max|ảnh|·Σ|kernel|:
+# HE_SO_DUNG_SAI · ks · eps(kiểu) (đo: <= 0.4·ks·eps với mọi phương pháp)
+HE_SO_DUNG_SAI = 16
+
+_TU_CHINH_KHI_THIEU = os.environ.get("BO_LOC_TU_CHINH", "") not in ("", "0")
+_bang: Optional[Dict[str, Dict[str, Any]]] = None
+_khoa = threading.Lock()
+# Chỉ 1 phép đo chạy cùng lúc (các yêu cầu đồng thời làm sai thời gian đo)
+_khoa_do = threading.Lock()
+
+
+def bat_tu_chinh(bat: bool = True) -> None:
+    """Bật/tắt đo ngay các nhóm cấu hình chưa có trong bảng."""
+    global _TU_CHINH_KHI_THIEU
+    _TU_CHINH_KHI_THIEU = bool(bat)
+
+
+def _moi_truong() -> Dict[str, Any]:
+    return {
+        "numpy": np.__version__,
+        "may": platform.machine(),
+        "so_loi": os.cpu_count(),
+        "phuong_phap": sorted(cac_phuong_phap()),
+        "jit_numba": dang_bat_jit(),
+    }
+
+
+def khoa_cau_hinh(anh: np.ndarray, nhan: np.ndarray, kieu_padding: KieuPadding) -> str:
+    """Khoá nhóm, ví dụ "262144|5|tach|float32|reflect"."""
+    nhom = 1 << max(0, int(anh.size) - 1).bit_length()
+    tach = "tach" if tach_nhan(nhan) is not None else "khong_tach"
+    return f"{nhom}|{nhan.shape[0]}|{tach}|{anh.dtype.name}|{kieu_padding}"
+
+
+def tai_bang(duong_dan: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Đọc bảng từ tệp (rỗng nếu chưa có, hỏng, hoặc đo ở môi trường khác)."""
+    global _bang
+    bang: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(duong_dan or TEP_MAC_DINH, encoding="utf-8") as f:
+            du_lieu = json.load(f)
+        if du_lieu.get("moi_truong") == _moi_truong():
+            bang = du_lieu.get("bang", {})
+    except (OSError, ValueError):
+        pass
+    with _khoa:
+        _bang = bang
+    return bang
+
+
+def luu_bang(duong_dan: Optional[str] = None) -> str:
+    """Ghi bảng hiện tại ra tệp (ghi tệp tạm rồi đổi tên), trả đường dẫn."""
+    duong_dan = duong_dan or TEP_MAC_DINH
+    with _khoa:
+        du_lieu = {"moi_truong": _moi_truong(), "bang": dict(_bang or {})}
+    os.makedirs(os.path.dirname(os.path.abspath(duong_dan)), exist_ok=True)
+    tam = f"{duong_dan}.{os.getpid()}.tmp"
+    with open(tam, "w", encoding="utf-8") as f:
+        json.dump(du_lieu, f, ensure_ascii=False, indent=1)
+    os.replace(tam, duong_dan)
+    return duong_dan
+
+
+def sai_so_tuong_doi(
+    anh: np.ndarray, nhan: np.ndarray, kieu_padding: KieuPadding, phuong_phap: str
+) -> float:
+    """max|kết quả - tham chiếu einsum float64| / (max|ảnh|·Σ|kernel|)."""
+    nhan = nhan.astype(kieu_tinh_toan(anh), copy=False)
+    tham_chieu = chap_tren_mo_rong(
+        them_le(anh.astype(np.float64), nhan.shape[0] // 2, kieu_padding),
+        nhan.astype(np.float64),
+        "einsum",
+    )
+    ket_qua = chap_2d(anh, nhan, kieu_padding, phuong_phap)
+    if ket_qua.shape != tham_chieu.shape:
+        return float("inf")
+    thang = float(np.abs(anh).max()) * float(np.abs(nhan).sum())
+    sai = np.abs(ket_qua.astype(np.float64) - tham_chieu)
+    if not np.isfinite(sai).all():
+        return float("inf")
+    return float(sai.max()) / max(thang, 1e-30)
+
+
+def tu_chinh(
+    anh: np.ndarray,
+    nhan: np.ndarray,
+    kieu_padding: KieuPadding,
+    so_lap: int = 3,
+    luu: bool = True,
+) -> str:
+    """
+    Đo mọi phương pháp dùng được cho (anh, nhan, kieu_padding), kiểm tra chéo
+    với tham chiếu, ghi phương pháp nhanh nhất vào bảng (và tệp nếu luu).
+    """
+    nhan = nhan.astype(kieu_tinh_toan(anh), copy=False)
+    khoa = khoa_cau_hinh(anh, nhan, kieu_padding)
+    dung_sai = HE_SO_DUNG_SAI * nhan.shape[0] * float(np.finfo(kieu_tinh_toan(anh)).eps)
+
+    giay: Dict[str, float] = {}
+    loai_bo: Dict[str, str] = {}
+    for ten in cac_phuong_phap(anh, nhan):
+        try:
+            sai = sai_so_tuong_doi(anh, nhan, kieu_padding, ten)  # cũng là lần khởi động
+        except Exception as e:
+            loai_bo[ten] = f"{type(e).__name__}: {e}"
+            continue
+        if not sai <= dung_sai:
+            loai_bo[ten] = f"sai số {sai:.3g} > {dung_sai:.3g}"
+            nhat_ky.warning("%s: bỏ %s (%s)", khoa, ten, loai_bo[ten])
+            continue
+        thoi_gian = []
+        for _ in range(so_lap):
+            t = time.perf_counter()
+            chap_2d(anh, nhan, kieu_padding, ten)
+            thoi_gian.append(time.perf_counter() - t)
+        giay[ten] = min(thoi_gian)
+
+    if not giay:
+        raise ValueError("Không có phương pháp chập nào qua kiểm tra chéo.")
+    tot_nhat = min(giay, key=giay.get)
+
+    if _bang is None:
+        tai_bang()
+    with _khoa:
+        _bang[khoa] = {"phuong_phap": tot_nhat, "giay": giay, "loai_bo": loai_bo}
+    if luu:
+        luu_bang()
+    return tot_nhat
+
+
+def phuong_phap_da_chinh(
+    anh: np.ndarray, nhan: np.ndarray, kieu_padding: KieuPadding
+) -> Optional[str]:
+    """Phương pháp đã đo cho nhóm cấu hình của (anh, nhan); None nếu chưa đo."""
+    bang = _bang if _bang is not None else tai_bang()
+    if not bang and not _TU_CHINH_KHI_THIEU:
+        return None
+
+    muc = bang.get(khoa_cau_hinh(anh, nhan, kieu_padding))
+    if muc is None:
+        if not _TU_CHINH_KHI_THIEU:
+            return None
+        with _khoa_do:
+            return tu_chinh(anh, nhan, kieu_padding)
+    if muc["phuong_phap"] not in cac_phuong_phap(anh, nhan):
+        return None
+    return muc["phuong_phap"]
+
+
+def tu_chinh_luoi(
+    kich_thuoc: List[int],
+    cac_ks: List[int],
+    padding: List[str],
+    kieu: List[str],
+    so_lap: int = 3,
+    duong_dan: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Đo trước cả lưới cấu hình (ảnh vuông ngẫu nhiên; mỗi ks 1 kernel tách
+    được — Gaussian — và 1 kernel không tách được), ghi tệp, trả bảng.
+    """
+    rng = np.random.default_rng(0)
+    for n in kich_thuoc:
+        goc = rng.random((n, n)) * 255.0
+        for k in kieu:
+            anh = goc.astype(k)
+            for ks in cac_ks:
+                cac_nhan = (lay_nhan("gauss", ks, ks / 4.0), rng.standard_normal((ks, ks)))
+                for nhan in cac_nhan:
+                    for p in padding:
+                        tot = tu_chinh(anh, nhan, p, so_lap, luu=False)
+                        nhat_ky.info("%s → %s", khoa_cau_hinh(anh, nhan, p), tot)
+    luu_bang(duong_dan)
+    return dict(_bang)
@@ -0,0 +1,37 @@
+# bo_loc/vung_lam_viec.py
+"""
+Vùng làm việc: các bộ đệm đặt tên được cấp 1 lần rồi dùng lại giữa các lần
+gọi (ảnh có lề, mảng trung gian của chập tách rời, Gx / Gy, ...). Chuỗi khung
+hình cùng kích thước chỉ cấp phát ở khung đầu tiên.
+
+Mỗi vùng chỉ dùng cho 1 luồng tại 1 thời điểm (bộ đệm bị ghi đè mỗi lần gọi).
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+class VungLamViec:
+    """Bộ đệm dùng lại theo (tên, hình dạng, kiểu)."""
+
+    def __init__(self):
+        self._bo_dem: Dict[Tuple[str, Tuple[int, ...], str], np.ndarray] = {}
+        self.so_lan_cap_phat = 0
+
+    def lay(self, ten: str, hinh: Tuple[int, ...], kieu) -> np.ndarray:
+        """Bộ đệm `ten` hình `hinh`, kiểu `kieu` (chưa có thì cấp; nội dung bất kỳ)."""
+        khoa = (ten, tuple(int(n) for n in hinh), np.dtype(kieu).str)
+        bo_dem = self._bo_dem.get(khoa)
+        if bo_dem is None:
+            bo_dem = np.empty(khoa[1], dtype=kieu)
+            self._bo_dem[khoa] = bo_dem
+            self.so_lan_cap_phat += 1
+        return bo_dem
+
+    @property
+    def tong_byte(self) -> int:
+        return sum(b.nbytes for b in self._bo_dem.values())
+
+    def xoa(self) -> None:
+        """Bỏ mọi bộ đệm (ví dụ khi đổi độ phân giải)."""
+        self._bo_dem.clear()
@@ -0,0 +1,345 @@
+# do_toc_do.py
+"""
+Đo tốc độ và bộ nhớ đỉnh các toán tử bo_loc / tien_ich.io_anh, lưu thành
+baseline JSON và so sánh với baseline cũ (chặn hồi quy).
+
+Ví dụ:
+    python do_toc_do.py --luu baseline.json
+    python do_toc_do.py --kich-thuoc 256 512 1024 2048 4096 --luu day_du.json
+    python do_toc_do.py --so-sanh baseline.json --nguong 0.15   # mã thoát 1 nếu chậm hơn
+    python do_toc_do.py --ket-qua moi.json --so-sanh baseline.json
+    python do_toc_do.py --tu-chinh --ham chap_2d   # đo & lưu phương pháp chập tốt nhất
+    python do_toc_do.py --song-phuong --ham loc_song_phuong   # + sai số so với vét cạn
+    python do_toc_do.py --song-song --ham loc_median   # + tăng tốc đa lõi (ảnh 2048²)
+
+Mỗi cấu hình (hàm, kích thước ảnh, ks, padding, kiểu) chạy 1 lần khởi động rồi
+--lap lần đo; ghi thời gian nhỏ nhất và trung vị. Bộ nhớ đỉnh đo bằng
+tracemalloc ở 1 lần chạy riêng (numpy báo cấp phát mảng cho tracemalloc).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from bo_loc import (
+    loc_trung_binh,
+    loc_gauss,
+    loc_median,
+    loc_song_phuong,
+    sai_so_song_phuong,
+    bien_do_gradient,
+    dap_ung_laplacian,
+    bien_canny,
+    nhan_sobel,
+    lay_nhan,
+    dang_bat_jit,
+    tu_chinh_luoi,
+)
+from bo_loc.cong_cu_chap import chap_2d
+from tien_ich import luu_png, luu_csv
+
+KICH_THUOC_MAC_DINH = [256, 512, 1024]
+KS_MAC_DINH = [3, 5, 9, 15]
+PADDING_MAC_DINH = ["reflect", "replicate", "zero"]
+KIEU_MAC_DINH = ["float32", "float64"]
+
+
+def _xoa_tep(duong_dan: str) -> None:
+    os.remove(duong_dan)
+
+
+# Tên → (hàm dựng phép đo từ (ảnh, ks, padding), có dùng ks, có dùng padding)
+PHEP_DO: Dict[str, Tuple[Callable[..., Callable[[], Any]], bool, bool]] = {
+    "chap_2d": (lambda a, ks, p: lambda: chap_2d(a, lay_nhan("gauss", ks, 1.5), p), True, True),
+    "loc_trung_binh": (lambda a, ks, p: lambda: loc_trung_binh(a, ks, p), True, True),
+    "loc_gauss": (lambda a, ks, p: lambda: loc_gauss(a, ks, 1.5, p), True, True),
+    "loc_median": (lambda a, ks, p: lambda: loc_median(a, ks, p), True, True),
+    # trục ks dùng làm sigma không gian: thời gian gần như không đổi theo ks
+    "loc_song_phuong": (lambda a, ks, p: lambda: loc_song_phuong(a, ks, 30.0, p), True, True),
+    "bien_do_gradient": (
+        lambda a, ks, p: lambda: bien_do_gradient(a, *nhan_sobel(), p),
+        False,
+        True,
+    ),
+    "dap_ung_laplacian": (lambda a, ks, p: lambda: dap_ung_laplacian(a, p), False, True),
+    "bien_canny": (lambda a, ks, p: lambda: bien_canny(a, 20, 50, p), False, True),
+    "luu_png": (lambda a, ks, p: lambda: _xoa_tep(luu_png(a)), False, False),
+    "luu_csv": (lambda a, ks, p: lambda: _xoa_tep(luu_csv(a)), False, False),
+}
+
+
+def khoa_cau_hinh(kq: Dict[str, Any]) -> str:
+    """Khoá so sánh của 1 kết quả, ví dụ "loc_gauss|1024|5|reflect|float32"."""
+    return "|".join(str(kq[k]) for k in ("ham", "kich_thuoc", "ks", "padding", "kieu"))
+
+
+def cac_cau_hinh(
+    ham: List[str],
+    kich_thuoc: List[int],
+    cac_ks: List[int],
+    padding: List[str],
+    kieu: List[str],
+) -> Iterator[Tuple[str, int, Optional[int], Optional[str], str]]:
+    """Quét mọi tổ hợp; bỏ trục ks/padding với hàm không dùng tới."""
+    for n in kich_thuoc:
+        for k in kieu:
+            for ten in ham:
+                _, dung_ks, dung_padding = PHEP_DO[ten]
+                for ks in cac_ks if dung_ks else [None]:
+                    for p in padding if dung_padding else [None]:
+                        yield ten, n, ks, p, k
+
+
+def do_mot(ham: Callable[[], Any], so_lap: int) -> Tuple[float, float, int]:
+    """(giây nhỏ nhất, giây trung vị, byte cấp phát đỉnh) của ham()."""
+    ham()  # khởi động: kernel ghi nhớ, phổ FFT, trang bộ nhớ
+
+    thoi_gian = []
+    for _ in range(so_lap):
+        t = time.perf_counter()
+        ham()
+        thoi_gian.append(time.perf_counter() - t)
+
+    tracemalloc.start()
+    try:
+        ham()
+        _, dinh = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(thoi_gian), float(np.median(thoi_gian)), int(dinh)
+
+
+def chay_do(
+    ham: List[str],
+    kich_thuoc: List[int],
+    cac_ks: List[int],
+    padding: List[str],
+    kieu: List[str],
+    so_lap: int,
+) -> Dict[str, Any]:
+    """Chạy toàn bộ phép quét, trả dict JSON-hoá được."""
+    rng = np.random.default_rng(0)
+    anh_goc: Dict[int, np.ndarray] = {}
+    ket_qua = []
+
+    for ten, n, ks, p, k in cac_cau_hinh(ham, kich_thuoc, cac_ks, padding, kieu):
+        if n not in anh_goc:
+            anh_goc[n] = rng.random((n, n)) * 255.0
+        anh = anh_goc[n].astype(k)
+
+        giay_min, giay_tv, dinh = do_mot(PHEP_DO[ten][0](anh, ks, p), so_lap)
+        kq = {
+            "ham": ten,
+            "kich_thuoc": n,
+            "ks": ks,
+            "padding": p,
+            "kieu": k,
+            "giay_min": giay_min,
+            "giay_trung_vi": giay_tv,
+            "bo_nho_dinh_byte": dinh,
+        }
+        ket_qua.append(kq)
+        print(
+            f"{khoa_cau_hinh(kq):<44} {giay_min * 1000.0:10.2f} ms"
+            f" {dinh / 2**20:9.1f} MiB",
+            flush=True,
+        )
+
+    return {
+        "may": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "he_dieu_hanh": platform.platform(),
+            "bo_xu_ly": platform.processor() or platform.machine(),
+            "so_loi": os.cpu_count(),
+            "jit_numba": dang_bat_jit(),
+        },
+        "so_lap": so_lap,
+        "ket_qua": ket_qua,
+    }
+
+
+def so_sanh(
+    moi: Dict[str, Any],
+    goc: Dict[str, Any],
+    nguong: float,
+    sai_so_tuyet_doi: float,
+) -> List[str]:
+    """
+    So sánh theo giay_min các cấu hình có ở cả 2 lần đo.
+    Hồi quy: chậm hơn quá (1 + nguong) lần VÀ hơn sai_so_tuyet_doi giây
+    (bỏ qua dao động của phép đo rất ngắn). Trả danh sách khoá bị hồi quy.
+    """
+    cu = {khoa_cau_hinh(kq): kq for kq in goc["ket_qua"]}
+    hoi_quy = []
+
+    if moi.get("may") != goc.get("may"):
+        print("Lưu ý: baseline đo trên máy/môi trường khác:", goc.get("may"))
+
+    print(f"\n{'cấu hình':<44} {'gốc ms':>10} {'mới ms':>10} {'tỉ lệ':>7}")
+    for kq in moi["ket_qua"]:
+        khoa = khoa_cau_hinh(kq)
+        if khoa not in cu:
+            continue
+        t0, t1 = cu[khoa]["giay_min"], kq["giay_min"]
+        ti_le = t1 / t0 if t0 > 0 else float("inf")
+        cham = ti_le > 1.0 + nguong and t1 - t0 > sai_so_tuyet_doi
+        if cham:
+            hoi_quy.append(khoa)
+        print(
+            f"{khoa:<44} {t0 * 1000.0:10.2f} {t1 * 1000.0:10.2f} {ti_le:7.2f}"
+            + ("  << CHẬM" if cham else "")
+        )
+
+    return hoi_quy
+
+
+def bao_cao_song_phuong(
+    kich_thuoc: int = 96,
+    cac_sigma_kg: Tuple[float, ...] = (2.0, 4.0, 8.0),
+    cac_sigma_gt: Tuple[float, ...] = (15.0, 30.0, 60.0),
+) -> None:
+    """
+    In sai số loc_song_phuong (lay_mau 1 và 2) so với bilateral vét cạn trên
+    ảnh nhỏ tổng hợp: các bậc mức xám + dốc tuyến tính + nhiễu Gauss σ = 8.
+    """
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[:kich_thuoc, :kich_thuoc]
+    anh = np.where(x < kich_thuoc // 2, 60.0, 190.0) + np.where(y < kich_thuoc // 3, 30.0, 0.0)
+    anh += 0.3 * y + rng.normal(0.0, 8.0, anh.shape)
+    anh = np.clip(anh, 0, 255).astype(np.float32)
+
+    print(f"\nBilateral: sai số so với vét cạn trên ảnh {kich_thuoc}² (mức xám 0–255)")
+    print(f"{'σs':>5} {'σr':>5} {'lấy mẫu':>8} {'max':>8} {'tb':>8} {'PSNR dB':>8}")
+    for sigma_kg in cac_sigma_kg:
+        for sigma_gt in cac_sigma_gt:
+            for lay_mau in (1, 2):
+                ss = sai_so_song_phuong(anh, sigma_kg, sigma_gt, "reflect", lay_mau)
+                print(
+                    f"{sigma_kg:5.1f} {sigma_gt:5.0f} {lay_mau:8d} {ss['max']:8.2f}"
+                    f" {ss['trung_binh']:8.3f} {ss['psnr']:8.1f}"
+                )
+
+
+def bao_cao_song_song(kich_thuoc: int = 2048, so_lap: int = 3) -> None:
+    """
+    In thời gian và hệ số tăng tốc khi chia ô chạy song song (so_luong_luong
+    1, 2, 4, ... tới số lõi) so với 1 luồng, ảnh float32 kich_thuoc².
+    """
+    rng = np.random.default_rng(0)
+    anh = (rng.random((kich_thuoc, kich_thuoc)) * 255.0).astype(np.float32)
+    gx, gy = nhan_sobel()
+    nhan = lay_nhan("gauss", 9, 1.5)
+    phep = {
+        "chap_2d einsum ks9": lambda n: chap_2d(anh, nhan, "reflect", "einsum", n),
+        "loc_median ks5": lambda n: loc_median(anh, 5, "reflect", n),
+        "bien_do_gradient": lambda n: bien_do_gradient(anh, gx, gy, "reflect", True, n),
+    }
+    so_loi = os.cpu_count() or 1
+    cac_so_luong = [1]
+    while cac_so_luong[-1] * 2 <= so_loi:
+        cac_so_luong.append(cac_so_luong[-1] * 2)
+    if cac_so_luong[-1] != so_loi:
+        cac_so_luong.append(so_loi)
+
+    print(f"\nSong song theo ô: ảnh {kich_thuoc}² float32, {so_loi} lõi")
+    print(f"{'phép':<22} {'luồng':>6} {'ms':>10} {'tăng tốc':>9}")
+    for ten, ham in phep.items():
+        goc = None
+        for n in cac_so_luong:
+            giay, _, _ = do_mot(lambda: ham(n), so_lap)
+            goc = goc or giay
+            print(f"{ten:<22} {n:6d} {giay * 1000.0:10.1f} {goc / giay:8.2f}x")
+
+
+def tao_tham_so() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Đo tốc độ bo_loc và chặn hồi quy.")
+    p.add_argument("--ham", nargs="+", choices=list(PHEP_DO), default=list(PHEP_DO))
+    p.add_argument("--kich-thuoc", nargs="+", type=int, default=KICH_THUOC_MAC_DINH)
+    p.add_argument("--ks", nargs="+", type=int, default=KS_MAC_DINH)
+    p.add_argument("--padding", nargs="+", choices=PADDING_MAC_DINH, default=PADDING_MAC_DINH)
+    p.add_argument("--kieu", nargs="+", choices=KIEU_MAC_DINH, default=KIEU_MAC_DINH)
+    p.add_argument("--lap", type=int, default=5, help="Số lần đo mỗi cấu hình")
+    p.add_argument("--luu", help="Ghi kết quả ra file JSON (baseline)")
+    p.add_argument("--ket-qua", help="Dùng kết quả đã lưu thay vì đo lại")
+    p.add_argument("--so-sanh", help="Baseline JSON để so sánh")
+    p.add_argument(
+        "--tu-chinh",
+        action="store_true",
+        help="Trước khi đo: tự chỉnh phương pháp chập trên lưới --kich-thuoc × --ks"
+        " × --padding × --kieu, ghi tệp tự chỉnh (xem bo_loc/tu_chinh_chap.py)",
+    )
+    p.add_argument(
+        "--song-phuong",
+        action="store_true",
+        help="In sai số bộ lọc bilateral (lưới song phương) so với bản vét cạn trên ảnh nhỏ",
+    )
+    p.add_argument(
+        "--song-song",
+        action="store_true",
+        help="In hệ số tăng tốc khi chia ô chạy song song (1 luồng → mọi lõi)",
+    )
+    p.add_argument(
+        "--nguong",
+        type=float,
+        default=0.10,
+        help="Tỉ lệ chậm hơn cho phép (0.10 = 10%%)",
+    )
+    p.add_argument(
+        "--sai-so-tuyet-doi",
+        type=float,
+        default=0.002,
+        help="Chênh lệch tối thiểu (giây) mới tính là hồi quy",
+    )
+    return p
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = tao_tham_so().parse_args(argv)
+
+    if args.tu_chinh:
+        bang = tu_chinh_luoi(args.kich_thuoc, args.ks, args.padding, args.kieu, args.lap)
+        print(f"{'nhóm cấu hình':<40} {'phương pháp':>12} {'ms':>9}")
+        for khoa, muc in bang.items():
+            ms = muc["giay"][muc["phuong_phap"]] * 1000.0
+            print(f"{khoa:<40} {muc['phuong_phap']:>12} {ms:9.2f}")
+            for ten, ly_do in muc["loai_bo"].items():
+                print(f"    bỏ {ten}: {ly_do}")
+
+    if args.song_phuong:
+        bao_cao_song_phuong()
+
+    if args.song_song:
+        bao_cao_song_song()
+
+    if args.ket_qua:
+        with open(args.ket_qua, encoding="utf-8") as f:
+            moi = json.load(f)
+    else:
+        moi = chay_do(args.ham, args.kich_thuoc, args.ks, args.padding, args.kieu, args.lap)
+
+    if args.luu:
+        with open(args.luu, "w", encoding="utf-8") as f:
+            json.dump(moi, f, ensure_ascii=False, indent=1)
+
+    if args.so_sanh:
+        with open(args.so_sanh, encoding="utf-8") as f:
+            goc = json.load(f)
+        hoi_quy = so_sanh(moi, goc, args.nguong, args.sai_so_tuyet_doi)
+        if hoi_quy:
+            print(f"\n{len(hoi_quy)} cấu hình chậm hơn ngưỡng {args.nguong:.0%}.", file=sys.stderr)
+            return 1
+        print("\nKhông có hồi quy.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# tests/test_bien_gauss.py
+"""Toán tử gộp Gaussian + đạo hàm trùng đường 2 bước (loc_gauss rồi Sobel/Prewitt/Laplacian)."""
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from bo_loc import (
+    bien_do_gradient,
+    bien_do_gradient_gauss,
+    dap_ung_laplacian,
+    dap_ung_log,
+    nhan_prewitt,
+    nhan_sobel,
+)
+from bo_loc.lam_min import loc_gauss
+
+ANH_MAU = os.path.join(os.path.dirname(__file__), os.pardir, "anh_nhieu.png")
+SAI_SO = {np.float32: 1e-2, np.float64: 1e-9}
+
+
+def _anh_mau(kieu):
+    return np.asarray(Image.open(ANH_MAU).convert("L")).astype(kieu)
+
+
+def _hai_buoc(anh, loai, ks, sigma, kieu_padding):
+    min_ = loc_gauss(anh, ks, sigma, kieu_padding)
+    if loai == "log":
+        return dap_ung_laplacian(min_, kieu_padding)
+    gx, gy = nhan_sobel() if loai == "sobel" else nhan_prewitt()
+    return bien_do_gradient(min_, gx, gy, kieu_padding)
+
+
+def _gop(anh, loai, ks, sigma, kieu_padding, so_luong_luong=1):
+    if loai == "log":
+        return dap_ung_log(anh, ks, sigma, kieu_padding, so_luong_luong=so_luong_luong)
+    return bien_do_gradient_gauss(
+        anh, loai, ks, sigma, kieu_padding, so_luong_luong=so_luong_luong
+    )
+
+
+@pytest.mark.parametrize("kieu", [np.float32, np.float64])
+@pytest.mark.parametrize("kieu_padding", ["zero", "replicate", "reflect"])
+@pytest.mark.parametrize("loai", ["sobel", "prewitt", "log"])
+def test_chuan_hoa_trung_hai_buoc(loai, kieu_padding, kieu):
+    anh = _anh_mau(kieu)
+    chuan = _hai_buoc(anh, loai, 5, 1.0, kieu_padding)
+    for so_luong_luong in (1, 4):
+        kq = _gop(anh, loai, 5, 1.0, kieu_padding, so_luong_luong)
+        np.testing.assert_allclose(kq, chuan, rtol=0, atol=SAI_SO[kieu])
+
+
+@pytest.mark.parametrize("kieu_padding", ["zero", "replicate", "reflect"])
+def test_anh_nho(kieu_padding):
+    rng = np.random.default_rng(0)
+    for H, W in [(1, 5), (2, 7), (6, 3)]:
+        anh = rng.random((H, W)) * 255
+        for loai in ("sobel", "log"):
+            np.testing.assert_allclose(
+                _gop(anh, loai, 5, 1.0, kieu_padding),
+                _hai_buoc(anh, loai, 5, 1.0, kieu_padding),
+                rtol=0,
+                atol=1e-9,
+            )
@@ -0,0 +1,23 @@
+# tests/test_bo_nho_dem.py
+import numpy as np
+
+from tien_ich import BoNhoDemLRU
+
+
+def test_dat_khong_khoa_ghi_mang_nguoi_goi():
+    dem = BoNhoDemLRU(1 << 20)
+    a = np.zeros((4, 4), dtype=np.float32)
+    b = np.ones(3)
+    luu = dem.dat("k", (a, b))
+    assert a.flags.writeable and b.flags.writeable
+    assert not luu[0].flags.writeable and not luu[1].flags.writeable
+    trung = dem.lay("k")
+    assert not trung[0].flags.writeable
+    np.testing.assert_array_equal(trung[0], a)
+
+
+def test_lay_hoac_tinh_tra_ban_chi_doc_ca_khi_truot():
+    dem = BoNhoDemLRU(1 << 20)
+    truot = dem.lay_hoac_tinh("k", lambda: np.arange(5))
+    trung = dem.lay_hoac_tinh("k", lambda: np.arange(5))
+    assert not truot.flags.writeable and not trung.flags.writeable
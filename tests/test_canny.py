@@ -0,0 +1,138 @@
+# tests/test_canny.py
+"""Canny vector hoá so với bản tham chiếu từng điểm: NMS theo arctan, trễ ngưỡng bằng BFS."""
+from collections import deque
+
+import numpy as np
+import pytest
+
+from bo_loc.canny import huong_luong_tu, khu_khong_cuc_dai, tre_nguong
+
+# Hướng (độ, gập về [0, 180)) → 2 lân cận; trục hàng hướng xuống nên góc
+# 45° (fx, fy cùng dấu) là chéo chính (-1, -1) / (1, 1)
+_LAN_CAN_GOC = (
+    (22.5, ((0, -1), (0, 1))),
+    (67.5, ((-1, -1), (1, 1))),
+    (112.5, ((-1, 0), (1, 0))),
+    (157.5, ((-1, 1), (1, -1))),
+    (180.0, ((0, -1), (0, 1))),
+)
+
+
+def _nms_goc(fx, fy):
+    """Khử không cực đại từng điểm: góc arctan2, ngoài ảnh = 0, bằng nhau vẫn giữ."""
+    do_lon = np.hypot(fx, fy)
+    H, W = do_lon.shape
+    ket_qua = np.zeros_like(do_lon)
+    for i in range(H):
+        for j in range(W):
+            goc = np.degrees(np.arctan2(fy[i, j], fx[i, j])) % 180.0
+            lan_can = next(lc for tran, lc in _LAN_CAN_GOC if goc < tran)
+            giu = True
+            for di, dj in lan_can:
+                a, b = i + di, j + dj
+                ben = do_lon[a, b] if 0 <= a < H and 0 <= b < W else 0.0
+                giu &= do_lon[i, j] >= ben
+            ket_qua[i, j] = do_lon[i, j] if giu else 0.0
+    return ket_qua
+
+
+def _tre_nguong_goc(anh, thap, cao):
+    """Trễ ngưỡng bằng BFS 8 hướng từ các điểm mạnh, từng ảnh riêng."""
+    yeu = (anh >= thap) & (anh > 0)
+    ket_qua = np.zeros(anh.shape, dtype=np.uint8)
+    H, W = anh.shape
+    hang_doi = deque(zip(*np.nonzero(yeu & (anh >= cao))))
+    for i, j in hang_doi:
+        ket_qua[i, j] = 255
+    while hang_doi:
+        i, j = hang_doi.popleft()
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                a, b = i + di, j + dj
+                if 0 <= a < H and 0 <= b < W and yeu[a, b] and not ket_qua[a, b]:
+                    ket_qua[a, b] = 255
+                    hang_doi.append((a, b))
+    return ket_qua
+
+
+def _nms(fx, fy):
+    return khu_khong_cuc_dai(np.hypot(fx, fy), huong_luong_tu(fx, fy))
+
+
+@pytest.mark.parametrize("hat_giong", range(4))
+def test_nms_trung_ban_goc(hat_giong):
+    rng = np.random.default_rng(hat_giong)
+    fx, fy = rng.normal(size=(2, 23, 31))
+    np.testing.assert_array_equal(_nms(fx, fy), _nms_goc(fx, fy))
+
+
+def test_nms_bang_nhau_giu_ca_hai():
+    # Gradient nguyên nhỏ → nhiều điểm bằng nhau (kể cả vùng phẳng, gradient 0)
+    rng = np.random.default_rng(7)
+    fx, fy = rng.integers(-2, 3, size=(2, 25, 25)).astype(np.float64)
+    np.testing.assert_array_equal(_nms(fx, fy), _nms_goc(fx, fy))
+    # Đường ngang dày 2 điểm có độ lớn bằng nhau: cả 2 hàng được giữ
+    fx = np.zeros((6, 6))
+    fy = np.zeros((6, 6))
+    fy[2:4] = 1.0
+    assert np.count_nonzero(_nms(fx, fy)) == 12
+
+
+def test_nms_chong_anh_khong_tran_sang_anh_khac():
+    rng = np.random.default_rng(3)
+    fx, fy = rng.normal(size=(2, 3, 9, 11))
+    kq = _nms(fx, fy)
+    for n in range(3):
+        np.testing.assert_array_equal(kq[n], _nms_goc(fx[n], fy[n]))
+
+
+@pytest.mark.parametrize("mat_do", [0.2, 0.45, 0.6])
+def test_tre_nguong_trung_bfs(mat_do):
+    rng = np.random.default_rng(int(mat_do * 100))
+    anh = rng.random((40, 53)) * 255
+    anh[rng.random(anh.shape) > mat_do] = 0
+    for thap, cao in ((50, 200), (100, 100), (0, 250), (30, 240)):
+        np.testing.assert_array_equal(tre_nguong(anh, thap, cao), _tre_nguong_goc(anh, thap, cao))
+
+
+def test_tre_nguong_chi_noi_cheo():
+    anh = np.zeros((12, 12))
+    idx = np.arange(10)
+    anh[idx + 1, idx + 1] = 60.0  # đường chéo chính, chỉ nối theo góc
+    anh[1, 1] = 200.0
+    anh[np.arange(8) + 2, 9 - np.arange(8)] = 60.0  # chéo phụ không có điểm mạnh riêng
+    kq = tre_nguong(anh, 50, 150)
+    np.testing.assert_array_equal(kq, _tre_nguong_goc(anh, 50, 150))
+    assert kq[10, 10] == 255  # cuối đường chéo chính
+    assert kq[2, 9] == 255  # chéo phụ cắt chéo chính → nối qua
+
+
+def test_tre_nguong_duong_ran_nhieu_vong_gan_nhan():
+    # Đường rắn uốn khúc: nhãn nhỏ nhất phải lan qua nhiều vòng móc gốc
+    anh = np.zeros((21, 21))
+    anh[::4, 1:20] = 80.0
+    for r in range(0, 17, 4):
+        cot = 19 if (r // 4) % 2 == 0 else 1
+        anh[r : r + 5, cot] = 80.0
+    anh[20, 19] = 255.0  # điểm mạnh duy nhất ở cuối đường
+    kq = tre_nguong(anh, 50, 150)
+    np.testing.assert_array_equal(kq, _tre_nguong_goc(anh, 50, 150))
+    assert kq[0, 1] == 255
+
+
+def test_tre_nguong_chong_anh_va_mep_hang():
+    rng = np.random.default_rng(11)
+    anh = rng.random((3, 15, 17)) * 255
+    anh[rng.random(anh.shape) > 0.5] = 0
+    # Điểm yếu ở cột cuối ảnh 0 và cột đầu hàng kế tiếp / ảnh kế tiếp không được nối
+    anh[0, 4, -1] = 255.0
+    anh[0, 5, 0] = 60.0
+    anh[1, 0, 0] = 60.0
+    kq = tre_nguong(anh, 50, 200)
+    for n in range(3):
+        np.testing.assert_array_equal(kq[n], _tre_nguong_goc(anh[n], 50, 200))
+
+
+def test_tre_nguong_thap_lon_hon_cao_bao_loi():
+    with pytest.raises(ValueError):
+        tre_nguong(np.ones((3, 3)), 10, 5)
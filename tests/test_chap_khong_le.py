@@ -0,0 +1,98 @@
+# tests/test_chap_khong_le.py
+"""
+chap_2d không thêm lề cả ảnh (chap_khong_le) và chia ô song song không đổi kết quả;
+FFT trong cận sai số theo kiểu dữ liệu.
+"""
+import numpy as np
+import pytest
+
+from bo_loc import bien_do_gradient, nhan_prewitt, nhan_sobel
+from bo_loc.cong_cu_chap import chap_2d, chap_tren_mo_rong, einsum_tren_mo_rong, them_le
+from bo_loc.lam_min import nhan_gauss
+from bo_loc.vung_lam_viec import VungLamViec
+
+PHUONG_PHAP = ["einsum", "tach_roi", "cong_don", "fft"]
+# Cận sai số tương đối của FFT (docstring chap_fft): |Δ| <= c · max|anh| · Σ|nhan|
+SAI_SO_FFT = {np.dtype(np.float32): 1e-5, np.dtype(np.float64): 1e-12}
+PADDING = ["zero", "replicate", "reflect"]
+
+
+def _anh(H, W, kieu=np.float32):
+    rng = np.random.default_rng(H * 1000 + W)
+    return (rng.random((H, W)) * 255).astype(kieu)
+
+
+def _cac_nhan():
+    # Gaussian, Sobel tách được; kernel ngẫu nhiên chỉ cho einsum / cong_don / fft
+    yield nhan_gauss(5, 1.2)
+    yield nhan_sobel()[0]
+    yield np.random.default_rng(1).random((7, 7))
+
+
+def _kiem_tra(anh, nhan, kieu_padding, phuong_phap, so_luong_luong=1):
+    if phuong_phap == "tach_roi" and np.linalg.matrix_rank(nhan) != 1:
+        return
+    k = nhan.shape[0] // 2
+    mo_rong = them_le(anh, k, kieu_padding)
+    kq = chap_2d(anh, nhan, kieu_padding, phuong_phap=phuong_phap, so_luong_luong=so_luong_luong)
+    # Trùng bit với cùng phương pháp trên ảnh thêm lề cả ảnh
+    np.testing.assert_array_equal(kq, chap_tren_mo_rong(mo_rong, nhan, phuong_phap))
+    # ... và với them_le + einsum (tach_roi / cong_don: khác thứ tự cộng → sai số làm
+    # tròn; fft: so với einsum float64 trong cận SAI_SO_FFT)
+    chuan = einsum_tren_mo_rong(mo_rong, nhan.astype(kq.dtype))
+    if phuong_phap == "einsum":
+        np.testing.assert_array_equal(kq, chuan)
+    elif phuong_phap == "fft":
+        chuan_64 = einsum_tren_mo_rong(mo_rong.astype(np.float64), nhan.astype(np.float64))
+        can = SAI_SO_FFT[kq.dtype] * np.abs(anh).max() * np.abs(nhan).sum()
+        np.testing.assert_allclose(kq, chuan_64, rtol=0, atol=can)
+    else:
+        np.testing.assert_allclose(kq, chuan, rtol=1e-5, atol=1e-3)
+
+
+@pytest.mark.parametrize("phuong_phap", PHUONG_PHAP)
+@pytest.mark.parametrize("kieu_padding", PADDING)
+@pytest.mark.parametrize("kieu", [np.float32, np.float64])
+def test_trung_them_le_ca_anh(phuong_phap, kieu_padding, kieu):
+    for nhan in _cac_nhan():
+        _kiem_tra(_anh(37, 41, kieu), nhan, kieu_padding, phuong_phap)
+
+
+@pytest.mark.parametrize("phuong_phap", PHUONG_PHAP)
+@pytest.mark.parametrize("kieu_padding", PADDING)
+def test_anh_nho_hon_kernel(phuong_phap, kieu_padding):
+    for H, W in [(3, 20), (20, 4), (2, 2), (6, 9)]:
+        for nhan in _cac_nhan():
+            _kiem_tra(_anh(H, W), nhan, kieu_padding, phuong_phap)
+
+
+@pytest.mark.parametrize("phuong_phap", PHUONG_PHAP)
+@pytest.mark.parametrize("kieu_padding", PADDING)
+def test_chia_o_song_song_trung_noi_tiep(phuong_phap, kieu_padding):
+    anh = _anh(150, 57)  # ô 32 hàng → 5 ô, có ô cuối ngắn hơn
+    for nhan in _cac_nhan():
+        if phuong_phap == "tach_roi" and np.linalg.matrix_rank(nhan) != 1:
+            continue
+        noi_tiep = chap_2d(anh, nhan, kieu_padding, phuong_phap=phuong_phap)
+        song_song = chap_2d(anh, nhan, kieu_padding, phuong_phap=phuong_phap, so_luong_luong=4)
+        np.testing.assert_array_equal(song_song, noi_tiep)
+        _kiem_tra(anh, nhan, kieu_padding, phuong_phap, so_luong_luong=4)
+
+
+@pytest.mark.parametrize("kieu", [np.float32, np.float64])
+def test_fft_anh_lon_kernel_lon(kieu):
+    nhan = np.random.default_rng(2).normal(size=(31, 31))
+    for kieu_padding in PADDING:
+        _kiem_tra(_anh(512, 384, kieu), nhan, kieu_padding, "fft")
+
+
+@pytest.mark.parametrize("kieu_padding", PADDING)
+def test_gx_gy_mot_luot_trung_tung_nhan(kieu_padding):
+    for anh in (_anh(37, 41), _anh(2, 5, np.float64), _anh(20, 30).astype(np.uint8)):
+        for gx, gy in (nhan_sobel(), nhan_prewitt()):
+            fx = chap_2d(anh, gx, kieu_padding, phuong_phap="cong_don")
+            fy = chap_2d(anh, gy, kieu_padding, phuong_phap="cong_don")
+            chuan = np.hypot(fx, fy)
+            for vung in (None, VungLamViec()):
+                kq = bien_do_gradient(anh, gx, gy, kieu_padding, chuan_hoa_0_255=False, vung=vung)
+                np.testing.assert_array_equal(kq, chuan)
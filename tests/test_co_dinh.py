@@ -0,0 +1,64 @@
+# tests/test_co_dinh.py
+"""Đường dấu phẩy tĩnh (co_dinh.py) so với float64 theo các cận ghi trong kieu_du_lieu.py."""
+import numpy as np
+import pytest
+
+from bo_loc.bien import nhan_laplacian, nhan_prewitt, nhan_sobel
+from bo_loc.co_dinh import (
+    SO_BIT_GAUSS,
+    chap_2d_nguyen,
+    loc_gauss_co_dinh,
+    loc_trung_binh_co_dinh,
+    nhan_gauss_nguyen,
+)
+from bo_loc.cong_cu_chap import chap_2d
+from bo_loc.lam_min import loc_gauss, nhan_gauss, nhan_trung_binh
+
+PADDING = ["zero", "replicate", "reflect"]
+
+
+def _anh(*hinh):
+    return np.random.default_rng(sum(hinh)).integers(0, 256, hinh, dtype=np.uint8)
+
+
+@pytest.mark.parametrize("kieu_padding", PADDING)
+def test_chap_nguyen_trung_float64(kieu_padding):
+    cac_nhan = [*nhan_sobel(np.int32), *nhan_prewitt(np.int32), nhan_laplacian(np.int32)]
+    for anh in (_anh(37, 41), _anh(2, 5), _anh(3, 12, 9)):
+        for nhan in cac_nhan:
+            kq = chap_2d_nguyen(anh, nhan, kieu_padding)
+            chuan = chap_2d(
+                anh.astype(np.float64), nhan.astype(np.float64), kieu_padding, phuong_phap="einsum"
+            )
+            assert kq.dtype == np.int32
+            np.testing.assert_array_equal(kq, chuan)
+
+
+@pytest.mark.parametrize("kieu_padding", PADDING)
+@pytest.mark.parametrize("kich_thuoc", [3, 15, 51])
+def test_trung_binh_trong_nua_muc_xam(kich_thuoc, kieu_padding):
+    # 51 = KERNEL_MEAN_TOI_DA của giao diện
+    anh = _anh(60, 70)
+    chuan = chap_2d(
+        anh.astype(np.float64), nhan_trung_binh(kich_thuoc), kieu_padding, phuong_phap="einsum"
+    )
+    kq = loc_trung_binh_co_dinh(anh, kich_thuoc, kieu_padding)
+    assert kq.dtype == np.uint8
+    assert np.abs(kq - chuan).max() <= 0.5 + 1e-9
+
+
+@pytest.mark.parametrize("kieu_padding", PADDING)
+@pytest.mark.parametrize("sigma", [0.5, 1.0, 2.5, 5.0])
+def test_gauss_trong_can(sigma, kieu_padding):
+    # 15 = KERNEL_GAUSS_TOI_DA của giao diện
+    ks = 15
+    anh = _anh(60, 70)
+    chuan = loc_gauss(anh.astype(np.float64), ks, sigma, kieu_padding)
+    kq = loc_gauss_co_dinh(anh, ks, sigma, kieu_padding)
+
+    q = nhan_gauss_nguyen(ks, sigma) / float(1 << SO_BIT_GAUSS)
+    can = 0.5 + 255 * np.abs(np.outer(q, q) - nhan_gauss(ks, sigma)).sum()
+
+    sai = np.abs(kq - chuan).max()
+    assert sai <= can + 1e-9
+    assert sai <= 1.0
@@ -0,0 +1,30 @@
+# tests/test_doc_csv.py
+import io
+
+import numpy as np
+import pytest
+
+from tien_ich import doc_csv, doc_csv_theo_khoi
+
+
+def test_doc_csv_ma_tran():
+    kq = doc_csv(io.BytesIO(b"# chu thich\n1,2,3\n\n4,5,6\n"))
+    np.testing.assert_array_equal(kq, [[1, 2, 3], [4, 5, 6]])
+
+
+@pytest.mark.parametrize(
+    "noi_dung",
+    [
+        b"1,2\n3,4,5\n6\n",  # tổng số phần tử vẫn = số hàng × W
+        b"1,2,3\n4,5\n",
+    ],
+)
+def test_doc_csv_hang_lech_bao_loi(noi_dung):
+    with pytest.raises(ValueError):
+        doc_csv(io.BytesIO(noi_dung))
+
+
+def test_doc_csv_hang_lech_o_khoi_sau_bao_loi():
+    noi_dung = b"1,2\n" * 5 + b"3,4,5\n6\n"
+    with pytest.raises(ValueError):
+        list(doc_csv_theo_khoi(io.BytesIO(noi_dung), so_phan_tu_moi_khoi=4))
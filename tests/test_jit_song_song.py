@@ -0,0 +1,63 @@
+# tests/test_jit_song_song.py
+"""Đường JIT (jit_numba) khi nhiều luồng cùng gọi nhân: so_luong_luong > 1."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from bo_loc import bien_do_gradient, jit_numba, loc_median, nhan_sobel
+
+
+def _anh(H=80, W=40):
+    rng = np.random.default_rng(0)
+    return rng.random((H, W)).astype(np.float32) * 255
+
+
+def _chay_ca_hai(anh):
+    gx, gy = nhan_sobel()
+    return (
+        loc_median(anh, 3, "reflect", so_luong_luong=4),
+        bien_do_gradient(anh, gx, gy, "reflect", so_luong_luong=4),
+    )
+
+
+@pytest.fixture
+def bat_nhan_jit(monkeypatch):
+    """Ép dispatch sang nhân JIT (không có numba: nhân chạy như Python thuần)."""
+    if jit_numba.CO_NUMBA:
+        if not jit_numba.bat_jit(True):
+            pytest.skip("numba không nạp được tầng luồng an toàn")
+    else:
+        monkeypatch.setattr(jit_numba, "_BAT", True)
+    yield
+    jit_numba.bat_jit(jit_numba.CO_NUMBA)
+
+
+def test_jit_nhieu_luong_trung_numpy(bat_nhan_jit):
+    anh = _anh()
+    median_jit, bien_jit = _chay_ca_hai(anh)
+    jit_numba.bat_jit(False)
+    median_np, bien_np = _chay_ca_hai(anh)
+    np.testing.assert_array_equal(median_jit, median_np)
+    np.testing.assert_allclose(bien_jit, bien_np, rtol=1e-5, atol=1e-3)
+
+
+def test_jit_goi_dong_thoi_tu_nhieu_luong(bat_nhan_jit):
+    # Như các luồng xử lý của Gradio: nhiều yêu cầu cùng lúc, mỗi yêu cầu lại chia ô
+    anh = _anh()
+    mong_doi = _chay_ca_hai(anh)
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        cac_kq = [f.result() for f in [ex.submit(_chay_ca_hai, anh) for _ in range(4)]]
+    for median, bien in cac_kq:
+        np.testing.assert_array_equal(median, mong_doi[0])
+        np.testing.assert_array_equal(bien, mong_doi[1])
+
+
+def test_tang_luong_an_toan_hoac_khoa():
+    numba = pytest.importorskip("numba")
+    if not jit_numba.dang_bat_jit():
+        pytest.skip("đường JIT đang tắt")
+    tang = numba.threading_layer()
+    # tầng không an toàn luồng chỉ có khi người dùng chỉ định → nhân chạy dưới khoá
+    assert tang in jit_numba._TANG_AN_TOAN or "NUMBA_THREADING_LAYER" in os.environ
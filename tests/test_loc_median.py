@@ -0,0 +1,54 @@
+# tests/test_loc_median.py
+"""loc_median trùng bit với vòng lặp np.median từng điểm ảnh (bản gốc)."""
+import numpy as np
+import pytest
+
+from bo_loc import loc_median
+
+CHE_DO_PAD = {"zero": "constant", "replicate": "edge", "reflect": "reflect"}
+
+
+def _median_goc(anh, kich_thuoc, kieu_padding):
+    """Bản gốc: thêm lề bằng np.pad rồi np.median từng cửa sổ."""
+    k = kich_thuoc // 2
+    mo_rong = np.pad(anh, k, mode=CHE_DO_PAD[kieu_padding])
+    H, W = anh.shape
+    ket_qua = np.zeros((H, W), dtype=float)
+    for i in range(H):
+        for j in range(W):
+            ket_qua[i, j] = float(np.median(mo_rong[i : i + kich_thuoc, j : j + kich_thuoc]))
+    return ket_qua
+
+
+def _anh(H, W, kieu=np.float32):
+    rng = np.random.default_rng(H * 1000 + W)
+    return rng.integers(0, 256, (H, W)).astype(kieu)
+
+
+@pytest.mark.parametrize("kieu_padding", list(CHE_DO_PAD))
+@pytest.mark.parametrize("kich_thuoc", range(3, 16, 2))
+def test_trung_ban_goc(kich_thuoc, kieu_padding):
+    anh = _anh(19, 23)
+    anh[::5] += 0.25  # giá trị không nguyên: không đi đường float32 rút gọn từ số nguyên
+    for a in (anh, anh.astype(np.float64), _anh(11, 14, np.uint8)):
+        np.testing.assert_array_equal(
+            loc_median(a, kich_thuoc, kieu_padding), _median_goc(a, kich_thuoc, kieu_padding)
+        )
+
+
+@pytest.mark.parametrize("kieu_padding", list(CHE_DO_PAD))
+def test_nan_va_anh_nho_hon_kernel(kieu_padding):
+    anh = _anh(12, 9, np.float64)
+    anh[4, 6] = np.nan
+    np.testing.assert_array_equal(loc_median(anh, 5, kieu_padding), _median_goc(anh, 5, kieu_padding))
+    nho = _anh(4, 6)
+    np.testing.assert_array_equal(loc_median(nho, 9, kieu_padding), _median_goc(nho, 9, kieu_padding))
+
+
+def test_chieu_cao_khong_chia_het_khoi():
+    # ks=15, W=300 → khối 2^22 // (300 · 225) = 62 hàng; H = 70 có mạch nối khối
+    anh = _anh(70, 300)
+    for kieu_padding in CHE_DO_PAD:
+        np.testing.assert_array_equal(
+            loc_median(anh, 15, kieu_padding), _median_goc(anh, 15, kieu_padding)
+        )
@@ -0,0 +1,49 @@
+# tests/test_loc_trung_binh.py
+"""loc_trung_binh (bảng tích phân) khớp chập với nhan_trung_binh tới kernel lớn nhất của giao diện."""
+import numpy as np
+import pytest
+
+from bo_loc.cong_cu_chap import chap_2d
+from bo_loc.lam_min import loc_trung_binh, nhan_trung_binh
+from bo_loc.tich_phan import tao_bang_tich_phan
+
+PADDING = ["zero", "replicate", "reflect"]
+KS_TOI_DA = 51  # ung_dung.KERNEL_MEAN_TOI_DA
+
+
+def _anh(H, W, kieu=np.float64):
+    rng = np.random.default_rng(H * 1000 + W)
+    return (rng.random((H, W)) * 255).astype(kieu)
+
+
+@pytest.mark.parametrize("kieu_padding", PADDING)
+@pytest.mark.parametrize("kich_thuoc", range(3, KS_TOI_DA + 1, 2))
+def test_trung_chap_nhan_trung_binh(kich_thuoc, kieu_padding):
+    # 40 x 57: nhỏ hơn kernel 51 theo 1 chiều (lề phản xạ nhiều lần)
+    for kieu, sai_so in ((np.float64, 1e-9), (np.float32, 1e-3)):
+        anh = _anh(40, 57, kieu)
+        chuan = chap_2d(anh, nhan_trung_binh(kich_thuoc), kieu_padding, phuong_phap="einsum")
+        kq = loc_trung_binh(anh, kich_thuoc, kieu_padding)
+        assert kq.dtype == chuan.dtype
+        np.testing.assert_allclose(kq, chuan, rtol=0, atol=sai_so)
+
+
+@pytest.mark.parametrize("kieu_padding", PADDING)
+def test_dung_lai_bang(kieu_padding):
+    anh = _anh(30, 35)
+    bang = tao_bang_tich_phan(anh, KS_TOI_DA // 2, kieu_padding)
+    for ks in (3, 17, KS_TOI_DA):
+        np.testing.assert_allclose(
+            loc_trung_binh(anh, ks, kieu_padding, bang=bang),
+            loc_trung_binh(anh, ks, kieu_padding),
+            rtol=0,
+            atol=1e-9,
+        )
+
+
+def test_bang_khac_padding_hoac_kich_thuoc_bao_loi():
+    anh = _anh(20, 20)
+    with pytest.raises(AssertionError, match="padding"):
+        loc_trung_binh(anh, 3, "reflect", bang=tao_bang_tich_phan(anh, 1, "zero"))
+    with pytest.raises(AssertionError, match="kích thước"):
+        loc_trung_binh(anh, 3, "reflect", bang=tao_bang_tich_phan(anh[:10], 1, "reflect"))
@@ -0,0 +1,33 @@
+# tests/test_song_phuong.py
+"""Lưới song phương bị chặn bộ nhớ ở sigma nhỏ trên ảnh 1024²."""
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from bo_loc.lam_min import GIOI_HAN_BYTE_LUOI, loc_song_phuong, loc_song_phuong_vet_can
+
+
+# (σs, σr): slider nhỏ nhất của ung_dung.py (SIGMA_*_TOI_THIEU) và mức trước đây 1.0 / 5
+@pytest.mark.parametrize("sigma_kg, sigma_gt", [(2.0, 10.0), (1.0, 5.0)])
+def test_sigma_nho_anh_lon_trong_gioi_han_bo_nho(sigma_kg, sigma_gt):
+    anh = np.random.default_rng(0).random((1024, 1024)).astype(np.float32) * 255
+    tracemalloc.start()
+    try:
+        kq = loc_song_phuong(anh, sigma_kg, sigma_gt, "reflect")
+        dinh = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert kq.shape == anh.shape and np.isfinite(kq).all()
+    # Lưới + 2 bản sao khi làm mờ + các mảng cỡ ảnh (float64 / int64)
+    assert dinh < 4 * GIOI_HAN_BYTE_LUOI + 16 * 8 * anh.size
+
+
+def test_luoi_gian_van_gan_vet_can(monkeypatch):
+    rng = np.random.default_rng(1)
+    anh = np.kron(rng.integers(0, 2, (8, 8)) * 200.0, np.ones((12, 12)))
+    anh += rng.normal(0, 5, anh.shape)
+    chuan = loc_song_phuong_vet_can(anh, 2.0, 20.0, "reflect")
+    monkeypatch.setattr("bo_loc.lam_min.GIOI_HAN_BYTE_LUOI", 1 << 16)
+    kq = loc_song_phuong(anh, 2.0, 20.0, "reflect")
+    assert np.abs(kq - chuan).mean() < 1.0
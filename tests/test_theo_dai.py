@@ -0,0 +1,41 @@
+# tests/test_theo_dai.py
+"""mo_anh_nguon: TIFF giải mã từng strip / tile, PNG bị chặn theo RAM, không sót file tạm."""
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from bo_loc import theo_dai
+
+
+def _rgb(H=150, W=101):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (H, W, 3), dtype=np.uint8)
+
+
+def test_tiff_tung_doan_giong_pil(tmp_path):
+    tifffile = pytest.importorskip("tifffile")
+    a = _rgb()
+    mong_doi = np.asarray(Image.fromarray(a).convert("L"))
+    tifffile.imwrite(tmp_path / "dai.tif", a, rowsperstrip=16)
+    tifffile.imwrite(tmp_path / "o.tif", a, tile=(32, 32))
+    for ten in ("dai.tif", "o.tif"):
+        anh = theo_dai.mo_anh_nguon(str(tmp_path / ten), str(tmp_path))
+        np.testing.assert_array_equal(anh, mong_doi)
+
+
+def test_png_vuot_gioi_han_bao_loi_va_xoa_file_tam(tmp_path):
+    Image.fromarray(_rgb()).save(tmp_path / "a.png")
+    tam = tmp_path / "tam"
+    tam.mkdir()
+    with pytest.raises(ValueError, match=".npy"):
+        theo_dai.mo_anh_nguon(str(tmp_path / "a.png"), str(tam), gioi_han_byte=1000)
+    assert os.listdir(tam) == []
+
+
+def test_khong_doi_gioi_han_pil(tmp_path):
+    Image.fromarray(_rgb()).save(tmp_path / "a.png")
+    truoc = Image.MAX_IMAGE_PIXELS
+    theo_dai.mo_anh_nguon(str(tmp_path / "a.png"), str(tmp_path))
+    assert Image.MAX_IMAGE_PIXELS == truoc
@@ -0,0 +1,25 @@
+# tests/test_xu_ly_lo.py
+import os
+
+import numpy as np
+from PIL import Image
+
+import xu_ly_lo
+
+
+def test_tep_vao_chi_khac_duoi_bao_loi_trung_ket_qua(tmp_path, capsys):
+    vao, ra = tmp_path / "vao", tmp_path / "ra"
+    vao.mkdir()
+    a = (np.arange(20 * 30) % 256).astype(np.uint8).reshape(20, 30)
+    Image.fromarray(a).save(vao / "a.png")
+    np.savetxt(vao / "a.csv", a, fmt="%d", delimiter=",")
+    Image.fromarray(a).save(vao / "b.png")
+
+    tham_so = [str(vao), str(ra), "--loc", "gauss", "--so-tien-trinh", "1"]
+    assert xu_ly_lo.main(tham_so) == 1
+    assert "a.png: trùng tệp kết quả với" in capsys.readouterr().err
+    assert sorted(os.listdir(ra)) == ["a.png", "b.png"]
+
+    # Chạy lại: a.csv, b.png bỏ qua, a.png vẫn báo lỗi
+    assert xu_ly_lo.main(tham_so) == 1
+    assert "bỏ qua (đã có): 2  |  lỗi: 1" in capsys.readouterr().out
@@ -0,0 +1,168 @@
+# thu_tai.py
+"""
+Thử tải máy chủ giao diện (ung_dung.py) đang chạy: N client đồng thời, mỗi
+client gửi liên tiếp --so-yeu-cau yêu cầu; báo độ trễ p50/p90/p99, thông
+lượng và số yêu cầu lỗi (ví dụ bị từ chối vì hàng đợi đầy).
+
+Ví dụ:
+    python ung_dung.py --so-tien-trinh 4 --hang-doi-toi-da 32 &
+    python thu_tai.py --so-client 1 4 16 --so-yeu-cau 10 --loc Median --ks 7
+    python thu_tai.py --api bien --loc Canny --kich-thuoc 1024 --luu tai.json
+
+Mặc định mỗi yêu cầu gửi 1 ảnh ngẫu nhiên khác nhau để máy chủ phải tính
+thật (bộ nhớ đệm theo nội dung không trúng); --cung-anh để đo đường trúng đệm.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from gradio_client import Client, handle_file
+
+from tien_ich import luu_png
+
+
+def _tao_anh(thu_muc: str, ten: str, kich_thuoc: int, hat_giong: int) -> str:
+    rng = np.random.default_rng(hat_giong)
+    anh = rng.random((kich_thuoc, kich_thuoc)) * 255.0
+    duong_dan = os.path.join(thu_muc, ten + ".png")
+    luu_png(anh, duong_dan)
+    return duong_dan
+
+
+def _gui(client: Client, args: argparse.Namespace, tep: str) -> None:
+    if args.api == "lam_min":
+        client.predict(
+            handle_file(tep),
+            args.loc,
+            args.ks,
+            args.sigma,
+            args.ks,
+            "reflect",
+            False,
+            4.0,
+            30.0,
+            api_name="/xu_ly_lam_min",
+        )
+    else:
+        client.predict(
+            handle_file(tep),
+            args.loc,
+            args.ks,
+            args.sigma,
+            "reflect",
+            True,
+            100,
+            50,
+            False,
+            4.0,
+            30.0,
+            api_name="/xu_ly_bien",
+        )
+
+
+def chay_muc_tai(args: argparse.Namespace, so_client: int, thu_muc: str) -> Dict[str, Any]:
+    """1 mức tải: so_client luồng, mỗi luồng 1 Client riêng gửi tuần tự."""
+    do_tre: List[float] = []
+    loi: Dict[str, int] = {}
+    khoa = threading.Lock()
+    bat_dau = threading.Barrier(so_client + 1)
+
+    def mot_client(i: int) -> None:
+        client = Client(args.url, verbose=False)
+        cac_tep = [
+            _tao_anh(
+                thu_muc,
+                f"{so_client}_{i}_{j}",
+                args.kich_thuoc,
+                0 if args.cung_anh else (so_client * 1000 + i) * 1000 + j + 1,
+            )
+            for j in range(args.so_yeu_cau)
+        ]
+        bat_dau.wait()
+        for tep in cac_tep:
+            t = time.perf_counter()
+            try:
+                _gui(client, args, tep)
+            except Exception as e:  # lỗi máy chủ / hàng đợi đầy
+                with khoa:
+                    ten = type(e).__name__ + ": " + str(e)[:60]
+                    loi[ten] = loi.get(ten, 0) + 1
+                continue
+            with khoa:
+                do_tre.append(time.perf_counter() - t)
+
+    luong = [threading.Thread(target=mot_client, args=(i,)) for i in range(so_client)]
+    for l in luong:
+        l.start()
+    bat_dau.wait()
+    t0 = time.perf_counter()
+    for l in luong:
+        l.join()
+    tong_giay = time.perf_counter() - t0
+
+    kq: Dict[str, Any] = {
+        "so_client": so_client,
+        "thanh_cong": len(do_tre),
+        "loi": loi,
+        "giay": tong_giay,
+        "thong_luong": len(do_tre) / tong_giay if tong_giay > 0 else 0.0,
+    }
+    if do_tre:
+        ms = np.array(do_tre) * 1000.0
+        kq.update({f"p{p}_ms": float(np.percentile(ms, p)) for p in (50, 90, 99)})
+        kq["max_ms"] = float(ms.max())
+    return kq
+
+
+def tao_tham_so() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Thử tải máy chủ ung_dung.py.")
+    p.add_argument("--url", default="http://127.0.0.1:7860/")
+    p.add_argument("--so-client", nargs="+", type=int, default=[1, 4, 8])
+    p.add_argument("--so-yeu-cau", type=int, default=10, help="Số yêu cầu mỗi client")
+    p.add_argument("--api", choices=["lam_min", "bien"], default="lam_min")
+    p.add_argument(
+        "--loc",
+        default="Median",
+        help="Nhãn bộ lọc trên giao diện (Median, Gaussian, Sobel, Canny, ...)",
+    )
+    p.add_argument("--ks", type=int, default=5)
+    p.add_argument("--sigma", type=float, default=1.0)
+    p.add_argument("--kich-thuoc", type=int, default=512, help="Cạnh ảnh thử (vuông)")
+    p.add_argument("--cung-anh", action="store_true", help="Mọi yêu cầu dùng cùng 1 ảnh")
+    p.add_argument("--luu", help="Ghi kết quả ra file JSON")
+    return p
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = tao_tham_so().parse_args(argv)
+    ket_qua = []
+
+    print(f"{'client':>6} {'xong':>6} {'lỗi':>5} {'yc/s':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    with tempfile.TemporaryDirectory() as thu_muc:
+        for n in args.so_client:
+            kq = chay_muc_tai(args, n, thu_muc)
+            ket_qua.append(kq)
+            print(
+                f"{n:>6} {kq['thanh_cong']:>6} {sum(kq['loi'].values()):>5}"
+                f" {kq['thong_luong']:7.2f} {kq.get('p50_ms', float('nan')):9.1f}"
+                f" {kq.get('p90_ms', float('nan')):9.1f} {kq.get('p99_ms', float('nan')):9.1f}",
+                flush=True,
+            )
+            for ten, so in kq["loi"].items():
+                print(f"       {so} × {ten}")
+
+    if args.luu:
+        with open(args.luu, "w", encoding="utf-8") as f:
+            json.dump({"tham_so": vars(args), "ket_qua": ket_qua}, f, ensure_ascii=False, indent=1)
+
+    return 1 if any(kq["thanh_cong"] == 0 for kq in ket_qua) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
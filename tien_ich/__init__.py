@@ -1,4 +1,43 @@
 # tien_ich/__init__.py
-from .io_anh import doc_anh_hoac_csv, chuan_hoa_uint8, luu_png, luu_csv
+from .io_anh import (
+    doc_anh_hoac_csv,
+    doc_csv,
+    doc_csv_theo_khoi,
+    doc_npy,
+    chuan_hoa_uint8,
+    luu_png,
+    luu_csv,
+    luu_npy,
+    luu_npz,
+    luu_ma_tran,
+    ghi_csv_theo_khoi,
+)
+from .bo_nho_dem import BoNhoDemLRU, bam_noi_dung, kich_thuoc_byte
+from .do_luong import bat_do_luong, do_buoc, do_ham, phien_do, thong_ke_phan_vi
+from .nhom_tien_trinh import NhomTienTrinh
+from .thu_muc_xuat import ThuMucXuat, THU_MUC_XUAT
 
-__all__ = ["doc_anh_hoac_csv", "chuan_hoa_uint8", "luu_png", "luu_csv"]
+__all__ = [
+    "doc_anh_hoac_csv",
+    "doc_csv",
+    "doc_csv_theo_khoi",
+    "doc_npy",
+    "chuan_hoa_uint8",
+    "luu_png",
+    "luu_csv",
+    "luu_npy",
+    "luu_npz",
+    "luu_ma_tran",
+    "ghi_csv_theo_khoi",
+    "BoNhoDemLRU",
+    "bam_noi_dung",
+    "kich_thuoc_byte",
+    "bat_do_luong",
+    "do_buoc",
+    "do_ham",
+    "phien_do",
+    "thong_ke_phan_vi",
+    "NhomTienTrinh",
+    "ThuMucXuat",
+    "THU_MUC_XUAT",
+]
@@ -0,0 +1,157 @@
+# tien_ich/bo_nho_dem.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+
+# Đọc file theo khối 1 MB khi băm
+KHOI_BAM = 1 << 20
+
+
+def bam_noi_dung(tap_tin: Any) -> str:
+    """
+    Băm BLAKE2b nội dung file (đường dẫn hoặc đối tượng file có .read/.name).
+    Cùng nội dung → cùng khoá, dù Gradio lưu mỗi lần tải lên ở 1 file tạm khác.
+    """
+    h = hashlib.blake2b(digest_size=20)
+
+    if isinstance(tap_tin, (str, os.PathLike)):
+        with open(tap_tin, "rb") as f:
+            for khoi in iter(lambda: f.read(KHOI_BAM), b""):
+                h.update(khoi)
+        return h.hexdigest()
+
+    if hasattr(tap_tin, "read"):
+        if hasattr(tap_tin, "seek"):
+            tap_tin.seek(0)
+        for khoi in iter(lambda: tap_tin.read(KHOI_BAM), b""):
+            if isinstance(khoi, str):
+                khoi = khoi.encode("utf-8")
+            if not khoi:
+                break
+            h.update(khoi)
+        if hasattr(tap_tin, "seek"):
+            tap_tin.seek(0)
+        return h.hexdigest()
+
+    return bam_noi_dung(getattr(tap_tin, "name"))
+
+
+def kich_thuoc_byte(gia_tri: Any) -> int:
+    """Ước lượng số byte RAM của 1 giá trị trong bộ nhớ đệm."""
+    if isinstance(gia_tri, np.ndarray):
+        return int(gia_tri.nbytes)
+    if isinstance(gia_tri, (bytes, bytearray, str)):
+        return len(gia_tri)
+    if isinstance(gia_tri, (tuple, list)):
+        return sum(kich_thuoc_byte(x) for x in gia_tri)
+    if isinstance(gia_tri, dict):
+        return sum(kich_thuoc_byte(x) for x in gia_tri.values())
+    return 64
+
+
+def _chi_doc(gia_tri: Any) -> Any:
+    """
+    Bản lưu vào đệm: mảng thay bằng view chỉ đọc (không chép dữ liệu, không
+    đổi cờ ghi của mảng người gọi) để nơi dùng không sửa nhầm bản trong đệm.
+    """
+    if isinstance(gia_tri, np.ndarray):
+        v = gia_tri.view()
+        v.setflags(write=False)
+        return v
+    if isinstance(gia_tri, (tuple, list)):
+        return type(gia_tri)(_chi_doc(x) for x in gia_tri)
+    return gia_tri
+
+
+class BoNhoDemLRU:
+    """
+    Bộ nhớ đệm LRU giới hạn theo tổng số byte, an toàn đa luồng.
+
+    - Khoá: tuple bất kỳ hashable (thường là băm nội dung file + tham số).
+    - Vượt ngân sách → loại mục ít dùng gần đây nhất cho tới khi vừa.
+    - Mục lớn hơn cả ngân sách không được lưu.
+    - Đếm số lần trúng/trượt để theo dõi hiệu quả.
+    """
+
+    def __init__(self, ngan_sach_byte: int):
+        self.ngan_sach_byte = int(ngan_sach_byte)
+        self._muc: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._khoa = threading.Lock()
+        self.tong_byte = 0
+        self.so_lan_trung = 0
+        self.so_lan_truot = 0
+        self.so_lan_loai = 0
+
+    def lay(self, khoa: Hashable) -> Optional[Any]:
+        """Trả về giá trị đã lưu (đánh dấu vừa dùng) hoặc None."""
+        with self._khoa:
+            muc = self._muc.get(khoa)
+            if muc is None:
+                self.so_lan_truot += 1
+                return None
+            self._muc.move_to_end(khoa)
+            self.so_lan_trung += 1
+            return muc[0]
+
+    def dat(self, khoa: Hashable, gia_tri: Any, so_byte: Optional[int] = None) -> Any:
+        """
+        Lưu giá trị (mảng lưu dạng view chỉ đọc), loại bớt mục cũ nếu vượt ngân
+        sách. Trả bản chỉ đọc đó (như lay() trả khi trúng). Mảng của người gọi
+        vẫn ghi được nhưng dùng chung dữ liệu với đệm: đừng sửa sau khi lưu.
+        """
+        if so_byte is None:
+            so_byte = kich_thuoc_byte(gia_tri)
+        gia_tri = _chi_doc(gia_tri)
+        if so_byte > self.ngan_sach_byte:
+            return gia_tri
+
+        with self._khoa:
+            cu = self._muc.pop(khoa, None)
+            if cu is not None:
+                self.tong_byte -= cu[1]
+            self._muc[khoa] = (gia_tri, so_byte)
+            self.tong_byte += so_byte
+
+            while self.tong_byte > self.ngan_sach_byte and self._muc:
+                _, (_, b) = self._muc.popitem(last=False)
+                self.tong_byte -= b
+                self.so_lan_loai += 1
+        return gia_tri
+
+    def xoa_muc(self, khoa: Hashable) -> None:
+        """Bỏ 1 mục (ví dụ file xuất đã bị xoá khỏi đĩa)."""
+        with self._khoa:
+            cu = self._muc.pop(khoa, None)
+            if cu is not None:
+                self.tong_byte -= cu[1]
+
+    def lay_hoac_tinh(self, khoa: Hashable, ham: Callable[[], Any]) -> Any:
+        """Trả giá trị trong đệm, nếu chưa có thì gọi ham() rồi lưu lại."""
+        gia_tri = self.lay(khoa)
+        if gia_tri is None:
+            gia_tri = self.dat(khoa, ham())
+        return gia_tri
+
+    def xoa(self) -> None:
+        """Xoá toàn bộ bộ nhớ đệm (giữ bộ đếm)."""
+        with self._khoa:
+            self._muc.clear()
+            self.tong_byte = 0
+
+    def thong_ke(self) -> Dict[str, Any]:
+        """Số mục, byte đang dùng, số lần trúng/trượt/loại và tỉ lệ trúng."""
+        with self._khoa:
+            tong = self.so_lan_trung + self.so_lan_truot
+            return {
+                "so_muc": len(self._muc),
+                "tong_byte": self.tong_byte,
+                "ngan_sach_byte": self.ngan_sach_byte,
+                "so_lan_trung": self.so_lan_trung,
+                "so_lan_truot": self.so_lan_truot,
+                "so_lan_loai": self.so_lan_loai,
+                "ti_le_trung": (self.so_lan_trung / tong) if tong else 0.0,
+            }
@@ -0,0 +1,197 @@
+# tien_ich/do_luong.py
+"""
+Đo thời gian / bộ nhớ theo từng bước xử lý.
+
+- `do_buoc("ten")` (context manager) và `@do_ham("ten")` (decorator) ghi lại
+  thời gian thực, thời gian CPU (của luồng) và byte cấp phát đỉnh của bước.
+- `phien_do("ten")` gom các bước của 1 yêu cầu, cuối phiên ghi 1 dòng log
+  JSON (logger "bo_loc.do_luong") và trả bảng phân tích cho giao diện.
+- Mọi bước được cộng dồn vào bộ đếm phân vị (`thong_ke_phan_vi`).
+
+Tắt (mặc định): mỗi lần gọi chỉ thêm 1 phép kiểm tra biến toàn cục.
+Bật: biến môi trường BO_LOC_DO_LUONG=1 hoặc bat_do_luong(True).
+Byte cấp phát đo bằng tracemalloc (chỉ khi bat_do_luong(..., bo_nho=True),
+vì tracemalloc làm chậm mọi cấp phát); tracemalloc là toàn cục nên số byte
+chỉ là ước lượng khi nhiều yêu cầu chạy đồng thời.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Số mẫu gần nhất giữ lại cho mỗi bước khi tính phân vị
+SO_MAU_TOI_DA = 1000
+
+nhat_ky = logging.getLogger("bo_loc.do_luong")
+
+_BAT = os.environ.get("BO_LOC_DO_LUONG", "") not in ("", "0")
+_BO_NHO = False
+_KHONG_LAM_GI = nullcontext()
+
+_phien: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar(
+    "_phien", default=None
+)
+_ngan_xep = threading.local()
+_mau: Dict[str, deque] = {}
+_khoa_mau = threading.Lock()
+
+
+def bat_do_luong(bat: bool = True, bo_nho: bool = False) -> None:
+    """Bật/tắt đo; bo_nho=True thì đo thêm byte cấp phát (bật tracemalloc)."""
+    global _BAT, _BO_NHO
+    _BAT = bool(bat)
+    _BO_NHO = bool(bat and bo_nho)
+    if _BO_NHO and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not _BO_NHO and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def dang_bat() -> bool:
+    return _BAT
+
+
+@contextmanager
+def _do(ten: str) -> Iterator[None]:
+    ngan_xep = getattr(_ngan_xep, "ds", None)
+    if ngan_xep is None:
+        ngan_xep = _ngan_xep.ds = []
+
+    # Đỉnh bộ nhớ: reset_peak ở đầu mỗi bước, bước cha lấy max với đỉnh bước con
+    khung = {"byte_0": 0, "dinh_con": 0}
+    if _BO_NHO:
+        hien_tai, dinh = tracemalloc.get_traced_memory()
+        if ngan_xep:
+            ngan_xep[-1]["dinh_con"] = max(ngan_xep[-1]["dinh_con"], dinh)
+        tracemalloc.reset_peak()
+        khung["byte_0"] = hien_tai
+    ngan_xep.append(khung)
+
+    # Thêm bản ghi ngay khi bắt đầu → danh sách của phiên theo thứ tự bắt đầu
+    ban_ghi: Dict[str, Any] = {"buoc": ten, "cap": len(ngan_xep) - 1}
+    phien = _phien.get()
+    if phien is not None:
+        phien.append(ban_ghi)
+
+    t0, c0 = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        giay, giay_cpu = time.perf_counter() - t0, time.thread_time() - c0
+        ngan_xep.pop()
+
+        so_byte = None
+        if _BO_NHO and tracemalloc.is_tracing():
+            dinh = max(tracemalloc.get_traced_memory()[1], khung["dinh_con"])
+            so_byte = dinh - khung["byte_0"]
+            if ngan_xep:
+                ngan_xep[-1]["dinh_con"] = max(ngan_xep[-1]["dinh_con"], dinh)
+
+        ban_ghi.update(giay=giay, giay_cpu=giay_cpu, byte_dinh=so_byte)
+        with _khoa_mau:
+            _mau.setdefault(ten, deque(maxlen=SO_MAU_TOI_DA)).append(giay)
+
+
+def do_buoc(ten: str):
+    """Context manager đo 1 bước; khi tắt trả về context rỗng dùng chung."""
+    if not _BAT:
+        return _KHONG_LAM_GI
+    return _do(ten)
+
+
+def do_ham(ten: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator đo mỗi lần gọi hàm (tên bước mặc định = tên hàm)."""
+
+    def boc(ham: Callable) -> Callable:
+        ten_buoc = ten or ham.__name__
+
+        @functools.wraps(ham)
+        def ham_do(*args, **kwargs):
+            if not _BAT:
+                return ham(*args, **kwargs)
+            with _do(ten_buoc):
+                return ham(*args, **kwargs)
+
+        return ham_do
+
+    return boc
+
+
+@contextmanager
+def phien_do(ten: str, **thong_tin: Any) -> Iterator[List[Dict[str, Any]]]:
+    """
+    1 yêu cầu: gom mọi bước đo bên trong (cả các lớp lồng nhau) vào danh sách
+    trả về, cuối phiên ghi log JSON {"phien", ..., "buoc": [...]}.
+    Khi tắt đo: danh sách luôn rỗng, không ghi log.
+    """
+    if not _BAT:
+        yield []
+        return
+
+    ds: List[Dict[str, Any]] = []
+    token = _phien.set(ds)
+    try:
+        with _do(ten):
+            yield ds
+    finally:
+        _phien.reset(token)
+        nhat_ky.info(json.dumps({"phien": ten, **thong_tin, "buoc": ds}, ensure_ascii=False))
+
+
+def thong_ke_phan_vi(phan_vi=(50, 90, 99)) -> Dict[str, Dict[str, float]]:
+    """Số lần gọi và phân vị thời gian (giây) của mỗi bước đã đo."""
+    with _khoa_mau:
+        mau = {ten: np.array(ds) for ten, ds in _mau.items()}
+    return {
+        ten: {"so_lan": len(t), **{f"p{p}": float(np.percentile(t, p)) for p in phan_vi}}
+        for ten, t in mau.items()
+        if len(t)
+    }
+
+
+def xoa_thong_ke() -> None:
+    with _khoa_mau:
+        _mau.clear()
+
+
+def bang_phan_tich(ds: List[Dict[str, Any]]) -> str:
+    """Bảng Markdown các bước của 1 phiên (thụt lề theo cấp lồng nhau)."""
+    if not ds:
+        return ""
+    dong = [
+        "| Bước | Thời gian (ms) | CPU (ms) | Bộ nhớ đỉnh (MiB) |",
+        "|---|---:|---:|---:|",
+    ]
+    for b in ds:
+        mib = "" if b["byte_dinh"] is None else f"{b['byte_dinh'] / 2**20:.1f}"
+        dong.append(
+            f"| {'&nbsp;&nbsp;' * b['cap']}{b['buoc']} | {b['giay'] * 1000.0:.1f}"
+            f" | {b['giay_cpu'] * 1000.0:.1f} | {mib} |"
+        )
+    return "\n".join(dong)
+
+
+def bang_phan_vi() -> str:
+    """Bảng Markdown phân vị thời gian cộng dồn của mọi bước đã đo."""
+    thong_ke = thong_ke_phan_vi()
+    if not thong_ke:
+        return ""
+    dong = [
+        "| Bước | Số lần | p50 (ms) | p90 (ms) | p99 (ms) |",
+        "|---|---:|---:|---:|---:|",
+    ]
+    for ten, t in sorted(thong_ke.items(), key=lambda kv: -kv[1]["p50"]):
+        dong.append(
+            f"| {ten} | {t['so_lan']} | {t['p50'] * 1000.0:.1f}"
+            f" | {t['p90'] * 1000.0:.1f} | {t['p99'] * 1000.0:.1f} |"
+        )
+    return "\n".join(dong)
@@ -1,77 +1,334 @@
 # tien_ich/io_anh.py
+import io
 import os
-import tempfile
-from typing import Any
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Iterator, Literal, Optional
 
 import numpy as np
 from PIL import Image
 
+from .do_luong import do_buoc, do_ham
+from .thu_muc_xuat import THU_MUC_XUAT
 
-def doc_anh_hoac_csv(tap_tin: Any) -> np.ndarray:
+DinhDangMaTran = Literal["CSV", "NPY", "NPZ"]
+
+# Số phần tử mỗi khối khi đọc/ghi CSV (giới hạn bộ nhớ tạm ~ vài chục MB)
+SO_PHAN_TU_MOI_KHOI = 1 << 18
+
+
+def _ten_tap_tin(tap_tin: Any) -> str:
+    """Tên file từ đường dẫn (str/PathLike) hoặc đối tượng file có .name."""
+    if isinstance(tap_tin, (str, os.PathLike)):
+        return os.fspath(tap_tin)
+    return getattr(tap_tin, "name", "")
+
+
+def _chuan_hoa_ma_tran(du_lieu: np.ndarray) -> np.ndarray:
+    """Ma trận số → float32 0–255 (nếu max <= 1 thì scale lên 0–255)."""
+    if du_lieu.ndim != 2:
+        raise ValueError("Ma trận đầu vào phải là 2 chiều.")
+
+    mmin, mmax = float(du_lieu.min()), float(du_lieu.max())
+
+    # memmap float32 đã đúng dải: trả thẳng, không nạp cả file vào RAM
+    if du_lieu.dtype == np.float32 and mmax > 1.0 and mmin >= 0 and mmax <= 255:
+        return du_lieu
+
+    du_lieu = du_lieu.astype(np.float32)
+    if mmax <= 1.0:
+        du_lieu = du_lieu * 255.0
+
+    du_lieu = np.clip(du_lieu, 0, 255)
+    return du_lieu
+
+
+def doc_csv_theo_khoi(
+    tap_tin: Any, so_phan_tu_moi_khoi: int = SO_PHAN_TU_MOI_KHOI
+) -> Iterator[np.ndarray]:
+    """
+    Đọc CSV số theo từng khối hàng (float64, shape (so_hang, W)).
+    Mỗi khối được phân tích 1 lần bằng np.fromstring (C) thay vì từng giá trị.
+    Bỏ qua dòng trống và dòng chú thích '#'. Hàng khác số cột với hàng đầu
+    → ValueError.
+    """
+    dong_mo = isinstance(tap_tin, (str, os.PathLike))
+    f = open(tap_tin, "rb") if dong_mo else tap_tin
+    try:
+        if hasattr(f, "seek"):
+            f.seek(0)
+
+        W = None
+        so_dong_moi_khoi = None
+        dong: list = []
+
+        def phan_tich(cac_dong: list) -> np.ndarray:
+            noi_dung = ",".join(cac_dong)
+            try:
+                mang = np.fromstring(noi_dung, dtype=np.float64, sep=",")
+            except ValueError:
+                raise ValueError("CSV chứa giá trị không phải số.")
+            if mang.size != len(cac_dong) * W:
+                raise ValueError("CSV phải là ma trận 2 chiều (các hàng cùng độ dài).")
+            return mang.reshape(len(cac_dong), W)
+
+        for d in f:
+            if isinstance(d, bytes):
+                d = d.decode("utf-8")
+            d = d.strip()
+            if not d or d.startswith("#"):
+                continue
+            so_cot = d.count(",") + 1
+            if W is None:
+                W = so_cot
+                so_dong_moi_khoi = max(1, so_phan_tu_moi_khoi // W)
+            elif so_cot != W:
+                # tổng số phần tử của khối có thể vẫn khớp (ví dụ "1,2" / "3,4,5" / "6")
+                raise ValueError("CSV phải là ma trận 2 chiều (các hàng cùng độ dài).")
+            dong.append(d)
+            if len(dong) >= so_dong_moi_khoi:
+                yield phan_tich(dong)
+                dong = []
+
+        if dong:
+            yield phan_tich(dong)
+    finally:
+        if dong_mo:
+            f.close()
+
+
+def doc_csv(tap_tin: Any) -> np.ndarray:
+    """Đọc toàn bộ CSV thành ma trận float64 (ghép các khối của doc_csv_theo_khoi)."""
+    cac_khoi = list(doc_csv_theo_khoi(tap_tin))
+    if not cac_khoi:
+        raise ValueError("CSV rỗng.")
+    return np.concatenate(cac_khoi, axis=0)
+
+
+def doc_npy(tap_tin: Any) -> np.ndarray:
     """
-    Đọc ảnh từ file (Gradio File):
-    - Ảnh PNG/JPG/BMP/TIF → chuyển sang ảnh xám, nếu quá lớn thì thu nhỏ lại.
-    - CSV → đọc ma trận, nếu max <= 1 thì scale lên 0–255.
+    Đọc .npy (ánh xạ bộ nhớ, không nạp cả file) hoặc .npz (mảng "anh" nếu có,
+    không thì mảng đầu tiên).
+    """
+    ten = _ten_tap_tin(tap_tin)
+    nguon = ten if ten and os.path.exists(ten) else tap_tin
+
+    if ten.lower().endswith(".npz"):
+        with np.load(nguon) as goi:
+            if not goi.files:
+                raise ValueError("File .npz không chứa mảng nào.")
+            khoa = "anh" if "anh" in goi.files else goi.files[0]
+            return goi[khoa]
 
-    Trả về: ndarray float32 (H, W) với giá trị 0–255.
+    if isinstance(nguon, str):
+        return np.load(nguon, mmap_mode="r")
+    return np.load(nguon)
+
+
+def doc_anh_hoac_csv(
+    tap_tin: Any, canh_toi_da: Optional[int] = 1024, giu_mau: bool = False
+) -> np.ndarray:
+    """
+    Đọc ảnh từ file (Gradio File hoặc đường dẫn):
+    - Ảnh PNG/JPG/BMP/TIF → chuyển sang ảnh xám, nếu cạnh lớn hơn canh_toi_da
+      thì thu nhỏ lại (JPEG: giải mã thu nhỏ trên miền DCT rồi mới resize;
+      canh_toi_da=None: giữ nguyên độ phân giải; ảnh rất lớn nên xử lý bằng
+      bo_loc.xu_ly_theo_dai).
+      giu_mau=True: ảnh màu giữ 3 kênh RGB → (H, W, 3) (ảnh xám vẫn (H, W)).
+    - NPY/NPZ → ma trận nhị phân (.npy ánh xạ bộ nhớ).
+    - CSV → đọc theo khối.
+    Ma trận (NPY/NPZ/CSV): nếu max <= 1 thì scale lên 0–255.
+
+    Trả về: ndarray float32 (H, W) (hoặc (H, W, 3)) với giá trị 0–255.
     """
     if tap_tin is None:
         raise ValueError("Chưa chọn file đầu vào.")
 
-    ten = getattr(tap_tin, "name", "")
+    ten = _ten_tap_tin(tap_tin)
     _, phu = os.path.splitext(ten.lower())
 
     # Ảnh thật
     if phu in [".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"]:
-        img = Image.open(tap_tin).convert("L")  # chuyển sang xám
+        with do_buoc("giai_ma_anh"):
+            img = Image.open(tap_tin)
+            mau = giu_mau and img.mode not in ("1", "L", "LA", "I", "I;16", "F")
+            che_do = "RGB" if mau else "L"
 
-        # Giới hạn kích thước để xử lý nhanh
-        canh_max = max(img.size)
-        if canh_max > 1024:
-            ti_le = 1024.0 / canh_max
-            kich_thuoc_moi = (int(img.size[0] * ti_le), int(img.size[1] * ti_le))
-            img = img.resize(kich_thuoc_moi, Image.BILINEAR)
+            # Giới hạn kích thước để xử lý nhanh
+            kich_thuoc_moi = None
+            canh_max = max(img.size)
+            if canh_toi_da is not None and canh_max > canh_toi_da:
+                ti_le = float(canh_toi_da) / canh_max
+                kich_thuoc_moi = (int(img.size[0] * ti_le), int(img.size[1] * ti_le))
+                # JPEG: giải mã thu nhỏ 1/2, 1/4, 1/8 ngay trên miền DCT (và
+                # chỉ kênh độ sáng khi cần ảnh xám), vẫn không nhỏ hơn kích
+                # thước đích; định dạng khác bỏ qua
+                img.draft(che_do, kich_thuoc_moi)
 
-        arr = np.array(img, dtype=np.float32)
-        return arr
+            img = img.convert(che_do)
 
-    # CSV
-    if hasattr(tap_tin, "seek"):
-        tap_tin.seek(0)
+        if kich_thuoc_moi is not None and img.size != kich_thuoc_moi:
+            with do_buoc("thu_nho_anh"):
+                img = img.resize(kich_thuoc_moi, Image.BILINEAR)
 
-    du_lieu = np.loadtxt(tap_tin, delimiter=",")
-    if du_lieu.ndim != 2:
-        raise ValueError("CSV phải là ma trận 2 chiều.")
+        arr = np.array(img, dtype=np.float32)
+        return arr
 
-    du_lieu = du_lieu.astype(np.float32)
-    mmax = float(du_lieu.max())
-    if mmax <= 1.0:
-        du_lieu = du_lieu * 255.0
+    # Ma trận nhị phân
+    if phu in [".npy", ".npz"]:
+        with do_buoc("doc_npy"):
+            return _chuan_hoa_ma_tran(doc_npy(tap_tin))
 
-    du_lieu = np.clip(du_lieu, 0, 255)
-    return du_lieu
+    # CSV
+    with do_buoc("doc_csv"):
+        return _chuan_hoa_ma_tran(doc_csv(tap_tin))
 
 
-def chuan_hoa_uint8(anh: np.ndarray) -> np.ndarray:
-    """Đưa ảnh về uint8 (0–255), xử lý NaN/Inf nếu có."""
+def chuan_hoa_uint8(anh: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Đưa ảnh về uint8 (0–255), xử lý NaN/Inf nếu có.
+    out: ghi vào mảng uint8 có sẵn bằng 1 lần clip (chỉ tạo bản sao khi ảnh có NaN).
+    """
+    if out is not None:
+        with np.errstate(invalid="ignore"):  # +Inf + -Inf cũng cho NaN: vẫn đúng
+            co_nan = anh.dtype != np.uint8 and np.isnan(anh.sum())
+        if co_nan:
+            anh = np.nan_to_num(anh)
+        return np.clip(anh, 0, 255, out=out, casting="unsafe")
+    if anh.dtype == np.uint8:
+        return anh
     anh = np.nan_to_num(anh)
     anh = np.clip(anh, 0, 255)
     return anh.astype(np.uint8)
 
 
-def luu_png(anh: np.ndarray) -> str:
-    """Lưu ảnh ra file PNG tạm để tải về."""
+@contextmanager
+def _tep_dich(duong_dan: Optional[str], duoi: str) -> Iterator[BinaryIO]:
+    """
+    File ghi: đường dẫn cho trước, hoặc file mới đuôi `duoi` trong thư mục
+    xuất (THU_MUC_XUAT); ghi xong thì dọn thư mục xuất theo dung lượng / tuổi.
+    """
+    if duong_dan is not None:
+        with open(duong_dan, "wb") as f:
+            yield f
+        return
+
+    with THU_MUC_XUAT.tao_tep(duoi) as f:
+        yield f
+    THU_MUC_XUAT.don_dep(giu=(f.name,))
+
+
+def luu_png(anh: np.ndarray, duong_dan: Optional[str] = None) -> str:
+    """Lưu ảnh ra file PNG (mặc định trong thư mục xuất), trả về đường dẫn."""
     anh_u8 = chuan_hoa_uint8(anh)
     pil = Image.fromarray(anh_u8)
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    pil.save(tmp, format="PNG")
-    tmp.close()
-    return tmp.name
+    with _tep_dich(duong_dan, ".png") as f, do_buoc("ma_hoa_png"):
+        pil.save(f, format="PNG")
+    return f.name
+
+
+def _dinh_dang_khoi(khoi: np.ndarray, so_le: int) -> bytes:
+    """
+    Định dạng 1 khối 2D hữu hạn thành CSV ("%.{so_le}f" hoặc "%d" khi so_le=0)
+    bằng thao tác mảng: dựng ma trận ký tự độ rộng cố định cho mọi giá trị
+    rồi lọc bỏ số 0 đứng đầu. Giá trị được làm tròn bằng np.rint ở chữ số
+    thập phân cuối (trùng printf trừ các trường hợp "đúng nửa" hiếm gặp).
+    """
+    h, w = khoi.shape
+    phang = khoi.ravel()
+    ti_le = 10**so_le
+
+    x = np.rint(np.abs(phang) * ti_le).astype(np.int64)
+    nguyen, le = np.divmod(x, ti_le)
 
+    so_chu = len(str(int(nguyen.max()))) if x.size else 1
+    rong = 1 + so_chu + (1 + so_le if so_le else 0) + 1  # dấu, phần nguyên, ".", lẻ, ","
 
-def luu_csv(anh: np.ndarray) -> str:
+    ky_tu = np.empty((x.size, rong), dtype=np.uint8)
+    giu = np.ones((x.size, rong), dtype=bool)
+
+    ky_tu[:, 0] = ord("-")
+    giu[:, 0] = np.signbit(phang)
+
+    t = nguyen.copy()
+    for c in range(so_chu, 0, -1):
+        ky_tu[:, c] = 48 + t % 10
+        t //= 10
+    for c in range(1, so_chu):
+        giu[:, c] = nguyen >= 10 ** (so_chu - c)
+
+    if so_le:
+        ky_tu[:, so_chu + 1] = ord(".")
+        t = le
+        for c in range(so_chu + 1 + so_le, so_chu + 1, -1):
+            ky_tu[:, c] = 48 + t % 10
+            t //= 10
+
+    ky_tu[:, -1] = ord(",")
+    ky_tu.reshape(h, w, rong)[:, -1, -1] = ord("\n")
+    return ky_tu[giu].tobytes()
+
+
+@do_ham("ghi_csv")
+def ghi_csv_theo_khoi(
+    f: BinaryIO, anh: np.ndarray, so_phan_tu_moi_khoi: int = SO_PHAN_TU_MOI_KHOI
+) -> None:
+    """
+    Ghi ma trận 2D ra CSV (file nhị phân) theo từng khối hàng.
+    Số nguyên → "%d"; số thực → "%.4f" như np.savetxt trước đây.
+    Khối có NaN/Inf dùng lại np.savetxt cho đúng ký hiệu.
+    """
+    if anh.ndim != 2:
+        raise ValueError("Chỉ ghi được ma trận 2 chiều ra CSV.")
+
+    so_nguyen = np.issubdtype(anh.dtype, np.integer) or anh.dtype == np.bool_
+    so_le = 0 if so_nguyen else 4
+    so_hang = max(1, so_phan_tu_moi_khoi // max(1, anh.shape[1]))
+
+    for i in range(0, anh.shape[0], so_hang):
+        khoi = np.asarray(anh[i : i + so_hang])
+        if so_nguyen:
+            f.write(_dinh_dang_khoi(khoi.astype(np.float64), 0))
+        elif np.isfinite(khoi).all():
+            f.write(_dinh_dang_khoi(khoi.astype(np.float64), so_le))
+        else:
+            dem = io.BytesIO()
+            np.savetxt(dem, khoi, fmt="%.4f", delimiter=",")
+            f.write(dem.getvalue())
+
+
+def luu_csv(anh: np.ndarray, duong_dan: Optional[str] = None) -> str:
     """Lưu ma trận ảnh ra file CSV, trả về đường dẫn file."""
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".csv", mode="w", newline="")
-    np.savetxt(tmp, anh, fmt="%.4f", delimiter=",")
-    tmp.close()
-    return tmp.name
+    with _tep_dich(duong_dan, ".csv") as f:
+        ghi_csv_theo_khoi(f, anh)
+    return f.name
+
+
+@do_ham()
+def luu_npy(anh: np.ndarray, duong_dan: Optional[str] = None) -> str:
+    """Lưu ma trận ảnh ra file .npy (nhị phân, giữ nguyên kiểu dữ liệu)."""
+    with _tep_dich(duong_dan, ".npy") as f:
+        np.save(f, np.ascontiguousarray(anh))
+    return f.name
+
+
+@do_ham()
+def luu_npz(anh: np.ndarray, duong_dan: Optional[str] = None) -> str:
+    """Lưu ma trận ảnh ra file .npz nén (mảng tên "anh")."""
+    with _tep_dich(duong_dan, ".npz") as f:
+        np.savez_compressed(f, anh=anh)
+    return f.name
+
+
+def luu_ma_tran(
+    anh: np.ndarray,
+    dinh_dang: DinhDangMaTran = "CSV",
+    duong_dan: Optional[str] = None,
+) -> str:
+    """Lưu ma trận kết quả theo định dạng người dùng chọn."""
+    if dinh_dang == "CSV":
+        return luu_csv(anh, duong_dan)
+    if dinh_dang == "NPY":
+        return luu_npy(anh, duong_dan)
+    if dinh_dang == "NPZ":
+        return luu_npz(anh, duong_dan)
+    raise ValueError("Định dạng xuất không hợp lệ.")
@@ -0,0 +1,133 @@
+# tien_ich/nhom_tien_trinh.py
+"""
+Nhóm tiến trình khởi động sẵn để máy chủ giao diện đẩy phần tính toán nặng
+(lọc NumPy giữ CPU) ra khỏi tiến trình máy chủ.
+
+- Tiến trình con tạo bằng "forkserver" (không fork trực tiếp tiến trình máy
+  chủ đang chạy nhiều luồng); các module trong `nap_truoc` được import sẵn
+  trong forkserver, `khoi_dong` chạy 1 lần ở mỗi tiến trình con (làm nóng
+  kernel ghi nhớ...), và mọi tiến trình con được tạo ngay khi khởi tạo.
+- Ảnh vào / ra đi qua shared_memory: tiến trình chính chép ảnh vào 1 vùng
+  chung, tiến trình con đọc thẳng từ đó và ghi kết quả vào vùng chung mới;
+  chỉ tên vùng nhớ, hình dạng, kiểu được pickle qua pipe.
+- `ham` phải pickle được (hàm cấp module).
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .do_luong import do_buoc
+
+
+def _cho(giay: float) -> None:
+    time.sleep(giay)
+
+
+def _chay_trong_tien_trinh(
+    ham: Callable[..., np.ndarray],
+    ten_vao: str,
+    hinh: tuple,
+    kieu: str,
+    args: tuple,
+    kwargs: dict,
+) -> Tuple[str, tuple, str]:
+    """Chạy ham trên ảnh trong vùng nhớ chung, ghi kết quả ra vùng chung mới."""
+    shm_vao = shared_memory.SharedMemory(name=ten_vao)
+    try:
+        anh = np.ndarray(hinh, dtype=kieu, buffer=shm_vao.buf)
+        kq = np.asarray(ham(anh, *args, **kwargs))
+        del anh
+    finally:
+        shm_vao.close()
+
+    shm_ra = shared_memory.SharedMemory(create=True, size=max(1, kq.nbytes))
+    try:
+        np.ndarray(kq.shape, dtype=kq.dtype, buffer=shm_ra.buf)[...] = kq
+        return shm_ra.name, kq.shape, kq.dtype.str
+    finally:
+        shm_ra.close()
+
+
+class NhomTienTrinh:
+    """Pool tiến trình khởi động sẵn, trao đổi ảnh qua shared_memory."""
+
+    def __init__(
+        self,
+        so_tien_trinh: int,
+        khoi_dong: Optional[Callable[[], None]] = None,
+        nap_truoc: Sequence[str] = ("numpy",),
+    ):
+        self.so_tien_trinh = max(1, int(so_tien_trinh))
+        self._khoi_dong = khoi_dong
+        phuong_thuc = "spawn"
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            phuong_thuc = "forkserver"
+        self._ngu_canh = multiprocessing.get_context(phuong_thuc)
+        if phuong_thuc == "forkserver":
+            self._ngu_canh.set_forkserver_preload(list(nap_truoc))
+        self._khoa = threading.Lock()
+        self._ex = self._tao_pool()
+
+    def _tao_pool(self) -> ProcessPoolExecutor:
+        ex = ProcessPoolExecutor(
+            max_workers=self.so_tien_trinh,
+            mp_context=self._ngu_canh,
+            initializer=self._khoi_dong,
+        )
+        # Tiến trình con chỉ được tạo khi có việc: gửi đủ việc chờ ngắn để
+        # tạo (và chạy khoi_dong) cho tất cả ngay bây giờ
+        for f in [ex.submit(_cho, 0.05) for _ in range(self.so_tien_trinh)]:
+            f.result()
+        return ex
+
+    def chay(
+        self, ham: Callable[..., np.ndarray], anh: np.ndarray, *args: Any, **kwargs: Any
+    ) -> np.ndarray:
+        """ham(anh, *args, **kwargs) ở 1 tiến trình con; trả mảng kết quả."""
+        ex = self._ex
+        anh = np.ascontiguousarray(anh)
+        shm_vao = shared_memory.SharedMemory(create=True, size=max(1, anh.nbytes))
+        try:
+            np.ndarray(anh.shape, dtype=anh.dtype, buffer=shm_vao.buf)[...] = anh
+            with do_buoc("tien_trinh_con"):
+                try:
+                    ten_ra, hinh, kieu = ex.submit(
+                        _chay_trong_tien_trinh,
+                        ham,
+                        shm_vao.name,
+                        anh.shape,
+                        anh.dtype.str,
+                        args,
+                        kwargs,
+                    ).result()
+                except BrokenProcessPool:
+                    # Tiến trình con chết (ví dụ hết bộ nhớ): dựng lại pool
+                    # cho các yêu cầu sau, báo lỗi cho yêu cầu này
+                    self._dung_lai(ex)
+                    raise
+        finally:
+            shm_vao.close()
+            shm_vao.unlink()
+
+        shm_ra = shared_memory.SharedMemory(name=ten_ra)
+        try:
+            return np.ndarray(hinh, dtype=kieu, buffer=shm_ra.buf).copy()
+        finally:
+            shm_ra.close()
+            shm_ra.unlink()
+
+    def _dung_lai(self, cu: ProcessPoolExecutor) -> None:
+        with self._khoa:
+            if self._ex is not cu:  # luồng khác đã dựng lại
+                return
+            self._ex = self._tao_pool()
+        cu.shutdown(wait=False, cancel_futures=True)
+
+    def dong(self) -> None:
+        self._ex.shutdown(wait=True, cancel_futures=True)
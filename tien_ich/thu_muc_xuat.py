@@ -0,0 +1,98 @@
+# tien_ich/thu_muc_xuat.py
+"""
+Thư mục chứa các file xuất để tải về (luu_png / luu_csv / ... không kèm
+đường dẫn), có giới hạn dung lượng và tuổi: file quá tuổi bị xoá, sau đó
+nếu tổng dung lượng vượt giới hạn thì xoá file cũ nhất (theo mtime) trước.
+
+Cấu hình qua biến môi trường:
+- BO_LOC_THU_MUC_XUAT: thư mục (mặc định <thư mục tạm>/bo_loc_xuat)
+- BO_LOC_XUAT_TOI_DA_MIB: dung lượng tối đa, MiB (mặc định 1024)
+- BO_LOC_XUAT_TUOI_GIAY: tuổi tối đa, giây (mặc định 3600)
+"""
+import os
+import tempfile
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+
+class ThuMucXuat:
+    """Thư mục file xuất có dọn dẹp theo dung lượng và tuổi."""
+
+    def __init__(
+        self,
+        thu_muc: Optional[str] = None,
+        dung_luong_toi_da_byte: int = 1 << 30,
+        tuoi_toi_da_giay: float = 3600.0,
+    ):
+        self.thu_muc = thu_muc or os.path.join(tempfile.gettempdir(), "bo_loc_xuat")
+        self.dung_luong_toi_da_byte = int(dung_luong_toi_da_byte)
+        self.tuoi_toi_da_giay = float(tuoi_toi_da_giay)
+        self._khoa = threading.Lock()
+        self._so_tep_da_xoa = 0
+
+    def tao_tep(self, duoi: str) -> BinaryIO:
+        """File mới (mở để ghi nhị phân) đuôi `duoi` trong thư mục xuất."""
+        os.makedirs(self.thu_muc, exist_ok=True)
+        return tempfile.NamedTemporaryFile(delete=False, suffix=duoi, dir=self.thu_muc)
+
+    def _liet_ke(self) -> List[Tuple[float, int, str]]:
+        """(mtime, số byte, đường dẫn) của các file trong thư mục."""
+        ds = []
+        try:
+            cac_muc = list(os.scandir(self.thu_muc))
+        except FileNotFoundError:
+            return ds
+        for muc in cac_muc:
+            try:
+                if muc.is_file(follow_symlinks=False):
+                    st = muc.stat(follow_symlinks=False)
+                    ds.append((st.st_mtime, st.st_size, muc.path))
+            except FileNotFoundError:  # luồng / tiến trình khác vừa xoá
+                pass
+        return ds
+
+    def don_dep(self, giu: Iterable[str] = ()) -> int:
+        """
+        Xoá file quá tuổi, rồi file cũ nhất tới khi tổng dung lượng không vượt
+        giới hạn (trừ các file trong `giu`, ví dụ file vừa ghi). Trả số byte
+        đã giải phóng.
+        """
+        giu = {os.path.abspath(p) for p in giu}
+        with self._khoa:
+            ds = sorted(self._liet_ke())
+            tong = sum(kt for _, kt, _ in ds)
+            han = time.time() - self.tuoi_toi_da_giay
+            da_xoa = 0
+
+            for mtime, kt, duong_dan in ds:
+                if mtime >= han and tong - da_xoa <= self.dung_luong_toi_da_byte:
+                    break
+                if os.path.abspath(duong_dan) in giu:
+                    continue
+                try:
+                    os.remove(duong_dan)
+                except FileNotFoundError:
+                    pass
+                da_xoa += kt
+                self._so_tep_da_xoa += 1
+            return da_xoa
+
+    def thong_ke(self) -> Dict[str, Any]:
+        """Số file, tổng byte đang dùng, giới hạn và số file đã xoá."""
+        ds = self._liet_ke()
+        return {
+            "thu_muc": self.thu_muc,
+            "so_tep": len(ds),
+            "tong_byte": sum(kt for _, kt, _ in ds),
+            "dung_luong_toi_da_byte": self.dung_luong_toi_da_byte,
+            "tuoi_toi_da_giay": self.tuoi_toi_da_giay,
+            "so_tep_da_xoa": self._so_tep_da_xoa,
+        }
+
+
+THU_MUC_XUAT = ThuMucXuat(
+    os.environ.get("BO_LOC_THU_MUC_XUAT") or None,
+    int(float(os.environ.get("BO_LOC_XUAT_TOI_DA_MIB", 1024)) * 2**20),
+    float(os.environ.get("BO_LOC_XUAT_TUOI_GIAY", 3600)),
+)
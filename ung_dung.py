@@ -1,24 +1,215 @@
-import gradio as gr
+import argparse
+import functools
+import os
+from typing import Optional, Tuple
 
-from tien_ich import doc_anh_hoac_csv, chuan_hoa_uint8, luu_png, luu_csv
+import gradio as gr
+import numpy as np
+
+from tien_ich import (
+    doc_anh_hoac_csv,
+    chuan_hoa_uint8,
+    luu_png,
+    luu_ma_tran,
+    BoNhoDemLRU,
+    bam_noi_dung,
+    NhomTienTrinh,
+    THU_MUC_XUAT,
+)
+from tien_ich.do_luong import dang_bat, phien_do, bang_phan_tich, bang_phan_vi
 from bo_loc import (
-    loc_trung_binh,
-    loc_gauss,
-    loc_median,
-    nhan_sobel,
-    nhan_prewitt,
-    dap_ung_laplacian,
-    bien_do_gradient,
-    nhi_phan_hoa_bien,  # dùng cho ngưỡng nhị phân hoá biên
+    ap_chinh_sach,
+    luong_tu_bien,
+    bieu_do_bien,
+    ti_le_bien,
+    nguong_otsu,
+    thap_anh,
+    chon_muc,
+    lam_nong_jit,
 )
+from bo_loc.quy_trinh import lam_min, bien_do, nhi_phan_hoa, CAC_LOAI_BIEN
 
 
 TIEU_DE = "## 🔍 Ứng dụng bộ lọc làm mịn và phát hiện biên"
 
+# Lọc Mean dùng bảng tích phân (chi phí không phụ thuộc kernel) nên cho phép
+# kernel lớn hơn hẳn Gaussian
+KERNEL_MEAN_TOI_DA = 51
+KERNEL_GAUSS_TOI_DA = 15
+# Sigma nhỏ nhất của slider Bilateral: sigma nhỏ hơn làm lưới song phương phình
+# (bị chặn bởi lam_min.GIOI_HAN_BYTE_LUOI nhưng xấp xỉ thô đi)
+SIGMA_KHONG_GIAN_TOI_THIEU = 2.0
+SIGMA_GIA_TRI_TOI_THIEU = 10
+
+# Chính sách kiểu dữ liệu (xem bo_loc/kieu_du_lieu.py), đổi bằng --chinh-sach:
+# "float32" (mặc định) | "float64" (tham chiếu) | "co_dinh" (uint8 + int32)
+CHINH_SACH_KIEU = "float32"
+
+# Cạnh dài (điểm ảnh) của bản xem trước: nút Chạy lọc trước 1 mức tháp ảnh
+# cỡ khung hiển thị rồi mới lọc ảnh đầy đủ. 0 = tắt xem trước.
+CANH_XEM_TRUOC = 512
+
+# Nhãn bộ lọc làm mịn trên giao diện → tên trong bo_loc.quy_trinh
+LOC_THEO_NHAN = {
+    "Trung bình (Mean)": "trung_binh",
+    "Gaussian": "gauss",
+    "Median": "median",
+    "Bilateral (giữ biên)": "song_phuong",
+}
+
+
+# =========================================================
+# 0. BỘ NHỚ ĐỆM DÙNG CHUNG
+# =========================================================
+# Ảnh đã giải mã, các bước trung gian (ảnh làm mịn, độ lớn biên) và file xuất,
+# khoá theo băm nội dung file + tham số → gửi lại cùng file/tham số, hoặc
+# dùng cùng ảnh ở cả 2 tab, không phải tính lại.
+BO_NHO_DEM = BoNhoDemLRU(ngan_sach_byte=512 * 1024 * 1024)
+
+# Chế độ phục vụ (main): phần lọc chạy ở nhóm tiến trình khởi động sẵn thay
+# vì trong tiến trình máy chủ. None = tính ngay trong handler.
+NHOM_TIEN_TRINH: Optional[NhomTienTrinh] = None
+
+
+def _tinh(ham, anh: np.ndarray, *args, **kwargs) -> np.ndarray:
+    """Chạy bộ lọc ham(anh, ...) ở nhóm tiến trình nếu có, không thì tại chỗ."""
+    if NHOM_TIEN_TRINH is None:
+        return ham(anh, *args, **kwargs)
+    return NHOM_TIEN_TRINH.chay(ham, anh, *args, **kwargs)
+
+
+def _lam_nong_tien_trinh_con() -> None:
+    """Chạy ở mỗi tiến trình con khi khởi động: dựng sẵn kernel, phổ, ..."""
+    lam_nong_jit()
+    anh = np.zeros((32, 32), dtype=np.float32)
+    for loai in LOC_THEO_NHAN.values():
+        lam_min(anh, loai, 3, 1.0, "reflect")
+    for loai in CAC_LOAI_BIEN:
+        bien_do(anh, loai, "reflect", (3, 1.0))
+
+
+def _doc_anh_co_dem(tap_tin, giu_mau: bool = False) -> Tuple[tuple, np.ndarray]:
+    """
+    Giải mã ảnh đầu vào (theo chính sách kiểu), trả (khoá, ảnh).
+    giu_mau=True: ảnh màu giữ dạng (H, W, 3).
+    """
+    try:
+        khoa = ("anh", bam_noi_dung(tap_tin), CHINH_SACH_KIEU, bool(giu_mau))
+        anh = BO_NHO_DEM.lay(khoa)
+        if anh is None:
+            anh = doc_anh_hoac_csv(tap_tin, giu_mau=giu_mau)
+            anh = ap_chinh_sach(anh, CHINH_SACH_KIEU)
+            anh = BO_NHO_DEM.dat(khoa, anh)
+    except Exception as e:
+        raise gr.Error(str(e))
+    return khoa, anh
+
+
+def _lam_min_co_dem(
+    khoa_anh: tuple,
+    anh_goc: np.ndarray,
+    loai_loc: str,
+    kich_thuoc_kernel: int,
+    sigma_gauss: float,
+    kieu_padding: str,
+    sigma_gia_tri: float = 30.0,
+) -> Tuple[tuple, np.ndarray]:
+    """
+    Chạy 1 bộ lọc làm mịn (có đệm), trả (khoá, ảnh sau lọc).
+    Bilateral: sigma_gauss là sigma không gian, sigma_gia_tri theo mức xám.
+    """
+    loai = LOC_THEO_NHAN.get(loai_loc)
+    if loai is None:
+        raise gr.Error("Loại bộ lọc làm mịn không hợp lệ.")
+
+    # Khoá chỉ gồm tham số có tác dụng với bộ lọc đã chọn
+    song_phuong = loai == "song_phuong"
+    sigma = float(sigma_gauss) if loai in ("gauss", "song_phuong") else None
+    if song_phuong:
+        kich_thuoc_kernel = None
+        sigma = (sigma, float(sigma_gia_tri))
+    khoa = ("lam_min", khoa_anh, loai, kich_thuoc_kernel, sigma, kieu_padding)
+    tinh = lambda: _tinh(
+        lam_min,
+        anh_goc,
+        loai,
+        kich_thuoc_kernel,
+        sigma_gauss,
+        kieu_padding,
+        sigma_gia_tri,
+        kenh_cuoi=anh_goc.ndim == 3,
+    )
+
+    return khoa, BO_NHO_DEM.lay_hoac_tinh(khoa, tinh)
+
+
+def _anh_xem_truoc(tap_tin, giu_mau: bool = False) -> Optional[Tuple[int, np.ndarray]]:
+    """
+    (mức, ảnh) trên tháp ảnh (có đệm) nhỏ nhất còn phủ CANH_XEM_TRUOC;
+    None khi tắt xem trước, chưa chọn file hoặc ảnh vốn đã nhỏ.
+    """
+    if tap_tin is None or CANH_XEM_TRUOC <= 0:
+        return None
+    khoa_anh, anh_goc = _doc_anh_co_dem(tap_tin, giu_mau)
+    kenh_cuoi = anh_goc.ndim == 3
+
+    # Đệm các mức thu nhỏ (mức 0 chính là ảnh gốc đã có trong đệm)
+    cac_muc_nho = BO_NHO_DEM.lay_hoac_tinh(
+        ("thap", khoa_anh, CANH_XEM_TRUOC),
+        lambda: tuple(thap_anh(anh_goc, CANH_XEM_TRUOC, kenh_cuoi=kenh_cuoi)[1:]),
+    )
+    muc, anh = chon_muc([anh_goc, *cac_muc_nho], CANH_XEM_TRUOC, kenh_cuoi)
+    return None if muc == 0 else (muc, anh)
+
+
+def _theo_muc(kich_thuoc: int, sigma: float, muc: int) -> Tuple[int, float]:
+    """Kernel (lẻ, >= 3) và sigma tương đương trên ảnh nhỏ hơn 2^muc lần."""
+    return max(3, int(round(kich_thuoc / 2**muc)) | 1), max(0.5, sigma / 2**muc)
+
+
+def _xuat_co_dem(khoa: tuple, anh: np.ndarray, dinh_dang_xuat: str) -> Tuple[str, str]:
+    """File PNG + ma trận của kết quả (dùng lại nếu file còn trên đĩa)."""
+    khoa_xuat = ("xuat", khoa, dinh_dang_xuat)
+    tep = BO_NHO_DEM.lay(khoa_xuat)
+    if tep is None or not all(os.path.exists(p) for p in tep):
+        tep = (luu_png(anh), luu_ma_tran(anh, dinh_dang_xuat))
+        BO_NHO_DEM.dat(khoa_xuat, tep)
+    return tep
+
+
+def _dung_luong_xuat() -> str:
+    """Dòng Markdown: dung lượng thư mục xuất đang dùng / giới hạn."""
+    tk = THU_MUC_XUAT.thong_ke()
+    return (
+        f"Thư mục xuất: {tk['so_tep']} file · {tk['tong_byte'] / 2**20:.1f}"
+        f" / {tk['dung_luong_toi_da_byte'] / 2**20:.0f} MiB"
+        f" · giữ tối đa {tk['tuoi_toi_da_giay'] / 60:.0f} phút"
+        f" · đã xoá {tk['so_tep_da_xoa']} file"
+    )
+
+
+def _kem_phan_tich(ham):
+    """
+    Chạy handler trong 1 phiên đo (tien_ich.do_luong), thêm bảng thời gian
+    từng bước + phân vị cộng dồn vào cuối kết quả ("" khi tắt đo).
+    """
+
+    @functools.wraps(ham)
+    def boc(*args, **kwargs):
+        with phien_do(ham.__name__) as ds:
+            ket_qua = ham(*args, **kwargs)
+        bang = bang_phan_tich(ds)
+        if bang:
+            bang += "\n\n**Cộng dồn mọi yêu cầu**\n\n" + bang_phan_vi()
+        return (*ket_qua, bang)
+
+    return boc
+
 
 # =========================================================
 # 1. XỬ LÝ LÀM MỊN
 # =========================================================
+@_kem_phan_tich
 def xu_ly_lam_min(
     tap_tin,
     loai_loc: str,
@@ -26,74 +217,145 @@ def xu_ly_lam_min(
     sigma_gauss: float,
     kich_thuoc_kernel_median: int,
     kieu_padding: str,
+    giu_mau: bool = False,
+    sigma_khong_gian: float = 4.0,
+    sigma_gia_tri: float = 30.0,
 ):
     if tap_tin is None:
         raise gr.Error("Vui lòng chọn ảnh đầu vào.")
 
-    try:
-        anh_goc = doc_anh_hoac_csv(tap_tin)  # float32, ảnh xám 0–255
-    except Exception as e:
-        raise gr.Error(str(e))
-
-    anh_goc = anh_goc.astype(float)
+    # ảnh xám 0–255, hoặc (H, W, 3) nếu giữ màu và ảnh vào là ảnh màu
+    khoa_anh, anh_goc = _doc_anh_co_dem(tap_tin, giu_mau)
 
     # Chỉ chạy đúng 1 bộ lọc được chọn
-    if loai_loc == "Trung bình (Mean)":
-        anh_sau = loc_trung_binh(anh_goc, kich_thuoc_kernel_lam_min, kieu_padding)
-    elif loai_loc == "Gaussian":
-        anh_sau = loc_gauss(
-            anh_goc,
-            kich_thuoc_kernel_lam_min,
-            sigma_gauss,
-            kieu_padding,
-        )
-    elif loai_loc == "Median":
-        anh_sau = loc_median(anh_goc, kich_thuoc_kernel_median, kieu_padding)
-    else:
-        raise gr.Error("Loại bộ lọc làm mịn không hợp lệ.")
-
-    sau_png = luu_png(anh_sau)
-    sau_csv = luu_csv(anh_sau)
+    kich_thuoc = (
+        kich_thuoc_kernel_median if loai_loc == "Median" else kich_thuoc_kernel_lam_min
+    )
+    song_phuong = LOC_THEO_NHAN.get(loai_loc) == "song_phuong"
+    khoa_sau, anh_sau = _lam_min_co_dem(
+        khoa_anh,
+        anh_goc,
+        loai_loc,
+        kich_thuoc,
+        sigma_khong_gian if song_phuong else sigma_gauss,
+        kieu_padding,
+        sigma_gia_tri,
+    )
 
+    # File tải về được ghi ở sự kiện tiếp theo (xuat_lam_min), sau khi ảnh
+    # xem trước đã trả về
     return (
         chuan_hoa_uint8(anh_goc),
         chuan_hoa_uint8(anh_sau),
-        sau_png,
-        sau_csv,
+        {"khoa": khoa_sau, "anh": anh_sau},
+    )
+
+
+# Sau khi lọc xong / đổi định dạng: ghi file tải về của kết quả hiện tại
+def xuat_lam_min(trang_thai, dinh_dang_xuat: str):
+    if trang_thai is None:
+        return gr.skip(), gr.skip(), gr.skip()
+    anh = trang_thai["anh"]
+    if anh.ndim == 3 and dinh_dang_xuat == "CSV":
+        raise gr.Error("CSV chỉ lưu được ảnh xám, chọn NPY/NPZ để tải ảnh màu.")
+    return (*_xuat_co_dem(trang_thai["khoa"], anh, dinh_dang_xuat), _dung_luong_xuat())
+
+
+# Bấm Chạy: lọc trước bản thu nhỏ cỡ màn hình (trả ngay), xu_ly_lam_min
+# chạy tiếp trên ảnh đầy đủ và thay thế
+def xem_truoc_lam_min(
+    tap_tin,
+    loai_loc: str,
+    kich_thuoc_kernel_lam_min: int,
+    sigma_gauss: float,
+    kich_thuoc_kernel_median: int,
+    kieu_padding: str,
+    giu_mau: bool = False,
+    sigma_khong_gian: float = 4.0,
+    sigma_gia_tri: float = 30.0,
+):
+    loai = LOC_THEO_NHAN.get(loai_loc)
+    xem_truoc = _anh_xem_truoc(tap_tin, giu_mau)
+    if loai is None or xem_truoc is None:
+        return gr.skip(), gr.skip()
+    muc, anh = xem_truoc
+
+    kich_thuoc = (
+        kich_thuoc_kernel_median if loai == "median" else kich_thuoc_kernel_lam_min
+    )
+    sigma = sigma_khong_gian if loai == "song_phuong" else sigma_gauss
+    kich_thuoc, sigma = _theo_muc(kich_thuoc, sigma, muc)
+    anh_sau = _tinh(
+        lam_min,
+        anh,
+        loai,
+        kich_thuoc,
+        sigma,
+        kieu_padding,
+        sigma_gia_tri,
+        kenh_cuoi=anh.ndim == 3,
     )
+    return chuan_hoa_uint8(anh), chuan_hoa_uint8(anh_sau)
 
 
-# Ẩn/hiện slider theo loại lọc làm mịn
-def cap_nhat_tham_so_lam_min(loai_loc: str):
+# Ẩn/hiện slider theo loại lọc làm mịn (slider kernel dùng chung Mean / Gaussian:
+# đổi sang Gaussian thì kẹp giá trị về KERNEL_GAUSS_TOI_DA)
+def cap_nhat_tham_so_lam_min(loai_loc: str, kich_thuoc: int):
     if loai_loc == "Trung bình (Mean)":
         return (
-            gr.update(visible=True, label="Kích thước kernel Mean (lẻ)"),
+            gr.update(
+                visible=True,
+                label="Kích thước kernel Mean (lẻ)",
+                maximum=KERNEL_MEAN_TOI_DA,
+            ),
+            gr.update(visible=False),
+            gr.update(visible=False),
             gr.update(visible=False),
             gr.update(visible=False),
         )
     elif loai_loc == "Gaussian":
         return (
-            gr.update(visible=True, label="Kích thước kernel Gaussian (lẻ)"),
+            gr.update(
+                visible=True,
+                label="Kích thước kernel Gaussian (lẻ)",
+                maximum=KERNEL_GAUSS_TOI_DA,
+                value=min(int(kich_thuoc), KERNEL_GAUSS_TOI_DA),
+            ),
             gr.update(visible=True),
             gr.update(visible=False),
+            gr.update(visible=False),
+            gr.update(visible=False),
         )
     elif loai_loc == "Median":
         return (
             gr.update(visible=False),
             gr.update(visible=False),
             gr.update(visible=True),
+            gr.update(visible=False),
+            gr.update(visible=False),
+        )
+    elif loai_loc == "Bilateral (giữ biên)":
+        return (
+            gr.update(visible=False),
+            gr.update(visible=False),
+            gr.update(visible=False),
+            gr.update(visible=True),
+            gr.update(visible=True),
         )
     else:
         return (
             gr.update(visible=True),
             gr.update(visible=True),
             gr.update(visible=True),
+            gr.update(visible=True),
+            gr.update(visible=True),
         )
 
 
 # =========================================================
 # 2. XỬ LÝ PHÁT HIỆN BIÊN
 # =========================================================
+@_kem_phan_tich
 def xu_ly_bien(
     tap_tin,
     loai_bien: str,
@@ -101,74 +363,192 @@ def xu_ly_bien(
     sigma_gauss: float,
     kieu_padding: str,
     dung_gauss_truoc_bien: bool,
-    nguong_bien: int,  # ngưỡng nhị phân hoá
+    nguong_bien: int,  # ngưỡng nhị phân hoá (Canny: ngưỡng cao)
+    nguong_thap: int = 50,  # ngưỡng thấp (chỉ Canny)
+    dung_song_phuong_truoc_bien: bool = False,
+    sigma_khong_gian_bien: float = 4.0,
+    sigma_gia_tri_bien: float = 30.0,
 ):
     if tap_tin is None:
         raise gr.Error("Vui lòng chọn ảnh đầu vào.")
 
-    try:
-        anh_goc = doc_anh_hoac_csv(tap_tin)
-    except Exception as e:
-        raise gr.Error(str(e))
+    khoa_goc, anh_goc = _doc_anh_co_dem(tap_tin)
+    co_dinh = CHINH_SACH_KIEU == "co_dinh"
 
-    # Tuỳ chọn: làm mịn Gaussian trước khi phát hiện biên
-    if dung_gauss_truoc_bien:
-        anh_vao = loc_gauss(
+    # Tuỳ chọn: bilateral giữ biên trước mọi bước khác (cùng khoá đệm với
+    # Bilateral ở tab làm mịn); các bước sau coi kết quả như ảnh vào
+    khoa_anh, anh_vao_bien = khoa_goc, anh_goc
+    if dung_song_phuong_truoc_bien:
+        khoa_anh, anh_vao_bien = _lam_min_co_dem(
+            khoa_goc,
             anh_goc,
+            "Bilateral (giữ biên)",
+            None,
+            sigma_khong_gian_bien,
+            kieu_padding,
+            sigma_gia_tri_bien,
+        )
+
+    # Gaussian + biên số thực: toán tử gộp (đạo hàm Gaussian / LoG) trên
+    # 1 lần thêm lề, không tạo ảnh làm mịn trung gian
+    gop_gauss = dung_gauss_truoc_bien and not co_dinh
+
+    # Tuỳ chọn: làm mịn Gaussian trước khi phát hiện biên
+    # (cùng khoá đệm với Gaussian ở tab làm mịn)
+    if dung_gauss_truoc_bien and not gop_gauss:
+        khoa_vao, anh_vao = _lam_min_co_dem(
+            khoa_anh,
+            anh_vao_bien,
+            "Gaussian",
             kich_thuoc_kernel_gauss,
             sigma_gauss,
             kieu_padding,
         )
     else:
-        anh_vao = anh_goc
+        khoa_vao, anh_vao = khoa_anh, anh_vao_bien
 
     # 1) Ảnh biên mức xám (gradient / Laplacian)
-    if loai_bien == "Sobel":
-        gx, gy = nhan_sobel()
-        anh_bien = bien_do_gradient(
-            anh_vao,
-            gx,
-            gy,
-            kieu_padding,
-            chuan_hoa_0_255=True,
-        )
-    elif loai_bien == "Prewitt":
-        gx, gy = nhan_prewitt()
-        anh_bien = bien_do_gradient(
-            anh_vao,
-            gx,
-            gy,
-            kieu_padding,
-            chuan_hoa_0_255=True,
-        )
-    elif loai_bien == "Laplacian":
-        anh_bien = dap_ung_laplacian(
-            anh_vao,
+    loai = loai_bien.lower()
+    if loai not in CAC_LOAI_BIEN:
+        raise gr.Error("Loại bộ lọc biên không hợp lệ.")
+    gauss_truoc = (kich_thuoc_kernel_gauss, sigma_gauss) if gop_gauss else None
+    tinh_bien = lambda: _tinh(bien_do, anh_vao, loai, kieu_padding, gauss_truoc)
+
+    if gop_gauss:
+        khoa_bien = (
+            "bien_gauss",
+            khoa_anh,
+            loai_bien,
+            kich_thuoc_kernel_gauss,
+            float(sigma_gauss),
             kieu_padding,
-            chuan_hoa_0_255=True,
         )
     else:
-        raise gr.Error("Loại bộ lọc biên không hợp lệ.")
+        khoa_bien = ("bien", khoa_vao, loai_bien, kieu_padding)
+    anh_bien = BO_NHO_DEM.lay_hoac_tinh(khoa_bien, tinh_bien)
 
-    # 2) Nhị phân hoá ảnh biên theo NGƯỠNG
-    anh_bien_nhi_phan = nhi_phan_hoa_bien(anh_bien, nguong_bien)
+    # 2) Lượng tử uint8 + histogram 256 mức: kéo ngưỡng sau đó chỉ dùng
+    #    trạng thái này (bảng tra 256 phần tử, Otsu / tỉ lệ biên O(256))
+    anh_luong_tu = BO_NHO_DEM.lay_hoac_tinh(
+        ("luong_tu", khoa_bien), lambda: luong_tu_bien(anh_bien)
+    )
+    trang_thai = {
+        "khoa": khoa_bien,
+        "loai": loai,
+        "luong_tu": anh_luong_tu,
+        "bieu_do": bieu_do_bien(anh_luong_tu),
+    }
 
-    # 3) Lưu file ảnh biên nhị phân
-    bien_png = luu_png(anh_bien_nhi_phan)
-    bien_csv = luu_csv(anh_bien_nhi_phan)
+    # 3) Nhị phân hoá ảnh biên theo NGƯỠNG (Canny: ngưỡng kép có trễ)
+    anh_bien_nhi_phan = _nhi_phan(trang_thai, nguong_bien, nguong_thap)
 
     # Trả về:
     #  - Ảnh gốc (xám)
     #  - Ảnh biên nhị phân (0/255)
-    #  - File PNG + CSV của ảnh biên nhị phân
+    #  - Trạng thái cho xem trước ngưỡng + dòng tỉ lệ biên / ngưỡng Otsu
+    # File tải về được ghi ở sự kiện tiếp theo (xuat_theo_nguong)
     return (
         chuan_hoa_uint8(anh_goc),
-        chuan_hoa_uint8(anh_bien_nhi_phan),
-        bien_png,
-        bien_csv,
+        anh_bien_nhi_phan,
+        trang_thai,
+        _mo_ta_nguong(trang_thai, nguong_bien, anh_bien_nhi_phan),
     )
 
 
+# Bấm Chạy: ảnh biên nhị phân của bản thu nhỏ cỡ màn hình trước
+def xem_truoc_bien(
+    tap_tin,
+    loai_bien: str,
+    kich_thuoc_kernel_gauss: int,
+    sigma_gauss: float,
+    kieu_padding: str,
+    dung_gauss_truoc_bien: bool,
+    nguong_bien: int,
+    nguong_thap: int = 50,
+    dung_song_phuong_truoc_bien: bool = False,
+    sigma_khong_gian_bien: float = 4.0,
+    sigma_gia_tri_bien: float = 30.0,
+):
+    loai = loai_bien.lower()
+    xem_truoc = _anh_xem_truoc(tap_tin)
+    if loai not in CAC_LOAI_BIEN or xem_truoc is None:
+        return gr.skip(), gr.skip()
+    muc, anh = xem_truoc
+
+    gauss_truoc = None
+    if dung_gauss_truoc_bien:
+        gauss_truoc = _theo_muc(kich_thuoc_kernel_gauss, sigma_gauss, muc)
+    song_phuong_truoc = None
+    if dung_song_phuong_truoc_bien:
+        song_phuong_truoc = (max(1.0, sigma_khong_gian_bien / 2**muc), sigma_gia_tri_bien)
+    anh_bien = _tinh(bien_do, anh, loai, kieu_padding, gauss_truoc, song_phuong_truoc)
+    nhi_phan = nhi_phan_hoa(luong_tu_bien(anh_bien), loai, nguong_bien, nguong_thap)
+    return chuan_hoa_uint8(anh), nhi_phan
+
+
+def _nhi_phan(trang_thai: dict, nguong: int, nguong_thap: int) -> np.ndarray:
+    return nhi_phan_hoa(trang_thai["luong_tu"], trang_thai["loai"], nguong, nguong_thap)
+
+
+def _khoa_nhi_phan(trang_thai: dict, nguong: int, nguong_thap: int) -> tuple:
+    khoa = ("nhi_phan", trang_thai["khoa"], int(nguong))
+    if trang_thai["loai"] == "canny":
+        khoa += (int(min(nguong_thap, nguong)),)
+    return khoa
+
+
+def _bieu_do_otsu(trang_thai: dict) -> np.ndarray:
+    # Canny: bỏ mức 0 (điểm đã bị khử không cực đại chiếm gần hết ảnh)
+    bieu_do = trang_thai["bieu_do"]
+    if trang_thai["loai"] == "canny":
+        bieu_do = bieu_do.copy()
+        bieu_do[0] = 0
+    return bieu_do
+
+
+def _mo_ta_nguong(trang_thai: dict, nguong: int, nhi_phan: np.ndarray) -> str:
+    if trang_thai["loai"] == "canny":
+        # Trễ ngưỡng phụ thuộc liên thông → đếm trên ảnh kết quả
+        ti_le = np.count_nonzero(nhi_phan) / max(nhi_phan.size, 1)
+    else:
+        ti_le = ti_le_bien(trang_thai["bieu_do"], nguong)
+    return (
+        f"Điểm biên: **{ti_le:.2%}** ảnh"
+        f" · Ngưỡng Otsu: **{nguong_otsu(_bieu_do_otsu(trang_thai))}**"
+    )
+
+
+# Kéo thanh ngưỡng: chỉ nhị phân hoá lại ảnh lượng tử đã có, không lọc lại
+def xem_truoc_nguong(trang_thai, nguong: int, nguong_thap: int = 50):
+    if trang_thai is None:
+        return gr.skip(), gr.skip()
+    nhi_phan = _nhi_phan(trang_thai, nguong, nguong_thap)
+    return nhi_phan, _mo_ta_nguong(trang_thai, nguong, nhi_phan)
+
+
+# Sau khi chạy / thả thanh ngưỡng / đổi định dạng: mới ghi file tải về
+# cho ngưỡng cuối cùng
+def xuat_theo_nguong(trang_thai, nguong: int, dinh_dang_xuat: str, nguong_thap: int = 50):
+    if trang_thai is None:
+        return gr.skip(), gr.skip(), gr.skip()
+    tep = _xuat_co_dem(
+        _khoa_nhi_phan(trang_thai, nguong, nguong_thap),
+        _nhi_phan(trang_thai, nguong, nguong_thap),
+        dinh_dang_xuat,
+    )
+    return (*tep, _dung_luong_xuat())
+
+
+# Otsu → ngưỡng (Canny: ngưỡng cao, ngưỡng thấp = 1/2 ngưỡng cao)
+def nguong_tu_dong(trang_thai):
+    if trang_thai is None:
+        raise gr.Error("Hãy chạy phát hiện biên trước.")
+    nguong = nguong_otsu(_bieu_do_otsu(trang_thai))
+    if trang_thai["loai"] == "canny":
+        return nguong, nguong // 2
+    return nguong, gr.skip()
+
+
 # Ẩn/hiện tham số Gaussian trước biên
 def cap_nhat_gauss_truoc_bien(dung_gauss: bool):
     vis = True if dung_gauss else False
@@ -178,11 +558,28 @@ def cap_nhat_gauss_truoc_bien(dung_gauss: bool):
     )
 
 
+# Ẩn/hiện tham số Bilateral trước biên
+def cap_nhat_song_phuong_truoc_bien(dung_song_phuong: bool):
+    return (
+        gr.update(visible=bool(dung_song_phuong)),
+        gr.update(visible=bool(dung_song_phuong)),
+    )
+
+
+# Ngưỡng thấp chỉ hiện với Canny
+def cap_nhat_loai_bien(loai_bien: str):
+    return gr.update(visible=loai_bien == "Canny")
+
+
 # =========================================================
 # 3. GIAO DIỆN
 # =========================================================
 def tao_giao_dien() -> gr.Blocks:
-    with gr.Blocks(title="Bộ lọc ảnh – Làm mịn & Phát hiện biên") as demo:
+    # delete_cache: bản sao file tải về trong bộ nhớ đệm của Gradio cũng bị
+    # xoá sau 1 giờ (kiểm tra mỗi giờ)
+    with gr.Blocks(
+        title="Bộ lọc ảnh – Làm mịn & Phát hiện biên", delete_cache=(3600, 3600)
+    ) as demo:
         gr.Markdown(TIEU_DE)
 
         with gr.Tabs():
@@ -192,21 +589,21 @@ def tao_giao_dien() -> gr.Blocks:
                     with gr.Column(scale=1):
                         gr.Markdown("#### 1. Ảnh đầu vào")
                         tap_tin_lam_min = gr.File(
-                            label="Chọn ảnh PNG/JPG hoặc CSV (ma trận xám)",
-                            file_types=["image", ".csv"],
+                            label="Chọn ảnh PNG/JPG hoặc CSV/NPY/NPZ (ma trận xám)",
+                            file_types=["image", ".csv", ".npy", ".npz"],
                         )
 
                     with gr.Column(scale=1):
                         gr.Markdown("#### 2. Chọn bộ lọc & tham số")
 
                         loai_loc_lam_min = gr.Radio(
-                            choices=["Trung bình (Mean)", "Gaussian", "Median"],
+                            choices=list(LOC_THEO_NHAN),
                             value="Trung bình (Mean)",
                             label="Chọn 1 bộ lọc làm mịn",
                         )
                         kich_thuoc_kernel_lam_min = gr.Slider(
                             3,
-                            15,
+                            KERNEL_MEAN_TOI_DA,
                             value=3,
                             step=2,
                             label="Kích thước kernel Mean (lẻ)",
@@ -228,57 +625,105 @@ def tao_giao_dien() -> gr.Blocks:
                             label="Kích thước kernel Median (lẻ)",
                             visible=False,
                         )
+                        sigma_khong_gian = gr.Slider(
+                            SIGMA_KHONG_GIAN_TOI_THIEU,
+                            16.0,
+                            value=4.0,
+                            step=0.5,
+                            label="Sigma không gian (điểm ảnh)",
+                            visible=False,
+                        )
+                        sigma_gia_tri = gr.Slider(
+                            SIGMA_GIA_TRI_TOI_THIEU,
+                            100,
+                            value=30,
+                            step=1,
+                            label="Sigma mức xám (chênh lệch được làm mịn)",
+                            visible=False,
+                        )
                         kieu_padding_lam_min = gr.Radio(
                             choices=["reflect", "replicate", "zero"],
                             value="reflect",
                             label="Kiểu padding biên",
                         )
+                        dinh_dang_lam_min = gr.Radio(
+                            choices=["CSV", "NPY", "NPZ"],
+                            value="CSV",
+                            label="Định dạng file ma trận tải về",
+                        )
+                        giu_mau_lam_min = gr.Checkbox(
+                            value=False,
+                            label="Giữ màu (lọc đồng thời 3 kênh R, G, B)",
+                        )
 
                 nut_lam_min = gr.Button("▶ Chạy lọc làm mịn")
 
                 gr.Markdown("#### 3. So sánh ảnh gốc và ảnh sau làm mịn")
 
                 with gr.Row():
-                    anh_goc_lam_min_out = gr.Image(
-                        label="Ảnh gốc (xám)", image_mode="L"
-                    )
-                    anh_sau_lam_min_out = gr.Image(
-                        label="Ảnh sau lọc làm mịn", image_mode="L"
-                    )
+                    anh_goc_lam_min_out = gr.Image(label="Ảnh gốc")
+                    anh_sau_lam_min_out = gr.Image(label="Ảnh sau lọc làm mịn")
 
                 gr.Markdown("#### 4. Tải kết quả (chỉ ảnh sau lọc)")
 
                 with gr.Row():
                     sau_lam_min_png = gr.File(label="Ảnh sau lọc PNG")
-                    sau_lam_min_csv = gr.File(label="Ảnh sau lọc CSV")
+                    sau_lam_min_csv = gr.File(label="Ảnh sau lọc (ma trận)")
+                dung_luong_lam_min = gr.Markdown()
+                trang_thai_lam_min = gr.State()
+
+                # Bật bằng BO_LOC_DO_LUONG=1 (xem tien_ich/do_luong.py)
+                with gr.Accordion("⏱ Thời gian từng bước", open=False, visible=dang_bat()):
+                    phan_tich_lam_min = gr.Markdown()
 
                 # đổi loại lọc → ẩn/hiện slider tương ứng
                 loai_loc_lam_min.change(
                     fn=cap_nhat_tham_so_lam_min,
-                    inputs=loai_loc_lam_min,
+                    inputs=[loai_loc_lam_min, kich_thuoc_kernel_lam_min],
                     outputs=[
                         kich_thuoc_kernel_lam_min,
                         sigma_gauss,
                         kich_thuoc_kernel_median,
+                        sigma_khong_gian,
+                        sigma_gia_tri,
                     ],
                 )
 
+                vao_lam_min = [
+                    tap_tin_lam_min,
+                    loai_loc_lam_min,
+                    kich_thuoc_kernel_lam_min,
+                    sigma_gauss,
+                    kich_thuoc_kernel_median,
+                    kieu_padding_lam_min,
+                    giu_mau_lam_min,
+                    sigma_khong_gian,
+                    sigma_gia_tri,
+                ]
+                # Xem trước cỡ màn hình → ảnh đầy đủ → file tải về (bước trước
+                # lỗi thì bỏ các bước sau)
                 nut_lam_min.click(
+                    fn=xem_truoc_lam_min,
+                    inputs=vao_lam_min,
+                    outputs=[anh_goc_lam_min_out, anh_sau_lam_min_out],
+                ).success(
                     fn=xu_ly_lam_min,
-                    inputs=[
-                        tap_tin_lam_min,
-                        loai_loc_lam_min,
-                        kich_thuoc_kernel_lam_min,
-                        sigma_gauss,
-                        kich_thuoc_kernel_median,
-                        kieu_padding_lam_min,
-                    ],
+                    inputs=vao_lam_min,
                     outputs=[
                         anh_goc_lam_min_out,
                         anh_sau_lam_min_out,
-                        sau_lam_min_png,
-                        sau_lam_min_csv,
+                        trang_thai_lam_min,
+                        phan_tich_lam_min,
                     ],
+                ).success(
+                    fn=xuat_lam_min,
+                    inputs=[trang_thai_lam_min, dinh_dang_lam_min],
+                    outputs=[sau_lam_min_png, sau_lam_min_csv, dung_luong_lam_min],
+                )
+                dinh_dang_lam_min.change(
+                    fn=xuat_lam_min,
+                    inputs=[trang_thai_lam_min, dinh_dang_lam_min],
+                    outputs=[sau_lam_min_png, sau_lam_min_csv, dung_luong_lam_min],
                 )
 
             # ---------------- TAB 2: PHÁT HIỆN BIÊN ----------------
@@ -287,15 +732,15 @@ def tao_giao_dien() -> gr.Blocks:
                     with gr.Column(scale=1):
                         gr.Markdown("#### 1. Ảnh đầu vào")
                         tap_tin_bien = gr.File(
-                            label="Chọn ảnh PNG/JPG hoặc CSV (ma trận xám)",
-                            file_types=["image", ".csv"],
+                            label="Chọn ảnh PNG/JPG hoặc CSV/NPY/NPZ (ma trận xám)",
+                            file_types=["image", ".csv", ".npy", ".npz"],
                         )
 
                     with gr.Column(scale=1):
                         gr.Markdown("#### 2. Chọn bộ lọc biên & tham số")
 
                         loai_bien = gr.Radio(
-                            choices=["Sobel", "Prewitt", "Laplacian"],
+                            choices=["Sobel", "Prewitt", "Laplacian", "Canny"],
                             value="Sobel",
                             label="Chọn 1 bộ lọc biên",
                         )
@@ -319,6 +764,26 @@ def tao_giao_dien() -> gr.Blocks:
                             label="Sigma Gaussian",
                             visible=True,
                         )
+                        dung_song_phuong_truoc_bien = gr.Checkbox(
+                            value=False,
+                            label="Lọc Bilateral (giữ biên) trước khi phát hiện biên",
+                        )
+                        sigma_khong_gian_bien = gr.Slider(
+                            SIGMA_KHONG_GIAN_TOI_THIEU,
+                            16.0,
+                            value=4.0,
+                            step=0.5,
+                            label="Sigma không gian (điểm ảnh)",
+                            visible=False,
+                        )
+                        sigma_gia_tri_bien = gr.Slider(
+                            SIGMA_GIA_TRI_TOI_THIEU,
+                            100,
+                            value=30,
+                            step=1,
+                            label="Sigma mức xám (chênh lệch được làm mịn)",
+                            visible=False,
+                        )
                         kieu_padding_bien = gr.Radio(
                             choices=["reflect", "replicate", "zero"],
                             value="reflect",
@@ -330,7 +795,21 @@ def tao_giao_dien() -> gr.Blocks:
                             maximum=255,
                             value=100,
                             step=1,
-                            label="Ngưỡng nhị phân hoá biên",
+                            label="Ngưỡng nhị phân hoá biên (Canny: ngưỡng cao)",
+                        )
+                        nguong_thap_bien = gr.Slider(
+                            minimum=0,
+                            maximum=255,
+                            value=50,
+                            step=1,
+                            label="Ngưỡng thấp (Canny)",
+                            visible=False,
+                        )
+                        nut_otsu = gr.Button("Ngưỡng tự động (Otsu)", size="sm")
+                        dinh_dang_bien = gr.Radio(
+                            choices=["CSV", "NPY", "NPZ"],
+                            value="CSV",
+                            label="Định dạng file ma trận tải về",
                         )
 
                 nut_bien = gr.Button("▶ Chạy phát hiện biên")
@@ -345,12 +824,18 @@ def tao_giao_dien() -> gr.Blocks:
                         label="Ảnh biên nhị phân (0/255)",
                         image_mode="L",
                     )
+                mo_ta_nguong = gr.Markdown()
+                trang_thai_bien = gr.State()
 
                 gr.Markdown("#### 4. Tải kết quả (chỉ ảnh biên)")
 
                 with gr.Row():
                     bien_png = gr.File(label="Ảnh biên PNG")
-                    bien_csv = gr.File(label="Ảnh biên CSV")
+                    bien_csv = gr.File(label="Ảnh biên (ma trận)")
+                dung_luong_bien = gr.Markdown()
+
+                with gr.Accordion("⏱ Thời gian từng bước", open=False, visible=dang_bat()):
+                    phan_tich_bien = gr.Markdown()
 
                 # Ẩn/hiện tham số Gaussian trước biên
                 dung_gauss_truoc_bien.change(
@@ -358,29 +843,139 @@ def tao_giao_dien() -> gr.Blocks:
                     inputs=dung_gauss_truoc_bien,
                     outputs=[kich_thuoc_kernel_gauss, sigma_gauss_bien],
                 )
+                dung_song_phuong_truoc_bien.change(
+                    fn=cap_nhat_song_phuong_truoc_bien,
+                    inputs=dung_song_phuong_truoc_bien,
+                    outputs=[sigma_khong_gian_bien, sigma_gia_tri_bien],
+                )
+
+                # Ghi file tải về của ảnh biên nhị phân hiện tại
+                xuat_bien = dict(
+                    fn=xuat_theo_nguong,
+                    inputs=[trang_thai_bien, nguong_bien, dinh_dang_bien, nguong_thap_bien],
+                    outputs=[bien_png, bien_csv, dung_luong_bien],
+                )
 
+                vao_bien = [
+                    tap_tin_bien,
+                    loai_bien,
+                    kich_thuoc_kernel_gauss,
+                    sigma_gauss_bien,
+                    kieu_padding_bien,
+                    dung_gauss_truoc_bien,
+                    nguong_bien,
+                    nguong_thap_bien,
+                    dung_song_phuong_truoc_bien,
+                    sigma_khong_gian_bien,
+                    sigma_gia_tri_bien,
+                ]
                 nut_bien.click(
+                    fn=xem_truoc_bien,
+                    inputs=vao_bien,
+                    outputs=[anh_goc_bien_out, anh_bien_out],
+                ).success(
                     fn=xu_ly_bien,
-                    inputs=[
-                        tap_tin_bien,
-                        loai_bien,
-                        kich_thuoc_kernel_gauss,
-                        sigma_gauss_bien,
-                        kieu_padding_bien,
-                        dung_gauss_truoc_bien,
-                        nguong_bien,
-                    ],
+                    inputs=vao_bien,
                     outputs=[
                         anh_goc_bien_out,
                         anh_bien_out,
-                        bien_png,
-                        bien_csv,
+                        trang_thai_bien,
+                        mo_ta_nguong,
+                        phan_tich_bien,
                     ],
+                ).success(**xuat_bien)
+
+                loai_bien.change(
+                    fn=cap_nhat_loai_bien,
+                    inputs=loai_bien,
+                    outputs=nguong_thap_bien,
                 )
 
+                # Xem trước ngưỡng trực tiếp; ghi file khi thả thanh trượt
+                cac_nguong = [trang_thai_bien, nguong_bien, nguong_thap_bien]
+                for thanh in (nguong_bien, nguong_thap_bien):
+                    thanh.change(
+                        fn=xem_truoc_nguong,
+                        inputs=cac_nguong,
+                        outputs=[anh_bien_out, mo_ta_nguong],
+                        trigger_mode="always_last",
+                        show_progress="hidden",
+                    )
+                    thanh.release(**xuat_bien)
+                nut_otsu.click(
+                    fn=nguong_tu_dong,
+                    inputs=trang_thai_bien,
+                    outputs=[nguong_bien, nguong_thap_bien],
+                ).then(**xuat_bien)
+                dinh_dang_bien.change(**xuat_bien)
+
         return demo
 
 
-if __name__ == "__main__":
+def tao_tham_so() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Giao diện bộ lọc làm mịn & phát hiện biên.")
+    p.add_argument("--host", default=None, help="Địa chỉ lắng nghe (mặc định của Gradio)")
+    p.add_argument("--cong", type=int, default=None, help="Cổng (mặc định 7860)")
+    p.add_argument(
+        "--so-tien-trinh",
+        type=int,
+        default=0,
+        help="Số tiến trình tính toán khởi động sẵn (0 = tính trong tiến trình máy chủ)",
+    )
+    p.add_argument(
+        "--gioi-han-dong-thoi",
+        type=int,
+        default=None,
+        help="Số yêu cầu xử lý cùng lúc mỗi sự kiện (mặc định = số tiến trình, tối thiểu 1)",
+    )
+    p.add_argument(
+        "--hang-doi-toi-da",
+        type=int,
+        default=64,
+        help="Số yêu cầu chờ tối đa; đầy thì từ chối ngay thay vì treo",
+    )
+    p.add_argument(
+        "--canh-xem-truoc",
+        type=int,
+        default=CANH_XEM_TRUOC,
+        help="Cạnh dài (điểm ảnh) của bản xem trước trả về trước ảnh đầy đủ (0 = tắt)",
+    )
+    p.add_argument(
+        "--chinh-sach",
+        choices=["float32", "float64", "co_dinh"],
+        default=CHINH_SACH_KIEU,
+        help="Chính sách kiểu dữ liệu (bo_loc/kieu_du_lieu.py)",
+    )
+    return p
+
+
+def main(argv=None) -> None:
+    global NHOM_TIEN_TRINH, CANH_XEM_TRUOC, CHINH_SACH_KIEU
+    args = tao_tham_so().parse_args(argv)
+    CANH_XEM_TRUOC = args.canh_xem_truoc
+    CHINH_SACH_KIEU = args.chinh_sach
+
+    # Tạo nhóm tiến trình TRƯỚC khi máy chủ mở các luồng
+    if args.so_tien_trinh > 0:
+        NHOM_TIEN_TRINH = NhomTienTrinh(
+            args.so_tien_trinh,
+            khoi_dong=_lam_nong_tien_trinh_con,
+            nap_truoc=("numpy", "bo_loc", "bo_loc.quy_trinh"),
+        )
+    else:
+        # Biên dịch (hoặc nạp từ cache đĩa) nhân numba trước yêu cầu đầu tiên;
+        # không có numba thì không làm gì
+        lam_nong_jit()
+    gioi_han = args.gioi_han_dong_thoi or max(1, args.so_tien_trinh)
+
     app = tao_giao_dien()
-    app.launch()
+    app.queue(max_size=args.hang_doi_toi_da, default_concurrency_limit=gioi_han)
+    try:
+        app.launch(server_name=args.host, server_port=args.cong)
+    finally:
+        if NHOM_TIEN_TRINH is not None:
+            NHOM_TIEN_TRINH.dong()
+
+
+if __name__ == "__main__":
+    main()
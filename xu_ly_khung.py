@@ -0,0 +1,105 @@
+# xu_ly_khung.py
+"""
+Phát hiện biên trên chuỗi khung hình cùng độ phân giải (video đã tách khung,
+ảnh chụp liên tiếp từ camera), in số khung / giây.
+
+Ví dụ:
+    python xu_ly_khung.py khung/ --loc sobel --gauss-truoc 5 1.0 --nguong 100
+    python xu_ly_khung.py video.npy --ra ket_qua/ --do-cap-phat
+    python xu_ly_khung.py "cam/*.png" --loc prewitt --kieu float64 --lap 5
+
+- Đầu vào: tệp .npy chồng (N, H, W) (đọc bằng memmap), tệp ảnh nhiều khung
+  (GIF, TIFF), thư mục hoặc mẫu glob các tệp ảnh (đổi sang ảnh xám).
+- Bộ đệm cấp 1 lần ở khung đầu (bo_loc.LuongBien), các khung sau chỉ ghi đè.
+  Giải mã ảnh (PIL) và --ra (mã hoá PNG) vẫn cấp phát theo khung: fps xử lý
+  chỉ tính bước lọc, fps tổng tính cả đọc / ghi.
+"""
+import argparse
+import itertools
+import os
+import sys
+from typing import List, Optional
+
+from tien_ich import luu_png
+from bo_loc import LuongBien, doc_chuoi_khung, xu_ly_chuoi_khung
+
+
+def tao_tham_so() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        description="Phát hiện biên trên chuỗi khung hình, đo số khung / giây."
+    )
+    p.add_argument("vao", help="Tệp .npy (N, H, W), ảnh nhiều khung, thư mục hoặc mẫu glob")
+    p.add_argument("--ra", help="Thư mục ghi ảnh biên từng khung (<số thứ tự>.png)")
+    p.add_argument("--loc", choices=["sobel", "prewitt"], default="sobel")
+    p.add_argument("--padding", choices=["reflect", "replicate", "zero"], default="reflect")
+    p.add_argument(
+        "--gauss-truoc",
+        nargs=2,
+        type=float,
+        metavar=("KS", "SIGMA"),
+        help="Làm mịn Gaussian trước khi phát hiện biên",
+    )
+    p.add_argument("--nguong", type=int, help="Nhị phân hoá ảnh biên theo ngưỡng 0–255")
+    p.add_argument("--kieu", choices=["float32", "float64"], default="float32")
+    p.add_argument("--so-khung", type=int, help="Chỉ xử lý tối đa chừng này khung")
+    p.add_argument("--lap", type=int, default=1, help="Lặp lại cả chuỗi (đo lâu hơn)")
+    p.add_argument(
+        "--do-cap-phat",
+        action="store_true",
+        help="Đo bộ nhớ cấp thêm mỗi khung bằng tracemalloc (chậm hơn)",
+    )
+    return p
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = tao_tham_so().parse_args(argv)
+
+    gauss_truoc = None
+    if args.gauss_truoc:
+        gauss_truoc = (int(args.gauss_truoc[0]), args.gauss_truoc[1])
+        if gauss_truoc[0] % 2 == 0:
+            print("Kích thước kernel phải lẻ.", file=sys.stderr)
+            return 2
+
+    cac_khung = itertools.chain.from_iterable(
+        doc_chuoi_khung(args.vao) for _ in range(max(1, args.lap))
+    )
+    if args.so_khung is not None:
+        cac_khung = itertools.islice(cac_khung, args.so_khung)
+    try:
+        dau = next(cac_khung)
+    except (StopIteration, ValueError) as e:
+        print(f"Không đọc được khung hình: {e}", file=sys.stderr)
+        return 2
+
+    luong = LuongBien(dau.shape, args.loc, args.padding, gauss_truoc, args.nguong, args.kieu)
+
+    moi_khung = None
+    if args.ra:
+        os.makedirs(args.ra, exist_ok=True)
+        moi_khung = lambda i, kq: luu_png(kq, os.path.join(args.ra, f"{i:06d}.png"))
+
+    try:
+        tk = xu_ly_chuoi_khung(
+            itertools.chain([dau], cac_khung), luong, moi_khung, args.do_cap_phat
+        )
+    except ValueError as e:
+        print(f"LỖI: {e}", file=sys.stderr)
+        return 1
+
+    H, W = luong.hinh
+    print(f"Khung: {tk['so_khung']} × {W}x{H}  |  bộ đệm: {tk['byte_bo_dem'] / 2**20:.1f} MiB")
+    print(
+        f"Xử lý: {tk['fps']:.1f} khung/s  |  tổng (kể cả đọc/ghi): {tk['fps_tong']:.1f} khung/s"
+    )
+    print(
+        f"ms mỗi khung: khung đầu {tk['ms_khung_dau']:.2f}  |  p50 {tk['ms_p50']:.2f}"
+        f"  |  p99 {tk['ms_p99']:.2f}"
+    )
+    if args.do_cap_phat:
+        print(f"Cấp phát thêm tối đa mỗi khung: {tk['byte_cap_phat_moi_khung'] / 1024:.1f} KiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+# xu_ly_lo.py
+"""
+Chạy lô không giao diện: áp 1 quy trình làm mịn hoặc phát hiện biên lên mọi
+ảnh/ma trận trong thư mục, chia việc cho nhiều tiến trình.
+
+Ví dụ:
+    python xu_ly_lo.py anh_vao/ ket_qua/ --loc gauss --ks 5 --sigma 1.2
+    python xu_ly_lo.py anh_vao/ ket_qua/ --loc sobel --gauss-truoc 5 1.0 \\
+        --nguong 100 --ma-tran NPY --so-tien-trinh 8
+    python xu_ly_lo.py anh_vao/ ket_qua/ --loc song_phuong --sigma 4 --sigma-gia-tri 30
+    python xu_ly_lo.py anh_vao/ ket_qua/ --loc canny --song-phuong-truoc 3 25 --nguong 80
+
+- Kết quả ghi vào thư mục ra theo cấu trúc thư mục con của đầu vào
+  (<tên>.png, thêm <tên>.csv/.npy/.npz nếu có --ma-tran). Các tệp vào cùng
+  thư mục chỉ khác đuôi (a.png, a.csv) trùng tệp kết quả: tệp đầu theo tên
+  được xử lý, các tệp sau báo lỗi (đổi tên để xử lý).
+- Chạy lại được: tệp đã có đủ kết quả thì bỏ qua (trừ khi --ghi-de). Mỗi kết
+  quả ghi ra file tạm rồi đổi tên, nên lần chạy bị ngắt không để lại file dở.
+- Số việc đang chạy tối đa --toi-da-dang-chay (mặc định 2 × số tiến trình)
+  → bộ nhớ không tăng theo số tệp.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from tien_ich import doc_anh_hoac_csv, luu_png, luu_ma_tran
+from bo_loc import ap_chinh_sach
+from bo_loc.theo_dai import DUOI_ANH
+from bo_loc.quy_trinh import lam_min, bien_do, nhi_phan_hoa, CAC_LOAI_LAM_MIN, CAC_LOAI_BIEN
+
+DUOI_VAO = DUOI_ANH + [".csv", ".npy", ".npz"]
+DUOI_MA_TRAN = {"CSV": ".csv", "NPY": ".npy", "NPZ": ".npz"}
+
+
+def tim_tap_tin(vao: str, de_quy: bool = True) -> Iterator[Tuple[str, str]]:
+    """Trả (đường dẫn, đường dẫn tương đối) của các tệp đầu vào, theo thứ tự tên."""
+    if os.path.isfile(vao):
+        yield vao, os.path.basename(vao)
+        return
+
+    for goc, thu_muc, cac_tep in os.walk(vao):
+        thu_muc.sort()
+        if not de_quy:
+            thu_muc.clear()
+        for ten in sorted(cac_tep):
+            if os.path.splitext(ten.lower())[1] in DUOI_VAO:
+                duong_dan = os.path.join(goc, ten)
+                yield duong_dan, os.path.relpath(duong_dan, vao)
+
+
+def cac_tep_dich(tuong_doi: str, ra: str, ma_tran: Optional[str]) -> List[str]:
+    """Các tệp kết quả của 1 tệp vào: PNG (+ ma trận)."""
+    goc = os.path.join(ra, os.path.splitext(tuong_doi)[0])
+    dich = [goc + ".png"]
+    if ma_tran:
+        dich.append(goc + DUOI_MA_TRAN[ma_tran])
+    return dich
+
+
+def _ghi_nguyen_tu(ham_luu, dich: str) -> None:
+    """Ghi ra <dich>.tam rồi đổi tên → không bao giờ để lại kết quả dở."""
+    tam = dich + ".tam"
+    try:
+        ham_luu(tam)
+        os.replace(tam, dich)
+    finally:
+        if os.path.exists(tam):
+            os.remove(tam)
+
+
+def xu_ly_mot_tep(vao: str, dich: List[str], cau_hinh: Dict[str, Any]) -> Dict[str, float]:
+    """Đọc → lọc → ghi 1 tệp; trả thời gian từng bước (giây)."""
+    t0 = time.perf_counter()
+    anh = doc_anh_hoac_csv(vao, canh_toi_da=cau_hinh["canh_toi_da"])
+    anh = ap_chinh_sach(anh, cau_hinh["chinh_sach"])
+    t1 = time.perf_counter()
+
+    loai = cau_hinh["loc"]
+    if loai in CAC_LOAI_LAM_MIN:
+        kq = lam_min(
+            anh,
+            loai,
+            cau_hinh["ks"],
+            cau_hinh["sigma"],
+            cau_hinh["padding"],
+            cau_hinh["sigma_gia_tri"],
+        )
+    else:
+        gauss_truoc = cau_hinh["gauss_truoc"]
+        if gauss_truoc is not None:
+            gauss_truoc = (int(gauss_truoc[0]), gauss_truoc[1])
+        kq = bien_do(anh, loai, cau_hinh["padding"], gauss_truoc, cau_hinh["song_phuong_truoc"])
+        if cau_hinh["nguong"] is not None:
+            kq = nhi_phan_hoa(kq, loai, cau_hinh["nguong"], cau_hinh["nguong_thap"])
+    t2 = time.perf_counter()
+
+    os.makedirs(os.path.dirname(dich[0]) or ".", exist_ok=True)
+    _ghi_nguyen_tu(lambda p: luu_png(kq, p), dich[0])
+    if len(dich) > 1:
+        _ghi_nguyen_tu(lambda p: luu_ma_tran(kq, cau_hinh["ma_tran"], p), dich[1])
+    t3 = time.perf_counter()
+
+    return {"doc": t1 - t0, "loc": t2 - t1, "ghi": t3 - t2, "tong": t3 - t0}
+
+
+def _bo_gioi_han_pil() -> None:
+    """Ảnh quét lớn không phải "bom giải nén": bỏ giới hạn điểm ảnh của PIL."""
+    Image.MAX_IMAGE_PIXELS = None
+
+
+def _chay(
+    viec: Iterator[Tuple[str, List[str]]],
+    cau_hinh: Dict[str, Any],
+    so_tien_trinh: int,
+    toi_da_dang_chay: int,
+) -> Iterator[Tuple[str, Optional[Dict[str, float]], Optional[str]]]:
+    """Chạy các việc, trả (tệp vào, thời gian, lỗi) theo thứ tự hoàn thành."""
+    if so_tien_trinh == 1:
+        for vao, dich in viec:
+            try:
+                yield vao, xu_ly_mot_tep(vao, dich, cau_hinh), None
+            except Exception as e:
+                yield vao, None, str(e)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=so_tien_trinh, initializer=_bo_gioi_han_pil
+    ) as pool:
+        dang_chay: Dict[Any, str] = {}
+        con_viec = True
+        while True:
+            # Nạp thêm việc tới khi đủ giới hạn đang chạy
+            while con_viec and len(dang_chay) < toi_da_dang_chay:
+                mot = next(viec, None)
+                if mot is None:
+                    con_viec = False
+                    break
+                vao, dich = mot
+                dang_chay[pool.submit(xu_ly_mot_tep, vao, dich, cau_hinh)] = vao
+
+            if not dang_chay:
+                return
+
+            xong, _ = wait(dang_chay, return_when=FIRST_COMPLETED)
+            for fut in xong:
+                vao = dang_chay.pop(fut)
+                try:
+                    yield vao, fut.result(), None
+                except Exception as e:
+                    yield vao, None, str(e)
+
+
+def in_tong_ket(
+    thoi_gian: Dict[str, Dict[str, float]],
+    so_bo_qua: int,
+    loi: Dict[str, str],
+    giay: float,
+    tep_bao_cao: Optional[str] = None,
+) -> None:
+    """In thông lượng và thống kê thời gian từng tệp (và ghi CSV nếu cần)."""
+    n = len(thoi_gian)
+    print()
+    print(f"Đã xử lý: {n}  |  bỏ qua (đã có): {so_bo_qua}  |  lỗi: {len(loi)}")
+    print(f"Thời gian: {giay:.2f} s  |  thông lượng: {n / giay if giay > 0 else 0.0:.2f} ảnh/s")
+
+    if n:
+        print("Thời gian mỗi tệp (ms):   trung bình   trung vị      p95      max")
+        for buoc in ("doc", "loc", "ghi", "tong"):
+            t = np.array([v[buoc] for v in thoi_gian.values()]) * 1000.0
+            print(
+                f"  {buoc:<6}              {t.mean():10.1f} {np.median(t):10.1f}"
+                f" {np.percentile(t, 95):8.1f} {t.max():8.1f}"
+            )
+        cham_nhat = sorted(thoi_gian.items(), key=lambda kv: -kv[1]["tong"])[:5]
+        print("Chậm nhất:")
+        for vao, t in cham_nhat:
+            print(f"  {t['tong'] * 1000.0:8.1f} ms  {vao}")
+
+    for vao, thong_bao in loi.items():
+        print(f"LỖI {vao}: {thong_bao}", file=sys.stderr)
+
+    if tep_bao_cao:
+        with open(tep_bao_cao, "w", encoding="utf-8") as f:
+            f.write("tep,doc_s,loc_s,ghi_s,tong_s\n")
+            for vao, t in thoi_gian.items():
+                f.write(f"{vao},{t['doc']:.6f},{t['loc']:.6f},{t['ghi']:.6f},{t['tong']:.6f}\n")
+
+
+def tao_tham_so() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        description="Chạy lô bộ lọc làm mịn / phát hiện biên trên cả thư mục."
+    )
+    p.add_argument("vao", help="Thư mục (hoặc 1 tệp) đầu vào: ảnh, CSV, NPY, NPZ")
+    p.add_argument("ra", help="Thư mục kết quả")
+    p.add_argument("--loc", required=True, choices=CAC_LOAI_LAM_MIN + CAC_LOAI_BIEN)
+    p.add_argument("--ks", type=int, default=3, help="Kích thước kernel làm mịn (lẻ)")
+    p.add_argument(
+        "--sigma", type=float, default=1.0, help="Sigma Gaussian (song_phuong: sigma không gian)"
+    )
+    p.add_argument(
+        "--sigma-gia-tri",
+        type=float,
+        default=30.0,
+        help="Sigma theo mức xám của bộ lọc song_phuong (bilateral)",
+    )
+    p.add_argument("--padding", choices=["reflect", "replicate", "zero"], default="reflect")
+    p.add_argument(
+        "--gauss-truoc",
+        nargs=2,
+        type=float,
+        metavar=("KS", "SIGMA"),
+        help="Làm mịn Gaussian trước khi phát hiện biên",
+    )
+    p.add_argument(
+        "--song-phuong-truoc",
+        nargs=2,
+        type=float,
+        metavar=("SIGMA_KG", "SIGMA_GT"),
+        help="Lọc bilateral giữ biên trước khi phát hiện biên",
+    )
+    p.add_argument("--nguong", type=int, help="Nhị phân hoá ảnh biên theo ngưỡng 0–255")
+    p.add_argument(
+        "--nguong-thap",
+        type=int,
+        help="Ngưỡng thấp của canny (mặc định --nguong / 2)",
+    )
+    p.add_argument("--ma-tran", choices=list(DUOI_MA_TRAN), help="Ghi thêm ma trận kết quả")
+    p.add_argument(
+        "--chinh-sach",
+        choices=["float32", "float64", "co_dinh"],
+        default="float32",
+        help="Chính sách kiểu dữ liệu (bo_loc/kieu_du_lieu.py)",
+    )
+    p.add_argument(
+        "--canh-toi-da",
+        type=int,
+        default=None,
+        help="Thu nhỏ ảnh có cạnh lớn hơn giá trị này (mặc định: giữ nguyên)",
+    )
+    p.add_argument("--so-tien-trinh", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--toi-da-dang-chay", type=int, default=None)
+    p.add_argument("--khong-de-quy", action="store_true", help="Không duyệt thư mục con")
+    p.add_argument("--ghi-de", action="store_true", help="Xử lý lại cả tệp đã có kết quả")
+    p.add_argument("--bao-cao", help="Ghi thời gian từng tệp ra file CSV")
+    return p
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = tao_tham_so().parse_args(argv)
+    # Đặt 1 lần ở điểm vào, trước mọi luồng / tiến trình giải mã ảnh
+    _bo_gioi_han_pil()
+
+    if args.ks % 2 == 0 or (args.gauss_truoc and int(args.gauss_truoc[0]) % 2 == 0):
+        print("Kích thước kernel phải lẻ.", file=sys.stderr)
+        return 2
+
+    cau_hinh = {
+        "loc": args.loc,
+        "ks": args.ks,
+        "sigma": args.sigma,
+        "padding": args.padding,
+        "gauss_truoc": args.gauss_truoc,
+        "sigma_gia_tri": args.sigma_gia_tri,
+        "song_phuong_truoc": args.song_phuong_truoc,
+        "nguong": args.nguong,
+        "nguong_thap": args.nguong_thap,
+        "ma_tran": args.ma_tran,
+        "chinh_sach": args.chinh_sach,
+        "canh_toi_da": args.canh_toi_da,
+    }
+    so_tien_trinh = max(1, args.so_tien_trinh)
+    toi_da_dang_chay = args.toi_da_dang_chay or 2 * so_tien_trinh
+
+    so_bo_qua = 0
+    thoi_gian: Dict[str, Dict[str, float]] = {}
+    loi: Dict[str, str] = {}
+    # Tệp kết quả (PNG) → tệp vào đã nhận nó
+    da_nhan: Dict[str, str] = {}
+
+    def cac_viec() -> Iterator[Tuple[str, List[str]]]:
+        nonlocal so_bo_qua
+        for vao, tuong_doi in tim_tap_tin(args.vao, de_quy=not args.khong_de_quy):
+            dich = cac_tep_dich(tuong_doi, args.ra, args.ma_tran)
+            khoa = os.path.normcase(dich[0])
+            if khoa in da_nhan:
+                loi[vao] = f"trùng tệp kết quả với {da_nhan[khoa]} (đổi tên 1 trong 2 tệp)"
+                print(f"[lỗi] {vao}", flush=True)
+                continue
+            da_nhan[khoa] = vao
+            if not args.ghi_de and all(os.path.exists(d) for d in dich):
+                so_bo_qua += 1
+                continue
+            yield vao, dich
+
+    bat_dau = time.perf_counter()
+
+    for vao, t, thong_bao in _chay(cac_viec(), cau_hinh, so_tien_trinh, toi_da_dang_chay):
+        if t is None:
+            loi[vao] = thong_bao
+            print(f"[lỗi] {vao}", flush=True)
+        else:
+            thoi_gian[vao] = t
+            print(f"[{len(thoi_gian)}] {vao}  {t['tong'] * 1000.0:.1f} ms", flush=True)
+
+    in_tong_ket(thoi_gian, so_bo_qua, loi, time.perf_counter() - bat_dau, args.bao_cao)
+    return 1 if loi else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())